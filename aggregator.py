@@ -0,0 +1,146 @@
+from threading import Lock
+import math
+import time
+
+
+class SumAggregator:
+    """
+    Number of records from start.
+    """
+    def __init__(self):
+        self.lock = Lock()
+        self.total = 0
+
+    def add(self, timestamp, value=None):
+        with self.lock:
+            self.total += 1
+
+    def status(self, prefix, now=None):
+        with self.lock:
+            return {prefix: self.total}
+
+
+class RateAggregator:
+    """
+    Number of records per second over sliding time windows.
+
+    Records are counted in a ring buffer of fixed-width time buckets that covers the
+    largest window, so updates are O(1) and memory stays bounded however long the crawl runs.
+    """
+    def __init__(self, windows=(10, 60, 900), bucket_width=1.0):
+        """
+        Args:
+            windows (tuple): window lengths in seconds; the first one is the default rate
+            bucket_width (float): width of a single time bucket in seconds
+        """
+        self.lock = Lock()
+        self.windows = tuple(windows)
+        self.bucket_width = bucket_width
+        self.num_buckets = int(math.ceil(max(self.windows) / bucket_width))
+        self.counts = [0] * self.num_buckets
+        self.bucket_ids = [-1] * self.num_buckets  # absolute bucket index held by each slot
+        self.start_time = time.time()
+
+    def add(self, timestamp, value=None):
+        bucket_id = int(timestamp // self.bucket_width)
+        slot = bucket_id % self.num_buckets
+        with self.lock:
+            if self.bucket_ids[slot] != bucket_id:
+                if self.bucket_ids[slot] > bucket_id:
+                    return  # too old to fall in any window
+                self.bucket_ids[slot] = bucket_id
+                self.counts[slot] = 0
+            self.counts[slot] += 1
+
+    def rate(self, window, now=None):
+        """
+        Args:
+            window (float): window length in seconds
+            now (float): current epoch time
+
+        Returns:
+            records per second during the last window seconds
+        """
+        now = time.time() if now is None else now
+        curr_id = int(now // self.bucket_width)
+        oldest_id = curr_id - int(math.ceil(window / self.bucket_width)) + 1
+        with self.lock:
+            count = sum(c for c, b in zip(self.counts, self.bucket_ids)
+                        if oldest_id <= b <= curr_id)
+        # do not divide by time that has not been crawled yet
+        elapsed = min(window, max(now - self.start_time, self.bucket_width))
+        return count / elapsed
+
+    def status(self, prefix, now=None):
+        status = {prefix: self.rate(self.windows[0], now)}
+        for window in self.windows:
+            status['{}_{}s'.format(prefix, int(window))] = self.rate(window, now)
+        return status
+
+
+class PercentileAggregator:
+    """
+    Percentiles of a value (such as latency) estimated from a log-scale histogram.
+
+    Bucket boundaries grow by a constant factor, so the relative error of a percentile
+    is bounded by that factor and the number of buckets is fixed.
+    """
+    def __init__(self, percentiles=(50, 90, 99), min_value=1e-3, max_value=1e4, growth=1.05):
+        """
+        Args:
+            percentiles (tuple): percentiles to report
+            min_value (float): values at or below this fall into the first bucket
+            max_value (float): values at or above this fall into the last bucket
+            growth (float): ratio between the upper bounds of adjacent buckets
+        """
+        self.lock = Lock()
+        self.percentiles = tuple(percentiles)
+        self.min_value = min_value
+        self.log_growth = math.log(growth)
+        self.num_buckets = int(math.ceil(math.log(max_value / min_value) / self.log_growth)) + 1
+        self.counts = [0] * self.num_buckets
+        self.total = 0
+
+    def bucket_of(self, value):
+        if value <= self.min_value:
+            return 0
+        bucket = int(math.ceil(math.log(value / self.min_value) / self.log_growth))
+        return min(bucket, self.num_buckets - 1)
+
+    def upper_bound(self, bucket):
+        return self.min_value * math.exp(bucket * self.log_growth)
+
+    def add(self, timestamp, value=None):
+        if value is None:
+            return
+        bucket = self.bucket_of(value)
+        with self.lock:
+            self.counts[bucket] += 1
+            self.total += 1
+
+    def percentile(self, p):
+        """
+        Returns:
+            upper bound of the bucket containing the p-th percentile, 0 if nothing recorded
+        """
+        with self.lock:
+            if self.total == 0:
+                return 0
+            rank = p / 100 * self.total
+            seen = 0
+            for bucket, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank and count > 0:
+                    return self.upper_bound(bucket)
+        return self.upper_bound(self.num_buckets - 1)
+
+    def status(self, prefix, now=None):
+        return {'{}_p{}'.format(prefix, p): self.percentile(p) for p in self.percentiles}
+
+
+# aggregation kinds available through Logger.add_agg_type
+AGGREGATORS = {
+    'sum': SumAggregator,
+    'speed': RateAggregator,
+    'latency': PercentileAggregator,
+}
@@ -0,0 +1,155 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import aiohttp
+
+
+class AsyncRuntime:
+    """
+    asyncio runtime driving many concurrent fetch tasks on a single event loop.
+
+    Crawler engines providing start_crawl_async(runtime) run as coroutines on the loop.
+    Network I/O goes through a shared aiohttp session, blocking work (disk, hashing, queues)
+    is offloaded to a thread pool with run_in_executor, and spawn() bounds the number
+    of in-flight tasks so that producers wait when downstream stages fall behind.
+    The data filter runs on a separate executor, so that slow detections never hold up saves.
+    """
+    def __init__(self, max_connections=1000, max_tasks=5000, timeout=10.0, executor_workers=32,
+                 pacing=None, data_filter=None, filter_workers=4):
+        """
+        Args:
+            max_connections (int): maximum number of open connections
+            max_tasks (int): maximum number of spawned tasks in flight
+            timeout (float): timeout of a single request in seconds
+            executor_workers (int): number of threads running offloaded blocking work
+            pacing (PacingController): per-host rate control, None for no rate limit
+            data_filter (DataFilter): filter run on the handed off images, None to leave
+                filtering to the logging pipeline
+            filter_workers (int): number of threads waiting on the data filter
+        """
+        self.pacing = pacing
+        self.max_connections = max_connections
+        self.max_tasks = max_tasks
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=executor_workers)
+        self.data_filter = data_filter
+        self.filter_executor = None
+        if data_filter is not None:
+            self.filter_executor = ThreadPoolExecutor(max_workers=filter_workers)
+        self.session = None
+        self.task_slots = None
+        self.tasks = set()
+
+    async def fetch(self, url):
+        """
+        Fetches the url.
+
+        Returns:
+            data (bytes): response body
+            content_type (str): content type of the response
+
+        Raises:
+            FetchError: if the url could not be fetched
+        """
+        host = None
+        if self.pacing is not None:
+            host = self.pacing.host_of(url)
+            # sleep on the loop instead of blocking it until the host's turn
+            delay = self.pacing.limiter(host).reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        try:
+            return await asyncio.wait_for(self._get(url, host), self.timeout)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if host is not None:
+                self.pacing.failure(host)
+            raise self.FetchError('{} : {}'.format(url, e))
+
+    async def _get(self, url, host=None):
+        async with self.session.get(url) as res:
+            if host is not None:
+                self.pacing.response(host, res.status)
+            if res.status >= 400:
+                raise self.FetchError('{} : HTTP {}'.format(url, res.status))
+            data = await res.read()
+            return data, res.headers.get('Content-Type', '').split(';')[0].strip()
+
+    async def offload(self, fn, *args, **kwargs):
+        """
+        Runs blocking fn on the executor without blocking the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+
+    async def detect(self, image, key=None):
+        """
+        Runs the data filter on an image on the filter executor.
+
+        Args:
+            image: decoded image (numpy array), path or bytes
+            key (str): content hash of the image for the detection cache
+
+        Returns:
+            True if the wanted data is in the image
+        """
+        loop = asyncio.get_running_loop()
+        keys = None if key is None else [key]
+        results = await loop.run_in_executor(
+                self.filter_executor, self.data_filter.detect_many, [image], keys)
+        return results[0]
+
+    async def spawn(self, coro):
+        """
+        Runs the coroutine as a task, waiting while max_tasks tasks are in flight.
+        """
+        await self.task_slots.acquire()
+        task = asyncio.ensure_future(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task):
+        self.tasks.discard(task)
+        self.task_slots.release()
+        if not task.cancelled() and task.exception() is not None:
+            print('Async task failed : {}'.format(task.exception()))
+
+    async def _main(self, engines, stopper):
+        self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections))
+        self.task_slots = asyncio.Semaphore(self.max_tasks)
+        runners = [asyncio.ensure_future(engine.start_crawl_async(self)) for engine in engines]
+        try:
+            while not stopper.is_set():
+                await asyncio.sleep(0.1)
+        finally:
+            pending = runners + list(self.tasks)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            await self.session.close()
+
+    def run(self, engines, stopper):
+        """
+        Runs the engines on a new event loop until the stopper is set.
+
+        Args:
+            engines (list): crawler engines providing start_crawl_async(runtime)
+            stopper (Event): stops the runtime when set
+        """
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self._main(engines, stopper))
+        finally:
+            loop.close()
+            self.executor.shutdown(wait=True)
+            if self.filter_executor is not None:
+                self.filter_executor.shutdown(wait=True)
+        print('Async runtime stopped')
+
+    class FetchError(Exception):
+        """
+        Exception to note that a url could not be fetched.
+        """
+        def __init__(self, message):
+            self.message = message
@@ -4,8 +4,23 @@ import cherrypy
 import cpu_usage
 import os
 import json
+import socket
+from threading import Lock
+from status_history import StatusHistory
+from status_stream import StatusBroadcaster
 
-pid_list = list()
+HOSTNAME = socket.gethostname()
+EXPIRE_INTERVAL = 10  # seconds between checks for crawler nodes that stopped reporting
+
+# samples the crawler process trees that report to this server
+sampler = cpu_usage.ProcessSampler()
+# pid of the sampled process tree of each crawler node on this host
+tracked_pids = {}
+tracked_lock = Lock()
+# status time series of every crawler node
+history = StatusHistory()
+# pushes fleet status deltas to streaming watchers
+broadcaster = StatusBroadcaster()
 
 @cherrypy.expose
 class StringGeneratorWebService:
@@ -18,16 +33,13 @@ class StringGeneratorWebService:
     s_sum = 0
     @cherrypy.tools.accept(media='text/plain')
     def GET(self):
-        if len(pid_list) == 0:
-            return self.speed
-        else:
-            pids = cpu_usage.get_python_usage()
-            cpu_sum = 0
-            alive = 0
-            dead = 0
-            for i in pids:
-                cpu_sum += float(pids[i])
-            return format(self.f_speed, '.2f') + ',' + str(self.f_sum) + ',' + format(self.s_speed, '.2f') + ',' + str(self.s_sum) + ',' + format(cpu_sum, '.2f')
+        cpu_sum = sampler.get_snapshot()['cpu']  # cached, sampled in the background
+        fleet = history.fleet()  # throughput summed over all crawler nodes
+        self.f_speed = fleet.get('FILTERED_speed', 0)
+        self.f_sum = fleet.get('FILTERED_sum', 0)
+        self.s_speed = fleet.get('SAVED_speed', 0)
+        self.s_sum = fleet.get('SAVED_sum', 0)
+        return format(self.f_speed, '.2f') + ',' + str(self.f_sum) + ',' + format(self.s_speed, '.2f') + ',' + str(self.s_sum) + ',' + format(cpu_sum, '.2f')
 
     def POST(self, length=8):
         some_string = ''.join(random.sample(string.hexdigits, int(length)))
@@ -35,17 +47,90 @@ class StringGeneratorWebService:
         return some_string
 
     def PUT(self, status):
-        print(status)
-        print(type(status))
-        self.s_speed = json.loads(status)['SAVED_speed']
-        self.s_sum = json.loads(status)['SAVED_sum']
-        self.f_speed = json.loads(status)['FILTERED_speed']
-        self.f_sum = json.loads(status)['FILTERED_sum']
+        status = json.loads(status)
+        node_id = status.get('node', 'default')
+        history.add(node_id, status)
+        if 'pid' in status and status.get('host') == HOSTNAME:
+            track_node(node_id, status['pid'])
+        fleet = history.fleet()
+        fleet['cpu'] = sampler.get_snapshot()['cpu']
+        broadcaster.publish(fleet)
 
     def DELETE(self):
         cherrypy.session.pop('mystring', None)
 
 
+def track_node(node_id, pid):
+    """
+    Samples the process tree of a crawler node running on this host.
+    Pids of other hosts would point to unrelated local processes.
+    """
+    pid = int(pid)
+    with tracked_lock:
+        old_pid = tracked_pids.get(node_id)
+        if old_pid == pid:
+            return
+        if old_pid is not None:
+            sampler.untrack(old_pid)  # the node restarted under the same id
+        tracked_pids[node_id] = pid
+        sampler.track(pid)
+
+
+def expire_nodes():
+    """
+    Stops sampling the process trees of nodes that stopped reporting, as their pids may be reused,
+    and drops the history of nodes gone for longer than the history horizon.
+    """
+    for node_id in history.evict():
+        print('Dropped the history of node {}'.format(node_id))
+    inactive = history.inactive_node_ids()
+    with tracked_lock:
+        for node_id in inactive:
+            pid = tracked_pids.pop(node_id, None)
+            if pid is not None:
+                sampler.untrack(pid)
+
+
+@cherrypy.expose
+class HistoryWebService:
+    """
+    JSON query endpoint of the status history.
+    """
+    @cherrypy.tools.json_out()
+    def GET(self, node=None, start=None, end=None, resolution='raw'):
+        start = None if start is None else float(start)
+        end = None if end is None else float(end)
+        try:
+            return history.query(node, start, end, resolution)
+        except ValueError as e:
+            raise cherrypy.HTTPError(400, str(e))
+
+
+@cherrypy.expose
+class FleetWebService:
+    """
+    JSON endpoint of the aggregate fleet throughput.
+    """
+    @cherrypy.tools.json_out()
+    def GET(self):
+        fleet = history.fleet()
+        fleet['cpu'] = sampler.get_snapshot()['cpu']
+        fleet['node_ids'] = history.node_ids()
+        return fleet
+
+
+@cherrypy.expose
+class StreamWebService:
+    """
+    Server-Sent Events endpoint pushing fleet status deltas as they arrive.
+    """
+    def GET(self):
+        cherrypy.response.headers['Content-Type'] = 'text/event-stream'
+        cherrypy.response.headers['Cache-Control'] = 'no-cache'
+        last_event_id = cherrypy.request.headers.get('Last-Event-ID')
+        return broadcaster.stream(last_event_id)
+
+
 def start_server():
     conf = {
         '/': {
@@ -55,17 +140,30 @@ def start_server():
             'tools.response_headers.headers': [('Content-Type', 'text/plain')],
         }
     }
+    json_conf = {
+        '/': {
+            'request.dispatch': cherrypy.dispatch.MethodDispatcher(),
+        }
+    }
+    cherrypy.tree.mount(HistoryWebService(), '/history', json_conf)
+    cherrypy.tree.mount(FleetWebService(), '/fleet', json_conf)
+    stream_conf = {
+        '/': {
+            'request.dispatch': cherrypy.dispatch.MethodDispatcher(),
+            'response.stream': True,
+        }
+    }
+    cherrypy.tree.mount(StreamWebService(), '/stream', stream_conf)
+    # every streaming watcher holds a server thread
+    cherrypy.config.update({'server.thread_pool': 64})
     cherrypy.quickstart(StringGeneratorWebService(), '/', conf)
 
 
-def set_pid_list(input):
-    for i in input:
-        pid_list.append(i)
-
 def run_server():
-    input_pid_list = []
-    input_pid_list.append(str(os.getpid()))
-    set_pid_list(input_pid_list)
+    sampler.track(os.getpid())
+    sampler.start()
+    cherrypy.process.plugins.Monitor(
+            cherrypy.engine, expire_nodes, frequency=EXPIRE_INTERVAL).subscribe()
     start_server()
 
 if __name__ == '__main__':
@@ -1,17 +1,117 @@
-import subprocess
+from threading import Thread, Event, Lock
+import os
+import time
+import psutil
 
 
-def get_python_usage():
-    cmd = ("ps aux | grep -e geckodriver -e python -e firefox | grep -v grep | awk '{print $2, $3}'")
-    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, shell=True)
-    (out, err) = proc.communicate()
-    outwithoutreturn = (str(out, 'utf-8').rstrip('\n')).split('\n')
-    dict = {}
-    for i in outwithoutreturn:
-        pid, usage = i.split(' ')
-        dict[pid] = usage
-    return dict
+class ProcessSampler:
+    """
+    Samples CPU, memory and thread usage of the tracked process trees in the background.
+
+    Each tracked root process is sampled together with all of its descendants
+    (e.g. geckodriver and the Firefox children spawned by the crawler).
+    Readers get the latest cached snapshot without touching the system.
+    """
+    def __init__(self, root_pids=(), interval=1.0):
+        """
+        Args:
+            root_pids (iterable): pids of the processes whose trees are tracked
+            interval (float): sampling interval in seconds
+        """
+        self.interval = interval
+        self.lock = Lock()
+        self.root_pids = set(int(pid) for pid in root_pids)
+        self.procs = {}  # psutil.Process kept across samples so cpu_percent has a baseline
+        self.snapshot = self.empty_snapshot()
+        self.stopper = Event()
+        self.thread = Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def empty_snapshot():
+        return {'time': time.time(), 'cpu': 0.0, 'rss': 0, 'threads': 0, 'processes': {}}
+
+    def track(self, pid):
+        """
+        Adds a process tree to track.
+        """
+        with self.lock:
+            self.root_pids.add(int(pid))
+
+    def untrack(self, pid):
+        """
+        Stops tracking a process tree.
+        """
+        with self.lock:
+            self.root_pids.discard(int(pid))
+
+    def _tree(self, root_pid):
+        try:
+            root = psutil.Process(root_pid)
+            return [root] + root.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return []
+
+    def sample(self):
+        """
+        Samples the tracked process trees and updates the cached snapshot.
+
+        Returns:
+            snapshot (dict): total and per-process cpu (%), rss (bytes) and thread count
+        """
+        with self.lock:
+            root_pids = set(self.root_pids)
+
+        alive = {}
+        for root_pid in root_pids:
+            for proc in self._tree(root_pid):
+                # reuse the known process object so cpu_percent measures since the last sample
+                alive[proc.pid] = self.procs.get(proc.pid, proc)
+
+        snapshot = self.empty_snapshot()
+        for pid, proc in alive.items():
+            try:
+                with proc.oneshot():
+                    usage = {
+                        'name': proc.name(),
+                        'cpu': proc.cpu_percent(interval=None),
+                        'rss': proc.memory_info().rss,
+                        'threads': proc.num_threads(),
+                    }
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+            snapshot['processes'][pid] = usage
+            snapshot['cpu'] += usage['cpu']
+            snapshot['rss'] += usage['rss']
+            snapshot['threads'] += usage['threads']
+
+        self.procs = alive
+        with self.lock:
+            self.snapshot = snapshot
+        return snapshot
+
+    def get_snapshot(self):
+        """
+        Returns:
+            the latest cached snapshot
+        """
+        with self.lock:
+            return self.snapshot
+
+    def _run(self):
+        while not self.stopper.is_set():
+            self.sample()
+            self.stopper.wait(self.interval)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopper.set()
+        self.thread.join()
 
 
 if __name__ == '__main__':
-    print(get_python_usage())
+    sampler = ProcessSampler([os.getpid()])
+    sampler.sample()
+    time.sleep(1)
+    print(sampler.sample())
@@ -1,12 +1,22 @@
 from crawler_engine_abc import CrawlerEngine
 from insta_crawler import InstagramCrawlerEngine, BetterDriver
-from threading import Thread, Event
+from insta_http_crawler import InstagramHttpCrawlerEngine, AsyncInstagramHttpCrawlerEngine
+from process_workers import ProcessWorkerPool, release_pixels
+from driver_pool import DriverPool
+from threading import Thread, Event, Lock
 from logger import Logger
-from data_filter import DataFilter
-import os
+from data_filter import DataFilter, FilterParams
+from detection_cache import DetectionCache, content_key
+from pipeline import Stage, Pipeline
+from image_hash import DuplicateIndex
+from seen_index import SeenIndex
+from frontier import HashtagFrontier
+from scheduler import HashtagScheduler
+from image_fetcher import ImageFetcher
+from pacing import PacingController
+from image_encoder import ImageEncoder
+from image_store import FlatImageStore, ShardedImageStore, SegmentImageStore, FILTERED
 import signal
-import queue
-import time
 import argparse
 
 
@@ -15,38 +25,56 @@ class Crawler:
     Crawler system class. Comprises all modules required for crawling.
     """
     def __init__(self, crawler_engine_cls, webdriver_cls, num_workers, logger=None,
-            data_filter=None, data_filter_folder='./faces'):
+            data_filter=None, data_filter_folder='./faces', stage_workers=None,
+            log_batch_size=32, image_index=None, seen_index=None, frontier_snapshot=None,
+            fetcher=None, async_runtime=None, process_mode=False, driver_pool=None, pacing=None,
+            image_store=None, encoder=None):
         if not issubclass(crawler_engine_cls, CrawlerEngine):
             raise self.CrawlerEngineMismatchError
+        if async_runtime is not None and not hasattr(crawler_engine_cls, 'start_crawl_async'):
+            raise self.CrawlerEngineMismatchError('engine has no async methods')
         self.crawler_engine_cls = crawler_engine_cls
         self.webdriver_cls = webdriver_cls
         self.logger = logger
         self.stopper = Event()
         self.data_filter = data_filter  # filter that selects wanted data only
-        self.target_queue = queue.Queue(maxsize=100)  # queue collecting target keywords
-        self.hashtag_duplicate = set()
+        # frontier of target keywords (hashtags) scheduled by their yield,
+        # restored from the last snapshot if any
+        self.frontier_snapshot = frontier_snapshot
+        self.target_queue = HashtagScheduler(HashtagFrontier())
+        if frontier_snapshot is not None and self.target_queue.restore(frontier_snapshot):
+            print('Restored {} keywords from {}'.format(
+                    self.target_queue.qsize(), frontier_snapshot))
+        self.image_index = image_index  # near-duplicate index shared by all workers
+        self.seen_index = seen_index  # persistent index of crawled posts and images
+        self.fetcher = fetcher  # direct HTTP image fetcher shared by all workers
+        self.async_runtime = async_runtime  # runs async engines on a single event loop
+        self.process_mode = process_mode  # run engines in supervised child processes
+        self.process_pool = None
+        self.driver_pool = driver_pool  # launches, health-checks and recycles web drivers
+        self.pacing = pacing  # adaptive waits and per-host rate limits shared by all workers
 
-        # create logger thread
-        self.logger_thread = None
+        # create logging pipeline
+        self.pipeline = None
         self.log_queue = None
-        if self.data_filter is not None:
-            self.data_filter_folder = data_filter_folder
-            if not os.path.exists(data_filter_folder):
-                os.makedirs(data_filter_folder)
+        self.persist_lock = Lock()
+        # storage of crawled images, where filtered images are flagged
+        if image_store is None:
+            image_store = FlatImageStore(
+                    'images', data_filter_folder if self.data_filter is not None else None)
+        self.image_store = image_store
+        self.encoder = encoder  # encodes images to the output format on a pool of its own
 
         if self.logger is not None:
-            self.log_queue = queue.Queue(maxsize=1000)
-            self.logger_thread = Thread(
-                    target=self.log,
-                    kwargs={
-                        'log_queue': self.log_queue,
-                    })
+            self.pipeline = self.create_pipeline(stage_workers or {}, log_batch_size)
+            self.log_queue = self.pipeline.input_queue
 
         # create worker threads
         self.workers = self.create_workers(num_workers)
 
         # end gracefully upon Ctrl+C
-        handler = SignalHandler(self.stopper, self.workers, self.logger, self.logger_thread)
+        handler = SignalHandler(self.stopper, self.workers, self.pipeline,
+                                self.save_frontier, self.close)
         signal.signal(signal.SIGINT, handler)
 
 
@@ -58,72 +86,194 @@ class Crawler:
         Returns:
             workers (set[Thread]): set of workers
         """
-        for _ in range(num_workers):
-            keyword = input("keyword: ")
-            self.target_queue.put(keyword)
-            self.hashtag_duplicate.add(keyword)
+        if self.target_queue.qsize() == 0:
+            for _ in range(num_workers):
+                keyword = input("keyword: ")
+                self.target_queue.offer(keyword)
+
+        if self.process_mode:
+            self.process_pool = ProcessWorkerPool(
+                    num_workers, self.crawler_engine_cls, self.webdriver_cls,
+                    stopper=self.stopper,
+                    log_queue=self.log_queue,
+                    frontier=self.target_queue,
+                    image_index=self.image_index,
+                    seen_index=self.seen_index,
+                    engine_kwargs={
+                        'use_fetcher': self.fetcher is not None,
+                        'decode_pixels': self.data_filter is not None,
+                        'encoder_options': None if self.encoder is None else {
+                            'output_format': self.encoder.output_format,
+                            'quality': self.encoder.quality,
+                            'max_dimension': self.encoder.max_dimension,
+                        },
+                        # each process paces itself with its share of the rates
+                        'pacing_options': None if self.pacing is None else {
+                            'initial_rate': self.pacing.initial_rate / num_workers,
+                            'max_rate': self.pacing.max_rate / num_workers,
+                            'min_timeout': self.pacing.min_timeout,
+                            'max_timeout': self.pacing.max_timeout,
+                        }})
+            return {self.process_pool}
+
+        # launch web drivers (in parallel when pooled); browserless engines have none
+        if self.driver_pool is not None:
+            drivers = self.driver_pool.warm_up(num_workers)
+        elif self.webdriver_cls is not None:
+            drivers = [self.webdriver_cls() for _ in range(num_workers)]
+        else:
+            drivers = [None] * num_workers
 
         # create workers
         workers = set()
-        for _ in range(num_workers):
+        for driver in drivers:
             if issubclass(self.crawler_engine_cls, Thread):
                 crawler_engine_inst = self.crawler_engine_cls(
-                        self.webdriver_cls(),
+                        driver,
                         log_queue=self.log_queue,
                         hashtag_queue=self.target_queue,
-                        hashtag_duplicate=self.hashtag_duplicate,
-                        thread_stopper=self.stopper)
+                        thread_stopper=self.stopper,
+                        image_index=self.image_index,
+                        seen_index=self.seen_index,
+                        fetcher=self.fetcher,
+                        driver_pool=self.driver_pool,
+                        pacing=self.pacing,
+                        decode_pixels=self.data_filter is not None,
+                        image_store=self.image_store,
+                        encoder=self.encoder)
                 workers.add(crawler_engine_inst)
             else:
                 workers.add(Thread(
-                    target=self.crawler_engine_cls(self.webdriver_cls()),
+                    target=self.crawler_engine_cls(driver,
+                                                   image_index=self.image_index,
+                                                   seen_index=self.seen_index,
+                                                   fetcher=self.fetcher,
+                                                   driver_pool=self.driver_pool,
+                                                   pacing=self.pacing,
+                                                   image_store=self.image_store,
+                                                   encoder=self.encoder),
                     kwargs={
                         'log_queue': self.log_queue,
                         'hashtag_queue': self.target_queue,
-                        'hashtag_duplicate': self.hashtag_duplicate,
                     }))
+
+        if self.async_runtime is not None:
+            # a single thread runs the event loop driving all async engines
+            return {Thread(target=self.async_runtime.run, args=(list(workers), self.stopper))}
         return workers
 
-    def log(self, log_queue: queue.Queue):
+    def create_pipeline(self, stage_workers, batch_size=32):
         """
-        Gets a log information from the queue and logs the result.
+        Creates the logging pipeline: filter -> persist -> report.
 
         Args:
-            log_queue: synchronous queue that stores log data
-        """
-        while True:
-            if self.stopper.is_set():
-                # break if stopper has been set
-                break
-
-            if not log_queue.empty():
-                log_info = log_queue.get()
-
-                if not log_info['success']:  # image retrieval was not successful
-                    log_info['type'] = 'FAILED'
-                else:
-                    filepath = log_info['filepath']
-                    # check whether wanted data is in the image
-                    is_wanted = self.data_filter.detect_face(filepath)
-
-                    # determine the data status
-                    if is_wanted:
-                        data_status = 'FILTERED'
-
-                        # move the file to separate folder
-                        new_filepath = os.path.join(self.data_filter_folder, log_info['name'])
-                        os.rename(filepath, new_filepath)
-                        log_info['filepath'] = new_filepath
-                    else:
-                        data_status = 'SAVED'
-
-                    log_info['type'] = data_status
-                print('Final log : {}'.format(log_info))
-                self.logger.log(log_info)
-                self.logger.send_status()
+            stage_workers (dict): number of workers keyed by stage name
+            batch_size (int): maximum number of log entries handled at once by each stage
+
+        Returns:
+            pipeline (Pipeline): logging pipeline whose input queue is the log queue
+        """
+        return Pipeline([
+            Stage('filter', self.filter_entries, num_workers=stage_workers.get('filter', 1),
+                  stopper=self.stopper, batch_size=batch_size, on_error=self.drop_entries),
+            Stage('persist', self.persist_entries, num_workers=stage_workers.get('persist', 1),
+                  stopper=self.stopper, batch_size=batch_size, on_error=self.drop_entries),
+            Stage('report', self.report_entries, num_workers=stage_workers.get('report', 1),
+                  stopper=self.stopper, batch_size=batch_size),
+        ])
+
+    def filter_entries(self, log_infos):
+        """
+        Determines the data status of a batch of log entries by running the data filter.
+        """
+        saved = []
+        for log_info in log_infos:
+            if log_info.get('duplicate', False):  # near-duplicate of a saved image
+                log_info['type'] = 'DUPLICATE'
+            elif not log_info['success']:  # image retrieval was not successful
+                log_info['type'] = 'FAILED'
+            elif log_info.get('wanted') is not None:  # already filtered by the async runtime
+                log_info['type'] = 'FILTERED' if log_info.pop('wanted') else 'SAVED'
             else:
-                time.sleep(3)  # sleep for a while if log queue is empty
-        print('Log queue dead')
+                log_info['type'] = 'SAVED'
+                saved.append(log_info)
+
+        if self.data_filter is not None and len(saved) > 0:
+            # check whether wanted data is in the images, on the handed off pixels if any
+            # results are cached by content hash, which names the images
+            is_wanted = self.data_filter.detect_many(
+                    [log_info['pixels'] if log_info.get('pixels') is not None
+                     else log_info['filepath'] for log_info in saved],
+                    keys=[content_key(log_info['name']) for log_info in saved])
+            for log_info, wanted in zip(saved, is_wanted):
+                if wanted:
+                    log_info['type'] = 'FILTERED'
+        return log_infos
+
+    def persist_entries(self, log_infos):
+        """
+        Stores handed off images once, flagging filtered data, and writes the logs.
+        """
+        for log_info in log_infos:
+            release_pixels(log_info)
+            flags = FILTERED if log_info['type'] == 'FILTERED' else 0
+            if log_info.get('data') is not None:
+                log_info['filepath'] = self.image_store.put(log_info['name'], log_info['data'],
+                                                            flags)
+                del log_info['data']
+            elif flags:  # already stored by the engine
+                log_info['filepath'] = self.image_store.set_flags(log_info['name'], flags)
+            print('Final log : {}'.format(log_info))
+        with self.persist_lock:
+            self.logger.log_many(log_infos)
+        for log_info in log_infos:
+            # only stored images are seen, so that lost ones are crawled again
+            seen_keys = log_info.pop('seen_keys', None)
+            if self.seen_index is not None and seen_keys is not None \
+                    and log_info['type'] != 'FAILED':
+                self.seen_index.add(seen_keys)
+            self.target_queue.record(log_info)  # hashtag yield statistics for the scheduler
+        return log_infos
+
+    def drop_entries(self, log_infos):
+        """
+        Frees the handed off pixels of log entries dropped by a failed stage, and forgets
+        the near-duplicate hashes of the images that were not stored.
+        """
+        for log_info in log_infos:
+            release_pixels(log_info)
+            if self.image_index is not None and log_info.pop('data', None) is not None:
+                self.image_index.discard(log_info['name'])
+
+    def report_entries(self, log_infos):
+        """
+        Sends the status, including the status of each pipeline stage
+        and the best yielding hashtags, to the monitoring server.
+        """
+        extra = {
+            'pipeline': self.pipeline.status(),
+            'hashtags': self.target_queue.status(),
+        }
+        if self.process_pool is not None:
+            extra['workers'] = self.process_pool.status()
+        if self.driver_pool is not None:
+            extra['drivers'] = self.driver_pool.status()
+        if self.pacing is not None:
+            extra['pacing'] = self.pacing.status()
+        if self.encoder is not None:
+            extra['encoder'] = self.encoder.status()
+        if self.data_filter is not None:
+            extra['filter'] = self.data_filter.status()
+        self.logger.send_status(extra=extra)
+
+    def save_frontier(self):
+        """
+        Snapshots the keyword frontier so that crawling resumes from it after a restart.
+        """
+        if self.frontier_snapshot is not None:
+            self.target_queue.snapshot(self.frontier_snapshot)
+            print('Saved {} keywords to {}'.format(
+                    self.target_queue.qsize(), self.frontier_snapshot))
 
     def start(self):
         """
@@ -132,15 +282,35 @@ class Crawler:
         for i, worker in enumerate(self.workers):
             worker.start()
             print('Worker {} started'.format(i))
-        self.logger_thread.start()
-        print('Logger thread started')
+        if self.pipeline is not None:
+            self.pipeline.start()
+            print('Logging pipeline started')
 
     def close(self):
         """
         Stop crawling and close any additional running functionalities.
+        Called once the workers and the logging pipeline have been joined.
         """
+        # finish the fetches and encodes still in flight before closing what they log to
+        if self.fetcher is not None:
+            self.fetcher.close()
+        if self.encoder is not None:
+            self.encoder.close()
+        if self.pipeline is not None:
+            self.pipeline.drain()  # persist the log entries left behind upon stop
         if self.logger is not None:
-            logger.close()
+            self.logger.close()
+        self.save_frontier()
+        self.target_queue.close()
+        if self.data_filter is not None:
+            self.data_filter.close()
+        if self.image_index is not None:
+            self.image_index.close()
+        if self.driver_pool is not None:
+            self.driver_pool.close()
+        if self.seen_index is not None:
+            self.seen_index.close()
+        self.image_store.close()
 
     class CrawlerEngineMismatchError(Exception):
         """
@@ -150,56 +320,217 @@ class Crawler:
             self.message = message
 
 
+# crawler engine class and web driver class of each target site
+ENGINES = {
+    'instagram': (InstagramCrawlerEngine, BetterDriver),
+    'instagram-http': (InstagramHttpCrawlerEngine, None),  # browserless
+    'instagram-async': (AsyncInstagramHttpCrawlerEngine, None),  # browserless, on asyncio
+}
+
+
 class SignalHandler:
     """
     Signal handler for crawler.
     """
-    def __init__(self, stopper: Event, workers, logger, logger_thread):
+    def __init__(self, stopper: Event, workers, pipeline, save_frontier, close):
         self.stopper = stopper
         self.workers = workers
-        self.logger = logger
-        self.logger_thread = logger_thread
+        self.pipeline = pipeline
+        self.save_frontier = save_frontier
+        self.close = close
 
     def __call__(self, signum, frame):
         print('SIGINT received')
         self.stopper.set()  # set stop thread event
+        if self.pipeline is not None:
+            self.pipeline.stop()  # wake up the pipeline stages blocked on their queues
 
-        print('Closing logger..')
-        self.logger.close()  # close logger
+        self.save_frontier()  # resume from the remaining keywords next time
 
         for worker in self.workers:
             worker.join()
-        self.logger_thread.join()
+        if self.pipeline is not None:
+            self.pipeline.join()
+
+        # close the logger and commit the indexes only once nothing can use them anymore
+        print('Closing crawler..')
+        self.close()
 
 
 if __name__ == '__main__':
     # parse arguments
     argparser = argparse.ArgumentParser(description='Facecrawler')
-    argparser.add_argument('-s', '--site', type=str, default='instagram', help='target website to crawl')
+    argparser.add_argument('-s', '--site', type=str, default='instagram', choices=sorted(ENGINES),
+                           help='target website to crawl (instagram-http crawls without a browser)')
     argparser.add_argument('-f', '--filter', type=str, default='', help='type for data filter')
     argparser.add_argument('-t', '--nthread', type=int, default=2, help='number of worker threads')
     argparser.add_argument('-l', '--logpath', type=str, default='log', help='log folder path')
+    argparser.add_argument('--log-compression', type=str, default=None, choices=('gzip', 'zstd'),
+                           help='compression of rotated log files')
+    argparser.add_argument('--monitor-url', type=str, default='http://127.0.0.1:8080',
+                           help='url of the monitoring server')
+    argparser.add_argument('--node-id', type=str, default=None,
+                           help='id of this crawler node reported to the monitoring server')
+    argparser.add_argument('--status-rate', type=float, default=1.0,
+                           help='maximum status updates sent to the monitoring server per second')
+    argparser.add_argument('--detect-workers', type=int, default=1,
+                           help='number of detection workers inside the data filter '
+                                '(see --stage-workers for the filter stage threads)')
+    argparser.add_argument('--stage-workers', type=str, default='',
+                           help='workers per logging stage, e.g. filter=4,persist=1,report=1')
+    argparser.add_argument('--log-batch-size', type=int, default=32,
+                           help='maximum number of log entries handled at once by each logging stage')
+    argparser.add_argument('--dup-index', type=str, default='phash_index.txt',
+                           help='file persisting perceptual hashes of saved images (empty to disable)')
+    argparser.add_argument('--dup-radius', type=int, default=4,
+                           help='maximum hamming distance between near-duplicate images')
+    argparser.add_argument('--seen-db', type=str, default='seen.db',
+                           help='sqlite database of crawled posts and images (empty to disable)')
+    argparser.add_argument('--frontier', type=str, default='frontier.snapshot',
+                           help='snapshot file of the keyword frontier (empty to disable)')
+    argparser.add_argument('--download-mode', type=str, default='browser', choices=('browser', 'http'),
+                           help='download images by browser screenshot or direct http fetch')
+    argparser.add_argument('--fetch-workers', type=int, default=4,
+                           help='number of concurrent http image fetches')
+    argparser.add_argument('--max-connections', type=int, default=1000,
+                           help='maximum open connections of the asyncio runtime (async engines)')
+    argparser.add_argument('-p', '--processes', action='store_true',
+                           help='run each worker in a supervised child process instead of a thread')
+    argparser.add_argument('--driver-spares', type=int, default=1,
+                           help='number of pre-warmed spare web drivers')
+    argparser.add_argument('--driver-max-pages', type=int, default=1000,
+                           help='pages served by a web driver before it is recycled')
+    argparser.add_argument('--driver-max-rss', type=int, default=1500,
+                           help='browser memory in MB at which a web driver is recycled')
+    argparser.add_argument('--host-rate', type=float, default=1.0,
+                           help='initial requests per second per host, adapted while crawling')
+    argparser.add_argument('--max-host-rate', type=float, default=20.0,
+                           help='maximum requests per second per host')
+    argparser.add_argument('--store', type=str, default='flat', choices=('flat', 'sharded', 'segment'),
+                           help='image storage: flat folders, sharded hash-prefix folders '
+                                'or packed append-only segments')
+    argparser.add_argument('--store-path', type=str, default='store',
+                           help='root folder of the sharded or segment image store')
+    argparser.add_argument('--segment-bytes', type=int, default=256 * 1024 * 1024,
+                           help='size at which the segment store starts a new segment')
+    argparser.add_argument('--image-format', type=str, default='original',
+                           choices=ImageEncoder.OUTPUT_FORMATS,
+                           help='output format of saved images, original keeps the downloaded bytes')
+    argparser.add_argument('--quality', type=int, default=85, help='quality of jpeg and webp output')
+    argparser.add_argument('--max-dimension', type=int, default=0,
+                           help='downscale saved images larger than this on a side, 0 to keep the size')
+    argparser.add_argument('--encode-workers', type=int, default=2,
+                           help='number of threads encoding images off the crawling threads')
+    argparser.add_argument('--filter-min-dimension', type=int, default=64,
+                           help='data filter rejects images with a shorter side')
+    argparser.add_argument('--filter-min-std', type=float, default=10.0,
+                           help='data filter rejects images with a lower gray level deviation')
+    argparser.add_argument('--filter-min-entropy', type=float, default=4.0,
+                           help='data filter rejects images with a lower gray level entropy (bits)')
+    argparser.add_argument('--filter-min-skin', type=float, default=0.02,
+                           help='data filter rejects images with a lower skin tone ratio, 0 to disable')
+    argparser.add_argument('--filter-working-size', type=int, default=480,
+                           help='data filter downscales images to this longer side before detection')
+    argparser.add_argument('--detection-db', type=str, default='detections.db',
+                           help='cache of face detection results by content hash, empty to disable')
+    argparser.add_argument('--filter-pool', type=str, default='thread',
+                           choices=DataFilter.POOL_TYPES, help='worker pool type of the data filter')
     args = argparser.parse_args()
 
     # prepare data filter
     image_set = args.filter
     data_filter = None
     if image_set != '':
-        data_filter = DataFilter(image_set)
+        filter_params = FilterParams(min_dimension=args.filter_min_dimension,
+                                     min_std=args.filter_min_std,
+                                     min_entropy=args.filter_min_entropy,
+                                     min_skin_ratio=args.filter_min_skin,
+                                     working_size=args.filter_working_size)
+        detection_cache = DetectionCache(args.detection_db) if args.detection_db else None
+        data_filter = DataFilter(image_set, num_workers=args.detect_workers,
+                                 pool_type=args.filter_pool, params=filter_params,
+                                 cache=detection_cache)
+
+    # prepare near-duplicate image index
+    image_index = None
+    if args.dup_index != '':
+        image_index = DuplicateIndex(args.dup_index, radius=args.dup_radius)
+
+    # prepare index of already crawled posts and images
+    seen_index = None
+    if args.seen_db != '':
+        seen_index = SeenIndex(args.seen_db)
+
+    # prepare image store
+    image_store = None
+    if args.store == 'sharded':
+        image_store = ShardedImageStore(args.store_path)
+    elif args.store == 'segment':
+        image_store = SegmentImageStore(args.store_path, segment_bytes=args.segment_bytes)
+
+    # encoder of saved images, off the crawling threads
+    encoder = ImageEncoder(args.image_format, quality=args.quality,
+                           max_dimension=args.max_dimension or None,
+                           num_workers=args.encode_workers)
+
+    # adaptive waits and per-host rate control shared by all workers
+    pacing = PacingController(initial_rate=args.host_rate, max_rate=args.max_host_rate)
+
+    # prepare direct http image fetcher
+    crawler_engine_cls, webdriver_cls = ENGINES[args.site]
+    fetcher = None
+    if args.download_mode == 'http' or webdriver_cls is None:
+        fetcher = ImageFetcher(num_workers=args.fetch_workers, pacing=pacing)
+
+    # pool of web drivers for browser engines run as threads
+    driver_pool = None
+    if webdriver_cls is not None and not args.processes:
+        driver_pool = DriverPool(webdriver_cls, spares=args.driver_spares,
+                                 max_pages=args.driver_max_pages, max_rss_mb=args.driver_max_rss)
+
+    # run engines with async methods on the asyncio runtime
+    async_runtime = None
+    if hasattr(crawler_engine_cls, 'start_crawl_async'):
+        from async_runtime import AsyncRuntime  # needs aiohttp, required by async engines only
+        async_runtime = AsyncRuntime(max_connections=args.max_connections, pacing=pacing,
+                                     data_filter=data_filter)
+
+    # parse number of workers per logging stage
+    stage_workers = {}
+    for stage_spec in filter(None, args.stage_workers.split(',')):
+        stage_name, stage_num = stage_spec.split('=')
+        stage_workers[stage_name.strip()] = int(stage_num)
 
     # prepare logger
     logpath = args.logpath
-    logger = Logger(('time', 'name', 'filepath', 'type'), log_folder=logpath)
+    logger = Logger(('time', 'name', 'filepath', 'type'), log_folder=logpath,
+                    compression=args.log_compression,
+                    status_url=args.monitor_url,
+                    status_rate=args.status_rate,
+                    node_id=args.node_id)
     logger.add_agg_type('SAVED', 'speed')
     logger.add_agg_type('SAVED', 'sum')
     logger.add_agg_type('FILTERED', 'speed')
     logger.add_agg_type('FILTERED', 'sum')
+    logger.add_agg_type('FILTERED', 'latency')
 
     # create a crawler and start crawling
     crawler = Crawler(
-            crawler_engine_cls=InstagramCrawlerEngine,
-            webdriver_cls=BetterDriver,
+            crawler_engine_cls=crawler_engine_cls,
+            webdriver_cls=webdriver_cls,
             num_workers=args.nthread,
             logger=logger,
-            data_filter=data_filter)
+            data_filter=data_filter,
+            stage_workers=stage_workers,
+            log_batch_size=args.log_batch_size,
+            image_index=image_index,
+            seen_index=seen_index,
+            frontier_snapshot=args.frontier or None,
+            fetcher=fetcher,
+            async_runtime=async_runtime,
+            process_mode=args.processes,
+            driver_pool=driver_pool,
+            pacing=pacing,
+            image_store=image_store,
+            encoder=encoder)
     crawler.start()
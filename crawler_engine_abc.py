@@ -7,7 +7,7 @@ class CrawlerEngine(metaclass=ABCMeta):
     Defines abstract methods for a crawler engine.
     """
     @abstractmethod
-    def download(self, img_src, folder_name):
+    def fetch_image(self, img_src):
         pass
 
     @abstractmethod
@@ -21,7 +21,7 @@ class CrawlerEngine(metaclass=ABCMeta):
     @classmethod
     def __subclasshook__(cls, C):
         if cls is CrawlerEngine:
-            if any('download' in B.__dict__ and 'start_crawl' in B.__dict__
+            if any('fetch_image' in B.__dict__ and 'start_crawl' in B.__dict__
                     and 'close' in B.__dict__
                     and '__call__' for B in C.__mro__):
                 return True
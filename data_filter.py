@@ -1,34 +1,378 @@
 import cv2
 import sys
+import os
+import json
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# file used by openCV for detecting faces
+CASC_PATH = 'haarcascade_frontalface_default.xml'
+
+# stages of the face filter, from the cheapest to the most expensive
+STAGES = ('unreadable', 'dimension', 'contrast', 'skin', 'detect')
+
+# skin tone range in YCrCb
+SKIN_LOWER = np.array((0, 133, 77), dtype=np.uint8)
+SKIN_UPPER = np.array((255, 173, 127), dtype=np.uint8)
+
+# mean spread between the color channels below which a decoded image is taken as grayscale
+MIN_CHROMA = 4.0
+
+# cascade classifier and filter parameters owned by a pool process (see _init_process_worker)
+_process_cascade = None
+_process_params = None
+
+
+class FilterParams:
+    """
+    Parameters of the stages of the face filter. Cheap stages reject images before
+    the cascade runs on a downscaled copy of the image.
+    """
+    def __init__(self, min_dimension=64, thumb_size=64, min_std=10.0, min_entropy=4.0,
+                 min_skin_ratio=0.02, working_size=480, scale_factor=1.1, min_neighbors=5,
+                 min_face=30, stop_at_first=True):
+        """
+        Args:
+            min_dimension (int): images with a shorter side are rejected
+            thumb_size (int): side of the thumbnail the contrast and skin stages look at
+            min_std (float): images with a lower gray level deviation are rejected (blank)
+            min_entropy (float): images with a lower gray level entropy (bits) are rejected
+                (blank, text)
+            min_skin_ratio (float): color (not grayscale) images with a lower ratio of skin
+                tone pixels are rejected, 0 to disable the stage
+            working_size (int): images are downscaled to this longer side before detection
+            scale_factor (float): scale factor of the cascade
+            min_neighbors (int): minimum neighbors of the cascade
+            min_face (int): minimum face size at the original resolution
+            stop_at_first (bool): stop detecting at the first face found, largest faces first
+        """
+        self.min_dimension = min_dimension
+        self.thumb_size = thumb_size
+        self.min_std = min_std
+        self.min_entropy = min_entropy
+        self.min_skin_ratio = min_skin_ratio
+        self.working_size = working_size
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_face = min_face
+        self.stop_at_first = stop_at_first
+
+    def key(self):
+        """
+        Returns:
+            key identifying the parameters (and cascade) detection results were produced with
+        """
+        return json.dumps(dict(vars(self), cascade=os.path.basename(CASC_PATH)), sort_keys=True)
+
+
+def _read_image(image):
+    """
+    Reads the image as a (BGR or grayscale) array.
+
+    Args:
+        image: path of the image file, encoded image bytes, or an already decoded image array
+
+    Returns:
+        image array, or None if the image could not be read
+    """
+    if isinstance(image, str):
+        return cv2.imread(image)
+    if isinstance(image, bytes):
+        if len(image) == 0:
+            return None
+        return cv2.imdecode(np.frombuffer(image, dtype=np.uint8), cv2.IMREAD_COLOR)
+    return image
+
+
+def _load(image):
+    """
+    Returns:
+        the image, or what it returns if it is a loader function
+    """
+    return image() if callable(image) else image
+
+
+def _to_gray(image):
+    if image.ndim == 3:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return image
+
+
+def _is_colorless(image):
+    """
+    Returns:
+        True if the BGR image is grayscale or monochrome, whatever its channel count
+    """
+    channels = image.astype(np.int16)
+    spread = channels.max(axis=2) - channels.min(axis=2)
+    return spread.mean() < MIN_CHROMA
+
+
+def _entropy(gray):
+    """
+    Returns:
+        entropy of the gray level histogram in bits
+    """
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    p = hist[hist > 0] / gray.size
+    return float(-(p * np.log2(p)).sum())
+
+
+def _detect(cascade, gray, params, min_face):
+    """
+    Runs the cascade. When stopping at the first face, searches bands of face sizes from
+    the largest (cheapest) down, so that images with a large face end early.
+
+    Returns:
+        faces: boxes (x, y, w, h) of the faces found
+        partial (bool): True if smaller face sizes have not been searched,
+            so that there may be more faces than found
+    """
+    if not params.stop_at_first:
+        return cascade.detectMultiScale(gray, scaleFactor=params.scale_factor,
+                                        minNeighbors=params.min_neighbors,
+                                        minSize=(min_face, min_face)), False
+
+    max_face = min(gray.shape[:2])
+    while max_face >= min_face:
+        band_min = max(max_face // 2, min_face)
+        faces = cascade.detectMultiScale(gray, scaleFactor=params.scale_factor,
+                                         minNeighbors=params.min_neighbors,
+                                         minSize=(band_min, band_min),
+                                         maxSize=(max_face, max_face))
+        if len(faces) > 0:
+            return faces, band_min > min_face
+        max_face = band_min - 1
+    return (), False
+
+
+def _run_stages(cascade, image, params):
+    """
+    Runs the stages of the face filter on the image.
+
+    Returns:
+        found (bool): True if at least one face has been found
+        stage (str): stage that rejected the image, or 'face'
+        boxes (list): [x, y, w, h] of the faces found, at the original resolution
+        partial (bool): True if detection stopped before searching every face size
+    """
+    image = _read_image(image)
+    if image is None:
+        return False, 'unreadable', [], False
+
+    height, width = image.shape[:2]
+    if min(height, width) < params.min_dimension:
+        return False, 'dimension', [], False
+
+    # blank images and text have little contrast or few gray levels
+    gray = _to_gray(image)
+    thumb_size = (params.thumb_size, params.thumb_size)
+    thumb = cv2.resize(gray, thumb_size, interpolation=cv2.INTER_AREA)
+    if thumb.std() < params.min_std or _entropy(thumb) < params.min_entropy:
+        return False, 'contrast', [], False
+
+    if image.ndim == 3 and params.min_skin_ratio > 0:
+        thumb_color = cv2.resize(image, thumb_size, interpolation=cv2.INTER_AREA)
+        # grayscale photos are decoded to 3 channels too, but have no skin tone to look for
+        if not _is_colorless(thumb_color):
+            skin = cv2.inRange(cv2.cvtColor(thumb_color, cv2.COLOR_BGR2YCrCb),
+                               SKIN_LOWER, SKIN_UPPER)
+            if cv2.countNonZero(skin) < params.min_skin_ratio * skin.size:
+                return False, 'skin', [], False
+
+    # detect at the working resolution
+    scale = min(1.0, params.working_size / max(height, width))
+    min_face = params.min_face
+    if scale < 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        min_face = max(int(min_face * scale), 24)  # 24 is the window of the cascade
+    faces, partial = _detect(cascade, gray, params, min_face)
+    boxes = [[int(round(v / scale)) for v in box] for box in faces]
+    if len(boxes) > 0:
+        return True, 'face', boxes, partial
+    return False, 'detect', [], False
+
+
+def _init_process_worker(casc_path, params):
+    """
+    Initializer of a pool process. Loads the cascade once per process.
+    """
+    global _process_cascade, _process_params
+    _process_cascade = cv2.CascadeClassifier(casc_path)
+    _process_params = params
+
+
+def _detect_in_process(image):
+    return _run_stages(_process_cascade, image, _process_params)
+
 
 class DataFilter:
     """
     Data filter class used for filtering crawled image by its content.
+
+    The haar cascade is loaded once per worker (thread or process) and reused
+    for every image, and batches of images are run on a worker pool.
+    Cheap stages (dimensions, contrast, skin tone) reject images before detection,
+    and the images rejected by each stage are counted. Detection results may be kept
+    in a cache keyed by content hash, so that known images are not detected again.
     """
-    def __init__(self, data_type):
+    POOL_TYPES = ('thread', 'process')
+
+    def __init__(self, data_type, num_workers=1, pool_type='thread', params=None, cache=None):
+        if pool_type not in self.POOL_TYPES:
+            raise ValueError('pool_type must be one of {}'.format(self.POOL_TYPES))
         if data_type == 'face':
             self.detect_object = self.detect_face
-            # file used by openCV for detecting faces
-            self.casc_path = "haarcascade_frontalface_default.xml"
+            self.casc_path = CASC_PATH
+        self.num_workers = num_workers
+        self.pool_type = pool_type
+        self._local = threading.local()  # per-thread cascade classifier
+        self.params = params if params is not None else FilterParams()
+        self.params_key = self.params.key()
+        self.cache = cache  # DetectionCache of results keyed by content hash
+        self.cache_hits = 0
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stage_counts = dict.fromkeys(STAGES + ('face',), 0)
+
+    def _get_cascade(self):
+        """
+        Returns the cascade classifier of the calling thread, loading it on first use.
+        """
+        cascade = getattr(self._local, 'cascade', None)
+        if cascade is None:
+            cascade = cv2.CascadeClassifier(self.casc_path)
+            self._local.cascade = cascade
+        return cascade
+
+    def _get_pool(self):
+        """
+        Lazily creates the worker pool.
+        """
+        with self._pool_lock:
+            if self._pool is None:
+                if self.pool_type == 'process':
+                    self._pool = ProcessPoolExecutor(
+                            max_workers=self.num_workers,
+                            initializer=_init_process_worker,
+                            initargs=(self.casc_path, self.params))
+                else:
+                    self._pool = ThreadPoolExecutor(max_workers=self.num_workers)
+            return self._pool
+
+    def _detect_task(self, image):
+        return _run_stages(self._get_cascade(), image, self.params)
+
+    def _count(self, results):
+        """
+        Counts the stage deciding each result.
+
+        Returns:
+            list[dict]: detection record ('found', 'stage', 'faces', 'boxes', 'partial')
+                of each image, where 'partial' notes that faces and boxes may be incomplete
+        """
+        with self._stats_lock:
+            for _, stage, _, _ in results:
+                self.stage_counts[stage] += 1
+        return [{'found': found, 'stage': stage, 'faces': len(boxes), 'boxes': boxes,
+                 'partial': partial} for found, stage, boxes, partial in results]
 
     def detect_face(self, image_file=None):
         """
         Detects face within the image file.
+
+        Args:
+            image_file: path of the image file, or a decoded image array
+
+        Returns:
+            True if the image contains a face
         """
-        # Create the haar cascade
-        faceCascade = cv2.CascadeClassifier(self.casc_path)
+        return self._count([self._detect_task(image_file)])[0]['found']
 
-        # Read the image
-        gray = cv2.imread(image_file, 0)
+    def _run_many(self, images):
+        if self.pool_type == 'process':
+            return self._count(self.map(_detect_in_process, images))
+        return self._count(self.map(self._detect_task, images))
 
-        # Detect faces in the image
-        faces = faceCascade.detectMultiScale(
-            gray,
-            scaleFactor=1.1,
-            minNeighbors=5,
-            minSize=(30, 30)
-            # flags = cv2.CV_HAAR_SCALE_IMAGE
-        )
-        if len(faces) > 0:
-            return True
-        return False
+    def map(self, fn, items):
+        """
+        Runs fn over the items on the worker pool. fn must be picklable (a module level
+        function) for a process pool.
+
+        Returns:
+            list of the results, in the same order
+        """
+        if self.num_workers <= 1 and self.pool_type == 'thread':
+            return [fn(item) for item in items]
+        chunksize = max(1, len(items) // (self.num_workers * 4))
+        return list(self._get_pool().map(fn, items, chunksize=chunksize))
+
+    def detect_records(self, paths_or_arrays, keys=None):
+        """
+        Detects faces within a batch of images using the worker pool, skipping images
+        whose result is cached.
+
+        Args:
+            paths_or_arrays (list): image file paths, encoded image bytes or decoded image arrays,
+                or functions returning one of them, called for the uncached images only
+            keys (list): content hash of each image, None to bypass the cache
+
+        Returns:
+            list[dict]: detection record ('found', 'stage', 'faces', 'boxes', 'partial')
+                of each image, in the same order
+        """
+        images = list(paths_or_arrays)
+        if self.cache is None or keys is None:
+            return self._run_many([_load(image) for image in images]) if len(images) > 0 else []
+
+        records = self.cache.get_many(keys, self.params_key)
+        missing = [i for i, key in enumerate(keys) if key not in records]
+        with self._stats_lock:
+            self.cache_hits += len(images) - len(missing)
+        if len(missing) > 0:
+            computed = self._run_many([_load(images[i]) for i in missing])
+            self.cache.put_many(self.params_key, [(keys[i], record)
+                                                  for i, record in zip(missing, computed)])
+            records.update((keys[i], record) for i, record in zip(missing, computed))
+        return [records[key] for key in keys]
+
+    def detect_many(self, paths_or_arrays, keys=None):
+        """
+        Detects faces within a batch of images using the worker pool.
+
+        Args:
+            paths_or_arrays (list): image file paths, encoded image bytes or decoded image arrays
+            keys (list): content hash of each image, None to bypass the cache
+
+        Returns:
+            list[bool]: detection result for each image, in the same order
+        """
+        return [record['found'] for record in self.detect_records(paths_or_arrays, keys)]
+
+    def status(self):
+        """
+        Returns:
+            dict: number of filtered images, and the ratio of them rejected by each stage
+                or found to contain a face
+        """
+        with self._stats_lock:
+            counts = dict(self.stage_counts)
+        total = sum(counts.values())
+        status = {'images': total, 'cache_hits': self.cache_hits}
+        for stage, count in counts.items():
+            key = 'face_rate' if stage == 'face' else 'rejected_' + stage
+            status[key] = count / total if total > 0 else 0.0
+        return status
+
+    def close(self):
+        """
+        Shuts down the worker pool and closes the cache.
+        """
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+        if self.cache is not None:
+            self.cache.close()
@@ -0,0 +1,254 @@
+from image_store import SegmentReader, SegmentImageStore
+from sqlite_batch import BatchedSQLite
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+
+CONTENT_HASH_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+
+
+def name_key(name):
+    """
+    Returns:
+        content hash of a content hash name (e.g. '<md5 hex>.jpg'), None for other names
+    """
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return stem if CONTENT_HASH_PATTERN.match(stem) else None
+
+
+def content_key(name, data=None):
+    """
+    Returns:
+        content hash of an image: the stem of a content hash name (e.g. '<md5 hex>.jpg'),
+        otherwise the md5 of the image bytes
+    """
+    key = name_key(name)
+    if key is not None:
+        return key
+    if data is None:
+        with open(name, 'rb') as f:
+            data = f.read()
+    return hashlib.md5(data).hexdigest()
+
+
+def _partial(value):
+    """
+    Returns:
+        partial flag of a stored result, None if unknown (stored by an older version)
+    """
+    return None if value is None else bool(value)
+
+
+class DetectionCache(BatchedSQLite):
+    """
+    Persistent cache of face detection results (found, deciding stage, face count, boxes,
+    partial), keyed by image content hash and the detector parameters they were produced with.
+    Partial results stopped at the first faces found, so their face count and boxes are
+    a lower bound. Results cached before partial results were flagged report None.
+
+    Results live in a SQLite database in WAL mode, in a WITHOUT ROWID table keyed by
+    (hash, params id), so lookups stay single B-tree probes. Inserts are committed in batches.
+    """
+    def __init__(self, db_path='detections.db', commit_every=100, commit_interval=5.0):
+        """
+        Args:
+            db_path (str): sqlite database file
+            commit_every (int): number of inserts before committing
+            commit_interval (float): maximum seconds between commits of pending inserts
+        """
+        super().__init__(db_path, commit_every, commit_interval)
+        self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS params (id INTEGER PRIMARY KEY, params TEXT UNIQUE)')
+        self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS detections (hash TEXT, params_id INTEGER, '
+                'found INTEGER, stage TEXT, faces INTEGER, boxes TEXT, time REAL, '
+                'partial INTEGER, PRIMARY KEY (hash, params_id)) WITHOUT ROWID')
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(detections)')]
+        if 'partial' not in columns:  # database of an older version
+            self.conn.execute('ALTER TABLE detections ADD COLUMN partial INTEGER')
+        self.conn.commit()
+        self.params_ids = {}
+
+    def _params_id(self, params_key):
+        params_id = self.params_ids.get(params_key)
+        if params_id is None:
+            self.conn.execute('INSERT OR IGNORE INTO params (params) VALUES (?)', (params_key,))
+            params_id = self.conn.execute(
+                    'SELECT id FROM params WHERE params = ?', (params_key,)).fetchone()[0]
+            self.params_ids[params_key] = params_id
+        return params_id
+
+    def get_many(self, hashes, params_key):
+        """
+        Returns:
+            dict: detection record ('found', 'stage', 'faces', 'boxes', 'partial')
+                of the cached hashes
+        """
+        records = {}
+        with self.lock:
+            params_id = self._params_id(params_key)
+            for hash_ in set(hashes):
+                row = self.conn.execute(
+                        'SELECT found, stage, faces, boxes, partial FROM detections '
+                        'WHERE hash = ? AND params_id = ?', (hash_, params_id)).fetchone()
+                if row is not None:
+                    records[hash_] = {'found': bool(row[0]), 'stage': row[1],
+                                      'faces': row[2], 'boxes': json.loads(row[3]),
+                                      'partial': _partial(row[4])}
+        return records
+
+    def put_many(self, params_key, results):
+        """
+        Stores detection results.
+
+        Args:
+            params_key (str): key of the detector parameters (FilterParams.key())
+            results (list): (hash, detection record) pairs
+        """
+        now = time.time()
+        with self.lock:
+            params_id = self._params_id(params_key)
+            rows = [(hash_, params_id, int(r['found']), r['stage'], r['faces'],
+                     json.dumps(r['boxes']), now, int(r['partial'])) for hash_, r in results]
+            self._write_many(
+                    'INSERT OR REPLACE INTO detections '
+                    '(hash, params_id, found, stage, faces, boxes, time, partial) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def stats(self):
+        """
+        Returns:
+            list: (params, images, images with faces, faces) of each parameter set
+        """
+        with self.lock:
+            return self.conn.execute(
+                    'SELECT p.params, COUNT(*), SUM(d.found), SUM(d.faces) '
+                    'FROM detections d JOIN params p ON p.id = d.params_id '
+                    'GROUP BY d.params_id').fetchall()
+
+    def with_faces(self, params_key):
+        """
+        Yields (hash, faces, boxes, partial) of the images with faces detected under
+        the parameters, where partial notes that faces and boxes may be incomplete.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                    'SELECT hash, faces, boxes, partial FROM detections '
+                    'WHERE params_id = ? AND found = 1', (self._params_id(params_key),)).fetchall()
+        for hash_, faces, boxes, partial in rows:
+            yield hash_, faces, json.loads(boxes), _partial(partial)
+
+
+def iter_batches(root, batch_size):
+    """
+    Yields batches of (name, loader) of the images of a folder tree (flat or sharded)
+    or a segment image store, where name is the image path or segment image name and
+    loader() returns the image path or bytes. The segments stay mapped until the consumer
+    is done with the last batch.
+    """
+    if os.path.exists(os.path.join(root, SegmentImageStore.INDEX_FILE)):
+        reader = SegmentReader(root)
+        try:
+            yield from _batched(((name, lambda name=name: bytes(reader.get(name)))
+                                 for name in reader.names()), batch_size)
+        finally:
+            reader.close()
+        return
+
+    def paths():
+        for dir_path, _, file_names in os.walk(root):
+            for file_name in file_names:
+                if file_name.lower().endswith(IMAGE_EXTENSIONS):
+                    path = os.path.join(dir_path, file_name)
+                    yield path, lambda path=path: path
+    yield from _batched(paths(), batch_size)
+
+
+def _batched(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if len(batch) > 0:
+        yield batch
+
+
+def reprocess(root, data_filter, batch_size=256):
+    """
+    Runs the data filter over every image of a tree, skipping images already
+    detected with the same parameters. Hashing of images not named by their content hash
+    and detection run on the filter's worker pool.
+
+    Returns:
+        processed (int): number of images detected
+        skipped (int): number of images whose result was cached
+    """
+    processed = skipped = 0
+    for batch in iter_batches(root, batch_size):
+        keys = [name_key(name) for name, _ in batch]
+        unnamed = [i for i, key in enumerate(keys) if key is None]
+        if len(unnamed) > 0:
+            # only folder trees hold such names, so each worker reads and hashes a file
+            hashed = data_filter.map(content_key, [batch[i][0] for i in unnamed])
+            for i, key in zip(unnamed, hashed):
+                keys[i] = key
+
+        # the filter looks up the cache once and loads the uncached images only
+        cache_hits = data_filter.cache_hits
+        data_filter.detect_records([load for _, load in batch], keys)
+        cache_hits = data_filter.cache_hits - cache_hits
+        skipped += cache_hits
+        processed += len(batch) - cache_hits
+        print('Reprocessed {}, skipped {}'.format(processed, skipped))
+    return processed, skipped
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description='Face detection cache tool')
+    argparser.add_argument('command', choices=('reprocess', 'stats'))
+    argparser.add_argument('root', type=str, nargs='?', default='images',
+                           help='image folder tree or segment store to reprocess')
+    argparser.add_argument('--db', type=str, default='detections.db', help='detection cache database')
+    argparser.add_argument('--workers', type=int, default=os.cpu_count(),
+                           help='number of detection processes')
+    argparser.add_argument('--batch-size', type=int, default=256, help='images per batch')
+    argparser.add_argument('--min-neighbors', type=int, default=5)
+    argparser.add_argument('--scale-factor', type=float, default=1.1)
+    argparser.add_argument('--min-face', type=int, default=30)
+    argparser.add_argument('--min-dimension', type=int, default=64)
+    argparser.add_argument('--min-std', type=float, default=10.0)
+    argparser.add_argument('--min-entropy', type=float, default=4.0)
+    argparser.add_argument('--min-skin', type=float, default=0.02)
+    argparser.add_argument('--working-size', type=int, default=480)
+    argparser.add_argument('--all-faces', action='store_true',
+                           help='detect all faces instead of stopping at the first one')
+    args = argparser.parse_args()
+
+    cache = DetectionCache(args.db)
+    if args.command == 'stats':
+        for params, images, found, faces in cache.stats():
+            print('{}\n  images : {}, with faces : {}, faces : {}'.format(
+                    params, images, found or 0, faces or 0))
+        cache.close()
+    else:
+        from data_filter import DataFilter, FilterParams
+        params = FilterParams(min_dimension=args.min_dimension, min_std=args.min_std,
+                              min_entropy=args.min_entropy, min_skin_ratio=args.min_skin,
+                              working_size=args.working_size, scale_factor=args.scale_factor,
+                              min_neighbors=args.min_neighbors, min_face=args.min_face,
+                              stop_at_first=not args.all_faces)
+        data_filter = DataFilter('face', num_workers=args.workers, pool_type='process',
+                                 params=params, cache=cache)
+        start = time.time()
+        try:
+            processed, skipped = reprocess(args.root, data_filter, args.batch_size)
+        finally:
+            data_filter.close()  # closes the cache
+        print('Done in {:.1f}s : {} detected, {} unchanged'.format(
+                time.time() - start, processed, skipped))
@@ -0,0 +1,224 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, Thread, Event
+import queue
+import psutil
+
+
+class DriverPool:
+    """
+    Pool of web drivers with parallel warm-up, health checks and periodic recycling.
+
+    Drivers are launched in parallel. A few pre-warmed spare drivers are kept ready, so a
+    driver that has served max_pages pages, grown past max_rss_mb or stopped responding
+    is swapped for a spare without waiting for a cold start. Retired drivers quit in the
+    background. Launched drivers get page load and script timeouts, so that a hung browser
+    fails the call instead of stalling its worker.
+    """
+    LAUNCH_ATTEMPTS = 3
+
+    def __init__(self, webdriver_cls, spares=1, max_pages=1000, max_rss_mb=1500,
+                 health_timeout=10.0, launch_workers=4, page_load_timeout=30.0,
+                 script_timeout=30.0):
+        """
+        Args:
+            webdriver_cls: class creating a web driver when called
+            spares (int): number of pre-warmed spare drivers
+            max_pages (int): pages served before a driver is recycled
+            max_rss_mb (int): memory (browser process tree RSS) at which a driver is recycled
+            health_timeout (float): seconds a healthy driver takes at most to run a script
+            launch_workers (int): number of drivers launched in parallel
+            page_load_timeout (float): seconds after which a page load of a driver fails
+            script_timeout (float): seconds after which an asynchronous script of a driver fails
+        """
+        self.webdriver_cls = webdriver_cls
+        self.num_spares = spares
+        self.max_pages = max_pages
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.health_timeout = health_timeout
+        self.page_load_timeout = page_load_timeout
+        self.script_timeout = script_timeout
+        self.executor = ThreadPoolExecutor(max_workers=launch_workers)
+        self.lock = Lock()
+        self.pages = {}  # pages served by each driver in use, keyed by id(driver)
+        self.spares = queue.Queue()
+        self.stopper = Event()
+        self.recycled = 0
+
+    def _launch(self):
+        """
+        Launches a driver and waits until it is healthy.
+
+        Returns:
+            driver, or None if the driver failed to launch or is unhealthy
+        """
+        try:
+            driver = self.webdriver_cls()
+        except Exception as e:
+            print('Failed to launch driver : {}'.format(e))
+            return None
+        if self.is_healthy(driver):
+            try:
+                driver.set_page_load_timeout(self.page_load_timeout)
+                driver.set_script_timeout(self.script_timeout)
+                return driver
+            except Exception as e:
+                print('Failed to set driver timeouts : {}'.format(e))
+        self._quit(driver)
+        return None
+
+    def warm_up(self, num_drivers):
+        """
+        Launches the drivers in use plus the spares in parallel.
+
+        Returns:
+            list of num_drivers drivers to hand out to the engines
+        """
+        total = num_drivers + self.num_spares
+        drivers = []
+        for _ in range(self.LAUNCH_ATTEMPTS):
+            if len(drivers) >= total:
+                break
+            futures = [self.executor.submit(self._launch) for _ in range(total - len(drivers))]
+            drivers += [d for d in (f.result() for f in futures) if d is not None]
+        if len(drivers) < num_drivers:
+            raise self.DriverLaunchError('only {} of {} drivers are healthy'.format(
+                    len(drivers), num_drivers))
+        for driver in drivers[num_drivers:]:
+            self.spares.put(driver)
+        with self.lock:
+            for driver in drivers[:num_drivers]:
+                self.pages[id(driver)] = 0
+        return drivers[:num_drivers]
+
+    def is_healthy(self, driver):
+        """
+        Returns:
+            True if the driver runs a script within health_timeout
+        """
+        result = []
+
+        def check():
+            try:
+                result.append(driver.execute_script('return 1;'))
+            except Exception:
+                pass
+
+        # a hung geckodriver never answers, so do not wait on it beyond the timeout
+        checker = Thread(target=check, daemon=True)
+        checker.start()
+        checker.join(self.health_timeout)
+        return result == [1]
+
+    @staticmethod
+    def rss(driver):
+        """
+        Returns:
+            RSS in bytes of the driver service process and its children (the browser)
+        """
+        service = getattr(driver, 'service', None)
+        process = getattr(service, 'process', None)
+        if process is None:
+            return 0
+        try:
+            root = psutil.Process(process.pid)
+            return sum(p.memory_info().rss for p in [root] + root.children(recursive=True))
+        except psutil.Error:
+            return 0
+
+    def page_done(self, driver):
+        """
+        Counts a page served by the driver.
+        """
+        with self.lock:
+            self.pages[id(driver)] = self.pages.get(id(driver), 0) + 1
+
+    def needs_recycle(self, driver):
+        with self.lock:
+            pages = self.pages.get(id(driver), 0)
+        return pages >= self.max_pages or self.rss(driver) >= self.max_rss
+
+    def _take_spare(self):
+        """
+        Returns:
+            a healthy spare driver, cold started if no spare is ready
+
+        Raises:
+            DriverLaunchError: if no healthy driver could be launched in LAUNCH_ATTEMPTS
+        """
+        launches = 0
+        while True:
+            try:
+                spare = self.spares.get_nowait()
+            except queue.Empty:
+                if launches >= self.LAUNCH_ATTEMPTS:
+                    raise self.DriverLaunchError(
+                            'no healthy driver after {} launches'.format(launches))
+                launches += 1
+                spare = self._launch()  # no spare ready: cold start
+                if spare is None:
+                    continue
+            else:
+                if not self.is_healthy(spare):
+                    self._quit(spare)
+                    continue
+            self.executor.submit(self._refill)
+            return spare
+
+    def _refill(self):
+        if self.stopper.is_set():
+            return
+        driver = self._launch()
+        if driver is not None:
+            self.spares.put(driver)
+
+    def _quit(self, driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def replace(self, driver):
+        """
+        Retires the driver and hands out a pre-warmed spare.
+
+        Returns:
+            driver to use from now on
+        """
+        spare = self._take_spare()
+        with self.lock:
+            self.pages.pop(id(driver), None)
+            self.pages[id(spare)] = 0
+            self.recycled += 1
+        self.executor.submit(self._quit, driver)
+        return spare
+
+    def checkpoint(self, driver):
+        """
+        Called by an engine at a point where it can switch drivers (e.g. before loading
+        a new tag page). Recycles the driver if it is worn out or unhealthy.
+
+        Returns:
+            driver to use from now on
+        """
+        if self.needs_recycle(driver) or not self.is_healthy(driver):
+            return self.replace(driver)
+        return driver
+
+    def status(self):
+        return {'spares': self.spares.qsize(), 'recycled': self.recycled}
+
+    def close(self):
+        self.stopper.set()
+        while True:
+            try:
+                self._quit(self.spares.get_nowait())
+            except queue.Empty:
+                break
+        self.executor.shutdown(wait=True)
+
+    class DriverLaunchError(Exception):
+        """
+        Exception to note that not enough healthy drivers could be launched.
+        """
+        def __init__(self, message):
+            self.message = message
@@ -0,0 +1,210 @@
+from threading import Condition
+from collections import deque
+import hashlib
+import math
+import os
+import pickle
+import queue
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter of strings.
+    """
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, item):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def add(self, item):
+        for p in self._positions(item):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+
+class ScalableBloomFilter:
+    """
+    Bloom filter that adds a larger, stricter filter whenever the current one is full,
+    so the false positive rate stays bounded while memory grows only with the number of items.
+    """
+    GROWTH = 2
+    TIGHTENING = 0.5
+
+    def __init__(self, initial_capacity=100000, error_rate=0.001):
+        self.error_rate = error_rate
+        self.filters = [BloomFilter(initial_capacity, error_rate * (1 - self.TIGHTENING))]
+
+    def __contains__(self, item):
+        return any(item in f for f in self.filters)
+
+    def add(self, item):
+        curr = self.filters[-1]
+        if curr.count >= curr.capacity:
+            curr = BloomFilter(curr.capacity * self.GROWTH, curr.error_rate * self.TIGHTENING)
+            self.filters.append(curr)
+        curr.add(item)
+
+    def __len__(self):
+        return sum(f.count for f in self.filters)
+
+
+class HashtagFrontier:
+    """
+    Thread-safe frontier of hashtags to crawl.
+
+    offer() atomically checks a hashtag against the seen-set and enqueues it, so two
+    workers never enqueue the same hashtag. The seen-set is a scalable Bloom filter.
+    At most max_memory hashtags are kept in memory; the rest are spilled to disk,
+    so offer() never blocks. The frontier can be snapshotted and restored across restarts.
+    """
+    REFILL_SIZE = 1000  # hashtags read back from the spill file at once
+
+    def __init__(self, spill_path='frontier.spill', max_memory=10000,
+                 seen_capacity=100000, seen_error_rate=0.001):
+        """
+        Args:
+            spill_path (str): file holding hashtags that do not fit in memory
+            max_memory (int): maximum number of hashtags kept in memory
+            seen_capacity (int): initial capacity of the seen-set
+            seen_error_rate (float): false positive rate of the seen-set
+        """
+        self.cond = Condition()
+        self.seen = ScalableBloomFilter(seen_capacity, seen_error_rate)
+        self.memory = deque()
+        self.max_memory = max_memory
+        self.spill_path = spill_path
+        self.spill_file = None
+        self.spill_offset = 0
+        self.spill_count = 0
+
+    def _spill(self, tag):
+        if self.spill_file is None:
+            self.spill_file = open(self.spill_path, 'a+')
+            self.spill_file.truncate(0)  # drop leftovers of a previous run
+        self.spill_file.write(tag + '\n')
+        self.spill_count += 1
+
+    def _refill(self):
+        """
+        Moves hashtags from the spill file back into memory.
+        """
+        self.spill_file.flush()
+        self.spill_file.seek(self.spill_offset)
+        for _ in range(min(self.REFILL_SIZE, self.spill_count)):
+            self.memory.append(self.spill_file.readline().rstrip('\n'))
+            self.spill_count -= 1
+        self.spill_offset = self.spill_file.tell()
+        if self.spill_count == 0:
+            # everything has been read back: start over with an empty file
+            self.spill_file.seek(0)
+            self.spill_file.truncate()
+            self.spill_offset = 0
+
+    def _enqueue(self, tag):
+        # once anything is spilled, new hashtags go after it to keep FIFO order
+        if self.spill_count > 0 or len(self.memory) >= self.max_memory:
+            self._spill(tag)
+        else:
+            self.memory.append(tag)
+        self.cond.notify()
+
+    def offer(self, tag):
+        """
+        Enqueues the hashtag unless it has been seen. Never blocks.
+
+        Returns:
+            True if the hashtag has been enqueued
+        """
+        with self.cond:
+            if tag in self.seen:
+                return False
+            self.seen.add(tag)
+            self._enqueue(tag)
+            return True
+
+    def put(self, tag):
+        """
+        Enqueues the hashtag regardless of the seen-set, marking it as seen.
+        """
+        with self.cond:
+            self.seen.add(tag)
+            self._enqueue(tag)
+
+    def get(self, block=True, timeout=None):
+        """
+        Takes the next hashtag to crawl.
+
+        Raises:
+            queue.Empty: if no hashtag is available within the timeout
+        """
+        with self.cond:
+            if block:
+                self.cond.wait_for(lambda: len(self.memory) + self.spill_count > 0, timeout)
+            if len(self.memory) == 0 and self.spill_count > 0:
+                self._refill()
+            if len(self.memory) == 0:
+                raise queue.Empty
+            return self.memory.popleft()
+
+    def qsize(self):
+        with self.cond:
+            return len(self.memory) + self.spill_count
+
+    def _pending(self):
+        """
+        Returns:
+            all pending hashtags in order, without removing them
+        """
+        pending = list(self.memory)
+        if self.spill_count > 0:
+            self.spill_file.flush()
+            self.spill_file.seek(self.spill_offset)
+            pending += [self.spill_file.readline().rstrip('\n') for _ in range(self.spill_count)]
+        return pending
+
+    def snapshot(self, path):
+        """
+        Saves the seen-set and pending hashtags so the frontier can be restored after a restart.
+        """
+        with self.cond:
+            data = pickle.dumps({'seen': self.seen, 'pending': self._pending()})
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)  # never leave a half-written snapshot
+
+    def restore(self, path):
+        """
+        Restores the seen-set and pending hashtags from a snapshot.
+
+        Returns:
+            True if a snapshot has been restored
+        """
+        if not os.path.exists(path):
+            return False
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        with self.cond:
+            self.seen = state['seen']
+            for tag in state['pending']:
+                self._enqueue(tag)
+        return True
+
+    def close(self):
+        with self.cond:
+            if self.spill_file is not None:
+                self.spill_file.close()
+                self.spill_file = None
+                os.remove(self.spill_path)
@@ -0,0 +1,164 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+from PIL import Image
+import io
+import time
+
+# PIL format and file extension of each output format
+FORMATS = {
+    'jpeg': ('JPEG', 'jpg'),
+    'webp': ('WEBP', 'webp'),
+    'png': ('PNG', 'png'),
+}
+# output format re-encoding an original of each file extension
+ORIGINAL_FORMATS = {'jpg': 'jpeg', 'jpeg': 'jpeg', 'webp': 'webp', 'png': 'png'}
+
+
+class EncodeStats:
+    """
+    Bytes per image and encode time of an output format.
+    """
+    def __init__(self):
+        self.count = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.encode_time = 0.0
+
+    def add(self, bytes_in, bytes_out, encode_time):
+        self.count += 1
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+        self.encode_time += encode_time
+
+    def status(self):
+        count = max(self.count, 1)
+        return {
+            'count': self.count,
+            'bytes_in_avg': self.bytes_in / count,
+            'bytes_out_avg': self.bytes_out / count,
+            'encode_ms_avg': self.encode_time * 1000 / count,
+        }
+
+
+class ImageEncoder:
+    """
+    Encodes images to the configured output format (original bytes, JPEG or WebP),
+    optionally downscaled, on a bounded pool of encoder threads so that crawling
+    threads return to crawling right away.
+    """
+    OUTPUT_FORMATS = ('original', 'jpeg', 'webp')
+
+    def __init__(self, output_format='original', quality=85, max_dimension=None,
+                 num_workers=2, max_pending=64):
+        """
+        Args:
+            output_format (str): 'original' to keep the downloaded bytes, 'jpeg' or 'webp'
+            quality (int): quality of JPEG and WebP output (1 - 100)
+            max_dimension (int): images larger than this on a side are downscaled,
+                None to keep the resolution
+            num_workers (int): number of encoder threads
+            max_pending (int): maximum number of submitted but unfinished encodes;
+                submit() blocks beyond it
+        """
+        if output_format not in self.OUTPUT_FORMATS:
+            raise ValueError('output_format must be one of {}'.format(self.OUTPUT_FORMATS))
+        self.output_format = output_format
+        self.quality = quality
+        self.max_dimension = max_dimension
+        self.pool = ThreadPoolExecutor(max_workers=num_workers)
+        self.pending = BoundedSemaphore(max_pending)
+        self.lock = Lock()
+        self.stats = {}
+
+    def _output_format(self, extension):
+        """
+        Returns:
+            output format of an image with the file extension, or None to keep its bytes
+        """
+        if self.output_format != 'original':
+            return self.output_format
+        if self.max_dimension is None:
+            return None
+        return ORIGINAL_FORMATS.get(extension)  # re-encoded only to be downscaled
+
+    def extension(self, extension):
+        """
+        Returns:
+            file extension of the encoded image of an image with the file extension
+        """
+        output_format = self._output_format(extension)
+        return extension if output_format is None else FORMATS[output_format][1]
+
+    def needs_image(self, extension):
+        """
+        Returns:
+            True if encoding an image with the file extension decodes it
+        """
+        return self._output_format(extension) is not None
+
+    def encode(self, data, extension, image=None):
+        """
+        Encodes the image to the output format.
+
+        Args:
+            data (bytes): downloaded image bytes
+            extension (str): file extension of the downloaded image
+            image (PIL.Image.Image): the image opened from data, if already opened
+
+        Returns:
+            data (bytes): encoded image bytes
+            extension (str): file extension of the encoded image
+        """
+        start = time.time()
+        output_format = self._output_format(extension)
+        if output_format is None:
+            self._add_stats('original', len(data), len(data), 0.0)
+            return data, extension
+
+        if image is None:
+            image = Image.open(io.BytesIO(data))
+        if self.max_dimension is not None and max(image.size) > self.max_dimension:
+            image = image.copy()  # keep the caller's image intact
+            image.thumbnail((self.max_dimension, self.max_dimension), Image.LANCZOS)
+        pil_format, out_extension = FORMATS[output_format]
+        if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        out = io.BytesIO()
+        if pil_format == 'PNG':
+            image.save(out, format=pil_format)
+        else:
+            image.save(out, format=pil_format, quality=self.quality)
+        encoded = out.getvalue()
+        self._add_stats(output_format, len(data), len(encoded), time.time() - start)
+        return encoded, out_extension
+
+    def _add_stats(self, output_format, bytes_in, bytes_out, encode_time):
+        with self.lock:
+            stats = self.stats.get(output_format)
+            if stats is None:
+                stats = self.stats[output_format] = EncodeStats()
+            stats.add(bytes_in, bytes_out, encode_time)
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Runs fn on the encoder pool. Blocks while max_pending tasks are unfinished.
+
+        Returns:
+            future of the task
+        """
+        self.pending.acquire()
+        future = self.pool.submit(fn, *args, **kwargs)
+        future.add_done_callback(lambda _: self.pending.release())
+        return future
+
+    def status(self):
+        """
+        Returns:
+            dict: bytes per image and encode time, keyed by output format
+        """
+        with self.lock:
+            return {output_format: stats.status() for output_format, stats in self.stats.items()}
+
+    def close(self):
+        self.pool.shutdown(wait=True)
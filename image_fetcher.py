@@ -0,0 +1,121 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+import requests
+from requests.adapters import HTTPAdapter
+
+# file extensions of the image content types kept as original bytes
+EXTENSIONS = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/webp': 'webp',
+    'image/gif': 'gif',
+}
+
+
+class ImageFetcher:
+    """
+    Fetches original image bytes over a pooled, keep-alive HTTP session
+    on a small pool of fetch threads shared by all crawler engines.
+    """
+    def __init__(self, num_workers=4, max_pending=64, timeout=10.0, pacing=None):
+        """
+        Args:
+            num_workers (int): number of concurrent fetches
+            max_pending (int): maximum number of submitted but unfinished fetches;
+                submit() blocks beyond it
+            timeout (float): timeout of a single request in seconds
+            pacing (PacingController): per-host rate control, None for no rate limit
+        """
+        self.timeout = timeout
+        self.pacing = pacing
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=num_workers, pool_maxsize=num_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.pool = ThreadPoolExecutor(max_workers=num_workers)
+        self.pending = BoundedSemaphore(max_pending)
+        self.lock = Lock()
+        self.errors = 0  # tasks that raised
+
+    def update_from_driver(self, driver):
+        """
+        Reuses the cookies and user agent of the browser, so requests look like the browser's.
+        Must be called from the thread owning the driver.
+        """
+        for cookie in driver.get_cookies():
+            self.session.cookies.set(cookie['name'], cookie['value'],
+                                     domain=cookie.get('domain'), path=cookie.get('path', '/'))
+        self.session.headers['User-Agent'] = driver.execute_script('return navigator.userAgent;')
+
+    def get(self, url):
+        """
+        Sends a GET request, waiting for the turn of the host if paced.
+
+        Returns:
+            response
+
+        Raises:
+            FetchError: if the request failed
+        """
+        host = None
+        if self.pacing is not None:
+            host = self.pacing.host_of(url)
+            self.pacing.wait_turn(host)
+        try:
+            res = self.session.get(url, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            if host is not None:
+                self.pacing.failure(host)
+            raise self.FetchError(str(e))
+        if host is not None:
+            self.pacing.response(host, res.status_code)
+        try:
+            res.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            raise self.FetchError(str(e))
+        return res
+
+    def fetch(self, url):
+        """
+        Fetches an image.
+
+        Returns:
+            data (bytes): original image bytes
+            extension (str): file extension of the image
+
+        Raises:
+            FetchError: if the image could not be fetched
+        """
+        res = self.get(url)
+        content_type = res.headers.get('Content-Type', '').split(';')[0].strip()
+        return res.content, EXTENSIONS.get(content_type, 'jpg')
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Runs fn on the fetch pool. Blocks while max_pending tasks are unfinished.
+        Exceptions raised by fn are counted; callers add their own done-callbacks to handle them.
+
+        Returns:
+            future of the task
+        """
+        self.pending.acquire()
+        future = self.pool.submit(fn, *args, **kwargs)
+        future.add_done_callback(self._task_done)
+        return future
+
+    def _task_done(self, future):
+        self.pending.release()
+        if not future.cancelled() and future.exception() is not None:
+            with self.lock:
+                self.errors += 1
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        self.session.close()
+
+    class FetchError(Exception):
+        """
+        Exception to note that the image could not be fetched.
+        """
+        def __init__(self, message):
+            self.message = message
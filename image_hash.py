@@ -0,0 +1,152 @@
+from threading import Lock
+from PIL import Image
+import os
+
+
+def dhash(image, hash_size=8):
+    """
+    Computes the difference hash (dHash) of an image.
+    Resized or re-encoded copies of an image produce the same or a close hash.
+
+    Args:
+        image (PIL.Image.Image): image to hash
+        hash_size (int): hash has hash_size * hash_size bits
+
+    Returns:
+        hash (int): perceptual hash
+    """
+    gray = image.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = list(gray.getdata())
+    hash_ = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            hash_ = (hash_ << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return hash_
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """
+    BK-tree over integer hashes for Hamming-radius lookups.
+    """
+    def __init__(self):
+        self.root = None  # [hash, value, {distance: child node}]
+        self.size = 0
+
+    def add(self, hash_, value):
+        node = [hash_, value, {}]
+        self.size += 1
+        if self.root is None:
+            self.root = node
+            return
+        curr = self.root
+        while True:
+            dist = hamming(hash_, curr[0])
+            child = curr[2].get(dist)
+            if child is None:
+                curr[2][dist] = node
+                return
+            curr = child
+
+    def search(self, hash_, radius):
+        """
+        Returns:
+            list of (distance, value) within radius, closest first
+        """
+        found = []
+        if self.root is None:
+            return found
+        candidates = [self.root]
+        while len(candidates) > 0:
+            node = candidates.pop()
+            dist = hamming(hash_, node[0])
+            if dist <= radius:
+                found.append((dist, node[1]))
+            # triangle inequality: only children within [dist - radius, dist + radius] can match
+            for child_dist, child in node[2].items():
+                if dist - radius <= child_dist <= dist + radius:
+                    candidates.append(child)
+        found.sort(key=lambda x: x[0])
+        return found
+
+    def __len__(self):
+        return self.size
+
+
+class DuplicateIndex:
+    """
+    Thread-safe near-duplicate image index with on-disk persistence.
+
+    Hashes are kept in a BK-tree and appended to an index file as '<hash hex> <name>' lines,
+    which are loaded again on restart. Discarded names are appended as '- <name>' lines and
+    ignored by lookups until they are added again.
+    """
+    def __init__(self, index_path=None, radius=4):
+        """
+        Args:
+            index_path (str): file to persist the index in, or None to keep it in memory only
+            radius (int): maximum Hamming distance between near-duplicates
+        """
+        self.lock = Lock()
+        self.radius = radius
+        self.tree = BKTree()
+        self.discarded = set()  # names of images that were never stored
+        self.index_file = None
+        if index_path is not None:
+            if os.path.exists(index_path):
+                self.load(index_path)
+            self.index_file = open(index_path, 'a')
+
+    def load(self, index_path):
+        with open(index_path) as f:
+            for line in f:
+                hash_hex, _, name = line.rstrip('\n').partition(' ')
+                if hash_hex == '-':
+                    self.discarded.add(name)
+                elif len(hash_hex) > 0:
+                    self.tree.add(int(hash_hex, 16), name)
+                    self.discarded.discard(name)
+
+    def add_if_new(self, hash_, name):
+        """
+        Adds the hash unless a near-duplicate has already been indexed.
+
+        Returns:
+            name of the near-duplicate if found, None if the hash has been added
+        """
+        with self.lock:
+            found = [value for _, value in self.tree.search(hash_, self.radius)
+                     if value not in self.discarded]
+            if len(found) > 0:
+                return found[0]
+            self.tree.add(hash_, name)
+            self.discarded.discard(name)
+            self._append('{:x} {}\n'.format(hash_, name))
+        return None
+
+    def discard(self, name):
+        """
+        Forgets an indexed image that has not been stored after all,
+        so that it is no longer reported as the original of its near-duplicates.
+        """
+        with self.lock:
+            self.discarded.add(name)
+            self._append('- {}\n'.format(name))
+
+    def _append(self, line):
+        if self.index_file is not None:
+            self.index_file.write(line)
+            self.index_file.flush()
+
+    def __len__(self):
+        return len(self.tree)
+
+    def close(self):
+        with self.lock:
+            if self.index_file is not None:
+                self.index_file.close()
+                self.index_file = None
@@ -0,0 +1,437 @@
+from threading import Lock, get_ident
+import argparse
+import mmap
+import os
+import shutil
+import struct
+
+# metadata flags of stored images
+FILTERED = 0x01  # image contains the wanted data (e.g. a face)
+DELETED = 0x80  # image is dropped upon compaction
+
+
+def _write_atomic(path, data):
+    tmp_path = '{}.{}.tmp'.format(path, get_ident())
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class FlatImageStore:
+    """
+    Stores images as files of a single folder, and moves filtered images
+    to a separate folder (the original layout).
+    """
+    def __init__(self, folder='images', filtered_folder='faces'):
+        self.folder = folder
+        self.filtered_folder = filtered_folder
+        for folder_ in (folder, filtered_folder):
+            if folder_ is not None and not os.path.exists(folder_):
+                os.makedirs(folder_)
+
+    def _folder(self, flags):
+        if flags & FILTERED and self.filtered_folder is not None:
+            return self.filtered_folder
+        return self.folder
+
+    def path(self, name, flags=0):
+        return os.path.join(self._folder(flags), name)
+
+    def put(self, name, data, flags=0):
+        """
+        Stores the image.
+
+        Returns:
+            path of the stored image
+        """
+        path = self.path(name, flags)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def set_flags(self, name, flags):
+        """
+        Sets the metadata flags of a stored image, moving it if filtered.
+
+        Returns:
+            path of the image
+        """
+        old_path, new_path = self.path(name, self.flags(name)), self.path(name, flags)
+        if old_path != new_path:
+            os.rename(old_path, new_path)
+        return new_path
+
+    def flags(self, name):
+        if self.filtered_folder is not None and \
+                os.path.exists(os.path.join(self.filtered_folder, name)):
+            return FILTERED
+        return 0
+
+    def get(self, name):
+        """
+        Returns:
+            image bytes, or None if not stored
+        """
+        try:
+            with open(self.path(name, self.flags(name)), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def __contains__(self, name):
+        return os.path.exists(self.path(name, self.flags(name)))
+
+    def close(self):
+        pass
+
+
+class ShardedImageStore:
+    """
+    Stores images named by their content hash in a sharded directory layout
+    (ab/cd/abcd....jpg), so that no directory grows beyond a few thousand entries.
+    Flags are kept in an append-only flags log instead of moving files.
+    """
+    FLAGS_FILE = 'flags.log'
+
+    def __init__(self, root='store'):
+        self.root = root
+        self.lock = Lock()
+        self._flags = {}
+        if not os.path.exists(root):
+            os.makedirs(root)
+        flags_path = os.path.join(root, self.FLAGS_FILE)
+        if os.path.exists(flags_path):
+            with open(flags_path) as f:
+                for line in f:
+                    name, _, flags = line.rstrip('\n').partition('\t')
+                    if flags:
+                        self._flags[name] = int(flags)
+        self.flags_file = open(flags_path, 'a')
+
+    def path(self, name, flags=0):
+        return os.path.join(self.root, name[0:2], name[2:4], name)
+
+    def put(self, name, data, flags=0):
+        """
+        Stores the image, unless already stored.
+
+        Returns:
+            path of the stored image
+        """
+        path = self.path(name)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _write_atomic(path, data)
+        if flags != self.flags(name):
+            self.set_flags(name, flags)
+        return path
+
+    def set_flags(self, name, flags):
+        """
+        Sets the metadata flags of a stored image.
+
+        Returns:
+            path of the image
+        """
+        with self.lock:
+            self._flags[name] = flags
+            self.flags_file.write('{}\t{}\n'.format(name, flags))
+            self.flags_file.flush()
+        return self.path(name)
+
+    def flags(self, name):
+        with self.lock:
+            return self._flags.get(name, 0)
+
+    def get(self, name):
+        try:
+            with open(self.path(name), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def __contains__(self, name):
+        return os.path.exists(self.path(name))
+
+    def close(self):
+        with self.lock:
+            self.flags_file.close()
+
+
+class SegmentIndex:
+    """
+    Fixed-size records of the offset index of a segment store. The index is append-only
+    and the last record of a key wins, so it can be read through mmap while being written.
+    """
+    # key (md5 digest), segment number, offset, length, flags, file extension
+    RECORD = struct.Struct('<16sIQIB7s')
+
+    @staticmethod
+    def key_of(name):
+        """
+        Returns:
+            key (bytes): digest of the content hash name (e.g. '<md5 hex>.jpg')
+            extension (str): file extension
+        """
+        stem, _, extension = name.partition('.')
+        try:
+            key = bytes.fromhex(stem)
+        except ValueError:
+            key = b''
+        if len(key) != 16 or len(extension) > 7:
+            raise ValueError('not a content hash name : {}'.format(name))
+        return key, extension
+
+    @staticmethod
+    def name_of(key, extension):
+        return '{}.{}'.format(key.hex(), extension)
+
+    @classmethod
+    def pack(cls, name, segment, offset, length, flags):
+        key, extension = cls.key_of(name)
+        return cls.RECORD.pack(key, segment, offset, length, flags, extension.encode())
+
+    @classmethod
+    def load(cls, index_path):
+        """
+        Reads the index through mmap.
+
+        Returns:
+            dict: (segment, offset, length, flags) keyed by image name
+        """
+        entries = {}
+        if not os.path.exists(index_path) or os.path.getsize(index_path) == 0:
+            return entries
+        with open(index_path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                # ignore a torn record at the end
+                usable = len(buf) - len(buf) % cls.RECORD.size
+                for key, segment, offset, length, flags, extension in \
+                        cls.RECORD.iter_unpack(buf[:usable]):
+                    name = cls.name_of(key, extension.rstrip(b'\0').decode())
+                    entries[name] = (segment, offset, length, flags)
+        return entries
+
+
+class SegmentImageStore:
+    """
+    Packs images into large append-only segment files, located by an offset index
+    (see SegmentIndex). Millions of images become a few large files, which are fast
+    to back up and sync. Paths of images are virtual (root/name); use get() or
+    SegmentReader to read them.
+    """
+    INDEX_FILE = 'index.dat'
+    SEGMENT_FILE = 'segment-{:06d}.dat'
+
+    def __init__(self, root='store', segment_bytes=256 * 1024 * 1024):
+        """
+        Args:
+            root (str): folder of the segments and the index
+            segment_bytes (int): size at which a new segment is started
+        """
+        self.root = root
+        self.segment_bytes = segment_bytes
+        self.lock = Lock()
+        if not os.path.exists(root):
+            os.makedirs(root)
+        index_path = os.path.join(root, self.INDEX_FILE)
+        if os.path.exists(index_path):
+            size = os.path.getsize(index_path)
+            if size % SegmentIndex.RECORD.size != 0:
+                # drop a record torn by a crash, so that new records stay aligned
+                os.truncate(index_path, size - size % SegmentIndex.RECORD.size)
+        self.entries = SegmentIndex.load(index_path)
+        self.segment = max([s for s, _, _, _ in self.entries.values()], default=0)
+        self.segment_file = None
+        self.read_fds = {}
+        self._open_segment(self.segment)
+        self.index_file = open(index_path, 'ab')
+
+    def _open_segment(self, segment):
+        if self.segment_file is not None:
+            self.segment_file.close()
+        self.segment = segment
+        self.segment_file = open(
+                os.path.join(self.root, self.SEGMENT_FILE.format(segment)), 'ab')
+
+    def _append_record(self, name, segment, offset, length, flags):
+        self.index_file.write(SegmentIndex.pack(name, segment, offset, length, flags))
+        self.index_file.flush()
+        self.entries[name] = (segment, offset, length, flags)
+
+    def path(self, name, flags=0):
+        return os.path.join(self.root, name)
+
+    def put(self, name, data, flags=0):
+        """
+        Appends the image to the current segment, unless already stored.
+
+        Returns:
+            (virtual) path of the image
+        """
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is not None and not entry[3] & DELETED:
+                if entry[3] != flags:
+                    self._append_record(name, *entry[:3], flags)
+                return self.path(name)
+
+            offset = self.segment_file.tell()
+            if offset > 0 and offset + len(data) > self.segment_bytes:
+                self._open_segment(self.segment + 1)
+                offset = 0
+            self.segment_file.write(data)
+            self.segment_file.flush()  # data is readable before its record is
+            self._append_record(name, self.segment, offset, len(data), flags)
+        return self.path(name)
+
+    def set_flags(self, name, flags):
+        """
+        Sets the metadata flags of a stored image by appending an index record.
+
+        Returns:
+            (virtual) path of the image
+        """
+        with self.lock:
+            segment, offset, length, _ = self.entries[name]
+            self._append_record(name, segment, offset, length, flags)
+        return self.path(name)
+
+    def delete(self, name):
+        """
+        Marks the image deleted. Its bytes are dropped by the next compaction.
+        """
+        self.set_flags(name, self.flags(name) | DELETED)
+
+    def flags(self, name):
+        with self.lock:
+            entry = self.entries.get(name)
+        return 0 if entry is None else entry[3]
+
+    def get(self, name):
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is None or entry[3] & DELETED:
+                return None
+            segment, offset, length, _ = entry
+            fd = self.read_fds.get(segment)
+            if fd is None:
+                fd = os.open(os.path.join(self.root, self.SEGMENT_FILE.format(segment)), os.O_RDONLY)
+                self.read_fds[segment] = fd
+        return os.pread(fd, length, offset)
+
+    def __contains__(self, name):
+        return self.flags(name) & DELETED == 0 and name in self.entries
+
+    def close(self):
+        with self.lock:
+            self.segment_file.close()
+            self.index_file.close()
+            for fd in self.read_fds.values():
+                os.close(fd)
+            self.read_fds = {}
+
+
+class SegmentReader:
+    """
+    Read-only access to a segment store, serving images as zero-copy memoryviews
+    of the memory mapped segments.
+    """
+    def __init__(self, root):
+        self.root = root
+        self.entries = SegmentIndex.load(os.path.join(root, SegmentImageStore.INDEX_FILE))
+        self.maps = {}
+        self.closed = False
+
+    def _map(self, segment):
+        if self.closed:
+            raise ValueError('read from a closed segment reader')
+        buf = self.maps.get(segment)
+        if buf is None:
+            path = os.path.join(self.root, SegmentImageStore.SEGMENT_FILE.format(segment))
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return b''  # an empty file cannot be mapped; it holds empty images only
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.maps[segment] = buf
+        return buf
+
+    def names(self, flags=0):
+        """
+        Yields names of the live images having all of the flags.
+        """
+        for name, (_, _, _, flags_) in self.entries.items():
+            if not flags_ & DELETED and flags_ & flags == flags:
+                yield name
+
+    def flags(self, name):
+        return self.entries[name][3]
+
+    def get(self, name):
+        """
+        Returns:
+            memoryview of the image bytes, or None if not stored
+        """
+        entry = self.entries.get(name)
+        if entry is None or entry[3] & DELETED:
+            return None
+        segment, offset, length, _ = entry
+        return memoryview(self._map(segment))[offset:offset + length]
+
+    def __len__(self):
+        return sum(1 for _ in self.names())
+
+    def close(self):
+        self.closed = True
+        for buf in self.maps.values():
+            buf.close()
+        self.maps = {}
+
+
+def compact(root, segment_bytes=256 * 1024 * 1024):
+    """
+    Rewrites a (closed) segment store with live images only and a single index
+    record per image, then swaps it in place of the old one.
+
+    Returns:
+        number of live images
+    """
+    new_root = root.rstrip(os.sep) + '.compact'
+    old_root = root.rstrip(os.sep) + '.old'
+    if os.path.exists(new_root):
+        shutil.rmtree(new_root)
+
+    reader = SegmentReader(root)
+    store = SegmentImageStore(new_root, segment_bytes=segment_bytes)
+    count = 0
+    try:
+        for name in reader.names():
+            store.put(name, reader.get(name), reader.flags(name))
+            count += 1
+    finally:
+        store.close()
+        reader.close()
+
+    os.rename(root, old_root)
+    os.rename(new_root, root)
+    shutil.rmtree(old_root)
+    return count
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description='Segment image store tool')
+    argparser.add_argument('command', choices=('compact', 'stats'))
+    argparser.add_argument('root', type=str, help='folder of the segment store')
+    argparser.add_argument('--segment-bytes', type=int, default=256 * 1024 * 1024,
+                           help='size at which a new segment is started')
+    args = argparser.parse_args()
+
+    if args.command == 'compact':
+        print('Compacted {} : {} images'.format(
+                args.root, compact(args.root, args.segment_bytes)))
+    else:
+        reader = SegmentReader(args.root)
+        print('images : {}, filtered : {}, segments : {}'.format(
+                len(reader), sum(1 for _ in reader.names(FILTERED)),
+                len(set(s for s, _, _, _ in reader.entries.values()))))
+        reader.close()
@@ -1,6 +1,5 @@
 import selenium
 from selenium import webdriver
-from selenium.webdriver.common.by import By
 from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.support.ui import WebDriverWait
 from crawler_engine_abc import CrawlerEngine
@@ -15,28 +14,64 @@ import http
 import base64
 from PIL import Image
 import io
-
-
-class PhotoImgLoaded(object):
+import numpy as np
+from image_hash import dhash
+from seen_index import image_key, post_key
+from image_fetcher import ImageFetcher
+from driver_pool import DriverPool
+from image_store import FlatImageStore
+
+
+# extracts the record of the post shown at a point in a single round trip to the driver
+POST_RECORD_SCRIPT = """
+var imgOrVideo = document.elementFromPoint(arguments[0], arguments[1]);
+if (imgOrVideo === null || imgOrVideo.parentElement === null) {
+    return null;
+}
+var img = imgOrVideo.parentElement.querySelector('img');
+var article = imgOrVideo.closest('article');
+var caption = [];
+var comments = [];
+var textArea = article === null ? null : article.querySelector('ul');
+if (textArea !== null) {
+    var items = textArea.querySelectorAll('li');
+    for (var i = 0; i < items.length; i++) {
+        var elems = items[i].querySelectorAll(i === 0 ? 'span' : 'a, span');
+        for (var j = 0; j < elems.length; j++) {
+            (i === 0 ? caption : comments).push(elems[j].innerText);
+        }
+    }
+}
+var hashtags = [];
+caption.join(' ').split(/\\s+/).forEach(function (word) {
+    if (word.length > 1 && word[0] === '#') {
+        hashtags.push(word.substring(1));
+    }
+});
+return {
+    img_src: img === null ? null : img.src,
+    caption: caption,
+    comments: comments,
+    hashtags: hashtags,
+    post_url: window.location.href
+};
+"""
+
+
+class PostLoaded(object):
     """
-    Callable class for finding photo image in instagram post.
+    Callable class for extracting the record of an instagram post once its photo is loaded.
     """
     def __init__(self, location):
         self.location = location
 
     def __call__(self, driver):
         try:
-            # select image or video
             x, y = self.location
-            img_or_video = driver.get_elem_at_point(x, y)
-            img_parent = img_or_video.find_elements(By.XPATH, '..')[0]  # go to parent
-            img_elem_arr = img_parent.find_elements_by_tag_name('img')
-
-            if len(img_elem_arr) > 0:
-                img_elem = img_elem_arr[0]
-                return img_elem
-            else:
-                return False
+            record = driver.execute_script(POST_RECORD_SCRIPT, x, y)
+            if record is None or record['img_src'] is None:
+                return False  # not loaded yet, or a video
+            return record
         except:
             # catch all exception and simply return false
             # do not delegate exceptions since timeout WILL occur
@@ -86,19 +121,35 @@ class InstagramCrawlerEngine(Thread):
     Crawler engine targeted for crawling instagram photos.
     """
     RIGHT_ARROW_CLASS_NAME = 'coreSpriteRightPaginationArrow'
+    POLL_FREQUENCY = 0.05  # seconds between readiness checks of paced waits
+    QUEUE_TIMEOUT = 0.5  # seconds to block on the hashtag and log queues before checking the stopper
+    LAUNCH_BACKOFF = 10.0  # seconds to wait before retrying when no healthy driver can be launched
 
     def __init__(self, webdriver, log_queue=None, hashtag_queue=None,
-                 hashtag_duplicate=None, thread_stopper=None):
+                 thread_stopper=None, image_index=None, seen_index=None, posts_per_tag=100,
+                 fetcher=None, driver_pool=None, pacing=None, decode_pixels=True,
+                 image_store=None, encoder=None):
         super().__init__()
         self.driver = webdriver
         # different urls for different target sites
         self.base_url = 'http://www.instagram.com/explore/tags/{}'
-        self.save_folder_name = self.create_image_folder()
+        if image_store is None:
+            # original layout: all images in a single folder
+            image_store = FlatImageStore(self.create_image_folder(), filtered_folder=None)
+        self.image_store = image_store  # stores images not handed off to the log queue
+        self.encoder = encoder  # output encoding on a pool of its own, None to keep bytes inline
         self.log_queue = log_queue
-        self.hashtag_queue = hashtag_queue
-        self.hashtag_duplicate = hashtag_duplicate
+        self.hashtag_queue = hashtag_queue  # HashtagScheduler shared by all workers
+        self.current_tag = None
+        self.posts_per_tag = posts_per_tag  # posts crawled before asking the scheduler again
         self.main_window = None
         self.thread_stopper = thread_stopper
+        self.image_index = image_index  # near-duplicate index of saved images
+        self.seen_index = seen_index  # persistent index of seen posts and image sources
+        self.fetcher = fetcher  # direct HTTP image fetcher, None to download through the browser
+        self.driver_pool = driver_pool  # recycles worn out or hung drivers
+        self.pacing = pacing  # adaptive waits and per-host rate control, None for fixed waits
+        self.decode_pixels = decode_pixels  # hand off decoded pixels for the data filter
 
     def set_tag(self, tag='korea'):
         """
@@ -108,18 +159,59 @@ class InstagramCrawlerEngine(Thread):
             tag (str): search tag
 
         Returns:
-            complete url with tag included
+            complete url with tag included, or None if stopped while waiting for a tag
         """
-        tag = self.hashtag_queue.get()
-        return self.base_url.format(tag)
+        if self.current_tag is not None:
+            self.hashtag_queue.release(self.current_tag)  # let other workers pick it again
+            self.current_tag = None
+        while not self.thread_stopper.is_set():
+            try:
+                tag = self.hashtag_queue.get(timeout=self.QUEUE_TIMEOUT)
+            except queue.Empty:
+                continue
+            self.current_tag = tag
+            return self.base_url.format(tag)
+        return None
 
     def launch_driver(self):
         """
         Launch the web driver (selenium) to start crawling.
+
+        Returns:
+            True if the driver shows the tag page, False if stopped while waiting for a tag
         """
+        if self.driver_pool is not None:
+            # switch to a fresh driver if this one is worn out or unhealthy
+            self.driver = self.driver_pool.checkpoint(self.driver)
         landing_url = self.set_tag()
+        if landing_url is None:
+            return False
+        self.wait_turn(landing_url)
         self.driver.get(landing_url)
         self.driver.set_window_size(900, 600)
+        if self.fetcher is not None:
+            self.fetcher.update_from_driver(self.driver)  # reuse the browser's cookies
+        return True
+
+    def open_tag(self):
+        """
+        Launches the driver on the next tag page and gets ready for crawling, backing off
+        while the driver pool cannot launch a healthy driver.
+
+        Returns:
+            True if ready, False if stopped
+        """
+        while not self.thread_stopper.is_set():
+            try:
+                if not self.launch_driver():
+                    return False
+                self.main_window = self.init_crawl()
+                return True
+            except DriverPool.DriverLaunchError as e:
+                print('No healthy driver ({}), retrying in {}s'.format(
+                        e.message, self.LAUNCH_BACKOFF))
+                self.thread_stopper.wait(self.LAUNCH_BACKOFF)
+        return False
 
     def init_crawl(self):
         """
@@ -153,126 +245,176 @@ class InstagramCrawlerEngine(Thread):
 
         return folder_name
 
-    def download(self, img_src: str, folder: str):
+    def check_duplicate(self, image, file_name):
         """
-        Download image provided by source and save folder path.
-        Args:
-            img_src (str): image url
-            folder (str): folder name
+        Rejects near-duplicates of already saved images before they reach disk.
 
-        Returns:
-            success (bool): whether download succeeded or not
-            file_name (str): saved file name
+        Raises:
+            DuplicateImageException: if the image is a near-duplicate of a saved image
         """
-        # open the image in new tab
-        self.driver.execute_script('window.open(\'{}\', \'_blank\');'.format(img_src))
-        file_name = ''
-        success = False
+        if self.image_index is not None:
+            duplicate_of = self.image_index.add_if_new(dhash(image), file_name)
+            if duplicate_of is not None:
+                raise self.DuplicateImageException(file_name, duplicate_of)
 
-        try:
-            # Wait for 2 seconds until image is loaded on the new tab
-            larger_img = WebDriverWait(self.driver, 2).until(
-                    DownloadableImgLoaded())
-
-            # hash the source to get image file name
-            # file_hash = hashlib.sha1(img_src.encode()).hexdigest()
-            # file_hash = hashlib.md5(Image.open(img_src).tobytes()).hexdigest()
+    def fetch_http(self, img_src):
+        """
+        Fetch the original image bytes directly over HTTP, without the browser.
 
-            img = larger_img.screenshot_as_png
+        Returns:
+            (data, extension) of the image, or None if fetching failed
+        """
+        try:
+            return self.fetcher.fetch(img_src)
+        except ImageFetcher.FetchError as e:
+            print('Failed to fetch image : {}'.format(e.message))
+            return None
 
-            file_hash = hashlib.md5(img).hexdigest()
-            file_name = '{}.png'.format(file_hash)
+    def fetch_browser(self, img_src):
+        """
+        Fetch the image through the browser, as a screenshot of the image opened in a new tab.
 
-            # take screenshot of the image and save
-            print('Saving : {}'.format(file_name))  # log progress
+        Returns:
+            (data, extension) of the image, or None if fetching failed
+        """
+        # open the image in new tab
+        self.wait_turn(img_src)
+        self.driver.execute_script('window.open(\'{}\', \'_blank\');'.format(img_src))
 
-            image = Image.open(io.BytesIO(img))
-            image.save(os.path.join(folder, file_name))
-            success = True
+        try:
+            # wait until image is loaded on the new tab
+            larger_img = self.wait_until(DownloadableImgLoaded(), 'download', img_src)
+            return larger_img.screenshot_as_png, 'png'
         except TimeoutException:
             print('Failed to retrieve downloadable image')
+            return None
         finally:
             self.driver.close()  # close the tab, not the driver itself
             # switch to main window
             self.driver.switch_to.window(self.main_window)
-        return success, file_name
 
-    def find_next_img(self):
+    def fetch_image(self, img_src):
+        """
+        Fetch the image, over the direct HTTP fetch path if the engine has an image fetcher.
+
+        Returns:
+            (data, extension) of the image, or None if fetching failed
+        """
+        if self.fetcher is not None:
+            return self.fetch_http(img_src)
+        return self.fetch_browser(img_src)
+
+    def save_fetched(self, data, extension):
         """
-        Find next image to crawl and download.
+        Save fetched image bytes, encoded to the output format of the encoder if any.
+        With a log queue, the bytes are handed off with the log entry instead, and
+        the logging pipeline writes them once to their final destination after filtering.
 
         Returns:
-            url (str): image source url
+            success (bool): always True
+            file_name (str): saved file name
+            image (dict): 'data' (image bytes) and 'pixels' (decoded BGR array, or None)
+                to hand off with the log entry, or None if already written
+
+        Raises:
+            DuplicateImageException: if the image is a near-duplicate of a saved image
+        """
+        # named by the fetched content, whatever the output format
+        if self.encoder is not None:
+            out_extension = self.encoder.extension(extension)
+        else:
+            out_extension = extension
+        file_name = '{}.{}'.format(hashlib.md5(data).hexdigest(), out_extension)
+        print('Saving : {}'.format(file_name))  # log progress
+        handoff = self.log_queue is not None
+        decode_pixels = handoff and self.decode_pixels
+        image = None
+        if self.image_index is not None or decode_pixels or \
+                (self.encoder is not None and self.encoder.needs_image(extension)):
+            # decode once, for the duplicate check, the data filter and the encoder
+            image = Image.open(io.BytesIO(data))
+            image.load()
+        if self.image_index is not None:
+            self.check_duplicate(image, file_name)
+        pixels = None
+        if decode_pixels:
+            # BGR channel order, as the data filter (OpenCV) expects
+            pixels = np.ascontiguousarray(np.asarray(image.convert('RGB'))[:, :, ::-1])
+        if self.encoder is not None:
+            data, _ = self.encoder.encode(data, extension, image)
+
+        if handoff:
+            return True, file_name, {'data': data, 'pixels': pixels}
+
+        self.image_store.put(file_name, data)
+        return True, file_name, None
+
+    def is_seen(self, key):
+        """
+        Checks the seen index for a post or image key.
+
+        Returns:
+            True if the key has already been crawled
+        """
+        return self.seen_index is not None and self.seen_index.contains(key)
+
+    def skip_seen(self, seen_keys, hashtag):
+        """
+        Checks the seen index for the post and image keys of a post. A post already seen
+        counts as a pull without yield of the hashtag, so that exhausted hashtags lose priority.
+
+        Returns:
+            True if the post or its image has already been crawled
+        """
+        if self.is_seen(seen_keys[0]):
+            pass
+        elif self.is_seen(seen_keys[1]):
+            self.seen_index.add(seen_keys)  # the image of another post
+        else:
+            return False
+        record = getattr(self.hashtag_queue, 'record', None)  # a plain frontier keeps no yield
+        if record is not None:
+            record({'hashtag': hashtag, 'type': 'SEEN'})
+        return True
+
+    def find_next_post(self):
+        """
+        Find the record of the next post to crawl, extracted in a single script call.
+
+        Returns:
+            record (dict): 'img_src', 'caption' (list of texts), 'comments' (list of texts),
+                'hashtags' (without '#') and 'post_url' of the post
         """
         try:
-            img_elem = WebDriverWait(self.driver, 2).until(
-                    PhotoImgLoaded(location=(250, 200)))
+            # video posts never show a photo, so their timeouts are no sign of slowness
+            return self.wait_until(PostLoaded(location=(250, 200)), 'post',
+                                   timeout_is_failure=False)
         except TimeoutException:
             raise self.ImageNotFoundException('Image Not Found')
-        return img_elem.get_attribute('src')
 
     def go_next_post(self):
         """
         Proceed to next post of instagram.
         """
+        self.wait_turn(self.base_url)
         # find right arrow and click. if not found, start again
         try:
             self.driver.find_element_by_class_name(self.RIGHT_ARROW_CLASS_NAME).click()
         except selenium.common.exceptions.NoSuchElementException:
             self.start_crawl()
 
-    def find_text(self):
-        """
-        Find text of instagram post.
-        """
-        img_or_video = self.driver.get_elem_at_point(250, 200)
-        parent_dom = img_or_video.find_elements(By.XPATH, '..')[0]  # go to parent
-        while not parent_dom.tag_name == 'article':
-            parent_dom = parent_dom.find_elements(By.XPATH, '..')[0]
-
-        text_area = parent_dom.find_elements_by_tag_name('ul')[0]
-        children_list_elems = text_area.find_elements_by_tag_name('li')
-        main_post_texts = children_list_elems[0]
-        main_text_elem = main_post_texts.find_elements_by_tag_name('span')
-        main_text = []
-        for main_span in main_text_elem:
-            main_text.append(main_span.text)
-
-        other_comments = children_list_elems[1:]
-        comment_text = []
-
-        for li in other_comments:
-            links = li.find_elements_by_tag_name('a')
-            for lin in links:
-                comment_text.append(lin.text)
-            spans = li.find_elements_by_tag_name('span')
-            for sp in spans:
-                comment_text.append(sp.text)
-
-        return main_text, comment_text
-
-    def add_hashtag(self):
+    def add_hashtag(self, record):
         """
         Add hashtags of the post to queue.
+
+        Args:
+            record (dict): post record from find_next_post()
         """
-        img_or_video = self.driver.get_elem_at_point(250, 200)
-        parent_dom = img_or_video.find_elements(By.XPATH, '..')[0]  # go to parent
-        while not parent_dom.tag_name == 'article':
-            parent_dom = parent_dom.find_elements(By.XPATH, '..')[0]
-        text_area = parent_dom.find_elements_by_tag_name('ul')[0]
-        children_list_elems = text_area.find_elements_by_tag_name('li')
-        main_post_texts = children_list_elems[0]
-        main_text_elem = main_post_texts.find_elements_by_tag_name('span')
-        for main_span in main_text_elem:
-            main_span_splits = main_span.text.split(" ")
+        for tag in record['hashtags']:
             if self.hashtag_queue.qsize() >= 20:
                 break
-            for word in main_span_splits:
-                if (len(word) > 0
-                        and word[0] == '#'
-                        and word[1:] not in self.hashtag_duplicate):
-                    self.hashtag_queue.put(word[1:])
-                    self.hashtag_duplicate.add(word[1:])
+            # atomic check-and-enqueue, never blocks
+            self.hashtag_queue.offer(tag)
 
     def close(self):
         """
@@ -282,11 +424,59 @@ class InstagramCrawlerEngine(Thread):
 
     def rest(self):
         """
-        Rest for 2 seconds.
+        Rest until the post view is ready, or for 2 seconds without pacing.
+        """
+        if self.pacing is None:
+            time.sleep(2)
+            return
+        try:
+            self.wait_until(
+                    lambda d: d.find_elements_by_class_name(self.RIGHT_ARROW_CLASS_NAME), 'view')
+        except TimeoutException:
+            pass
+
+    def wait_turn(self, url):
+        """
+        Waits until the rate limit of the url's host allows another request.
+        """
+        if self.pacing is not None:
+            self.pacing.wait_turn(self.pacing.host_of(url), self.thread_stopper)
+
+    def wait_until(self, condition, key, url=None, timeout_is_failure=True):
+        """
+        Waits until the condition holds. The timeout adapts to the observed readiness
+        latency of `key` if paced, otherwise it is fixed to 2 seconds.
+
+        Args:
+            condition: callable taking the driver, returning a truthy value when ready
+            key (str): kind of wait whose latency is learned
+            url (str): url being waited on, defaults to the crawled site
+            timeout_is_failure (bool): whether a timeout widens the timeout and counts
+                as a failure of the host
+
+        Returns:
+            return value of the condition
+
+        Raises:
+            TimeoutException: if the condition does not hold within the timeout
         """
-        time.sleep(2)
+        if self.pacing is None:
+            return WebDriverWait(self.driver, 2).until(condition)
+
+        host = self.pacing.host_of(url or self.base_url)
+        start = time.time()
+        try:
+            result = WebDriverWait(self.driver, self.pacing.timeout(key),
+                                   poll_frequency=self.POLL_FREQUENCY).until(condition)
+        except TimeoutException:
+            if timeout_is_failure:
+                self.pacing.timed_out(key, host)
+            raise
+        self.pacing.observe(key, time.time() - start)
+        self.pacing.success(host)
+        return result
 
-    def __call__(self, log_queue=None, hashtag_queue=None, hashtag_duplicate=None):
+    def __call__(self, log_queue=None, hashtag_queue=None):
         """
         Make the class instance callable.
 
@@ -295,7 +485,6 @@ class InstagramCrawlerEngine(Thread):
         """
         self.log_queue = log_queue
         self.hashtag_queue = hashtag_queue
-        self.hashtag_duplicate = hashtag_duplicate
         self.start_crawl()
 
     def run(self):
@@ -305,6 +494,100 @@ class InstagramCrawlerEngine(Thread):
         """
         self.start_crawl()
 
+    def process_image(self, image_src, seen_keys, hashtag):
+        """
+        Downloads the image, marks it as seen and logs the download event.
+
+        Args:
+            image_src (str): image url
+            seen_keys (list): seen index keys of the post and the image
+            hashtag (str): hashtag the image has been crawled from
+        """
+        fetched = self.fetch_image(image_src)
+        if fetched is None:
+            self.log_download(False, '', False, seen_keys, hashtag)
+        elif self.encoder is not None:
+            # hash, decode and encode on the encoder pool, and return to crawling
+            self.submit_image(self.encoder, self.store_image, fetched, seen_keys, hashtag)
+        else:
+            self.store_image(fetched, seen_keys, hashtag)
+
+    def submit_image(self, pool, fn, image, seen_keys, hashtag):
+        """
+        Runs fn(image, seen_keys, hashtag) on the fetch or encoder pool, and logs
+        the download as failed if it raises, so that no image vanishes silently.
+        """
+        future = pool.submit(fn, image, seen_keys, hashtag)
+        future.add_done_callback(lambda f: self.log_task_failure(f, seen_keys, hashtag))
+
+    def log_task_failure(self, future, seen_keys, hashtag):
+        if future.cancelled() or future.exception() is None:
+            return
+        print('Image task failed : {!r}'.format(future.exception()))
+        self.log_download(False, '', False, seen_keys, hashtag)
+
+    def store_image(self, fetched, seen_keys, hashtag):
+        """
+        Saves (or hands off) a fetched image and logs the download event.
+
+        Args:
+            fetched (tuple): data and file extension of the fetched image
+        """
+        duplicate = False
+        image = None
+        try:
+            success, filename, image = self.save_fetched(*fetched)
+        except self.DuplicateImageException as e:
+            print('Duplicate of {} : {}'.format(e.duplicate_of, e.message))
+            success, filename, duplicate = False, e.message, True
+        except (IOError, ValueError) as e:  # undecodable image
+            print('Failed to save image : {}'.format(e))
+            success, filename = False, ''
+        self.log_download(success, filename, duplicate, seen_keys, hashtag, image)
+
+    def log_download(self, success, filename, duplicate, seen_keys, hashtag, image=None):
+        """
+        Logs the download event, and marks the image as seen unless the logging pipeline
+        does so once the entry has been persisted.
+
+        Args:
+            image (dict): image bytes and pixels handed off with the log entry, if not written yet
+        """
+        if self.log_queue is None and self.seen_index is not None and (success or duplicate):
+            self.seen_index.add(seen_keys)
+
+        # log the download event
+        log_entry = {
+            'time': time.time(),
+            'name': filename,
+            'filepath': self.image_store.path(filename),
+            'success': success,
+            'duplicate': duplicate,
+            'hashtag': hashtag,
+        }
+        print(log_entry)
+        if image is not None:
+            log_entry.update(image)
+
+        if self.log_queue is not None:
+            log_entry['seen_keys'] = seen_keys
+            self.put_log(log_entry)
+
+    def put_log(self, log_entry):
+        """
+        Puts a log entry to the log queue, blocking while it is full.
+        Gives up when stopped, as the logging pipeline no longer takes entries then.
+        """
+        while not self.thread_stopper.is_set():
+            try:
+                self.log_queue.put(log_entry, timeout=self.QUEUE_TIMEOUT)
+                return
+            except queue.Full:
+                continue
+        print('Stopped, dropping log entry of {}'.format(log_entry['name']))
+        if self.image_index is not None and log_entry.get('data') is not None:
+            self.image_index.discard(log_entry['name'])  # never stored, so no original
+
     def start_crawl(self):
         """
         Infinite loop of crawling.
@@ -312,31 +595,36 @@ class InstagramCrawlerEngine(Thread):
         Args:
             log_queue (queue.Queue): thread-safe queue for collecting download status.
         """
-        self.launch_driver()
-        self.main_window = self.init_crawl()
+        self.open_tag()
 
         count = 0  # keep track of crawl count
         while not self.thread_stopper.is_set():
             count += 1
+            if count > self.posts_per_tag:
+                # let the scheduler decide whether another hashtag yields more
+                if not self.open_tag():
+                    break
+                count = 1
             try:
                 self.go_next_post()
-                image_src = self.find_next_img()
-                success, filename = self.download(
-                        img_src=image_src, folder=self.save_folder_name)
+                if self.driver_pool is not None:
+                    self.driver_pool.page_done(self.driver)
+                record = self.find_next_post()
+                # skip posts and images already seen, including before a restart
+                image_src = record['img_src']
+                seen_keys = [post_key(record['post_url']), image_key(image_src)]
+                if self.skip_seen(seen_keys, self.current_tag):
+                    continue
+
+                if self.fetcher is not None:
+                    # fetch on the pool and return to the next post immediately
+                    self.submit_image(self.fetcher, self.process_image, image_src, seen_keys,
+                                      self.current_tag)
+                else:
+                    self.process_image(image_src, seen_keys, self.current_tag)
+
                 if self.hashtag_queue.qsize() < 20:
-                    self.add_hashtag()  # add to hashtag queue
-
-                # log the download event
-                log_entry = {
-                    'time': time.time(),
-                    'name': filename,
-                    'filepath': os.path.join(self.save_folder_name, filename),
-                    'success': success,
-                }
-                print(log_entry)
-
-                if self.log_queue is not None:
-                    self.log_queue.put(log_entry)
+                    self.add_hashtag(record)  # add to hashtag queue
             except (self.ImageNotFoundException,
                 selenium.common.exceptions.StaleElementReferenceException):
                 # image not found for this step
@@ -347,6 +635,18 @@ class InstagramCrawlerEngine(Thread):
             except (ConnectionRefusedError, http.client.RemoteDisconnected):
                 print('Driver closed by SIGINT or connection refused from target host.')
                 break
+            except selenium.common.exceptions.WebDriverException as e:
+                if self.driver_pool is None or self.thread_stopper.is_set():
+                    raise
+                if self.driver_pool.is_healthy(self.driver):
+                    # transient failure (e.g. a missed click or a page load timeout)
+                    print('Driver call failed : {}'.format(e))
+                    continue
+                # the driver is broken: the checkpoint continues on a pre-warmed spare
+                print('Driver failed ({}), replacing it'.format(e))
+                if not self.open_tag():
+                    break
+                count = 0
         print('RETURNING from start_crawl() and closing thread id : {}.'.format(threading.get_ident()))
 
     class ImageNotFoundException(Exception):
@@ -356,6 +656,14 @@ class InstagramCrawlerEngine(Thread):
         def __init__(self, message):
             self.message = message
 
+    class DuplicateImageException(Exception):
+        """
+        Exception to note that the image is a near-duplicate of an already saved image.
+        """
+        def __init__(self, message, duplicate_of):
+            self.message = message
+            self.duplicate_of = duplicate_of
+
 
 
 if __name__ == '__main__':
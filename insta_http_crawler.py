@@ -0,0 +1,240 @@
+from insta_crawler import InstagramCrawlerEngine
+from image_fetcher import ImageFetcher, EXTENSIONS
+from seen_index import image_key
+from detection_cache import content_key
+from urllib.parse import urlencode
+import threading
+import asyncio
+import json
+import re
+import queue
+
+# embedded page data of instagram html pages
+SHARED_DATA_PATTERN = re.compile(r'window\._sharedData\s*=\s*(\{.*?\});</script>', re.DOTALL)
+HASHTAG_PATTERN = re.compile(r'#(\w+)', re.UNICODE)
+
+
+def parse_tag_page(text):
+    """
+    Parses a tag page, either the JSON (?__a=1) response or the HTML page
+    embedding window._sharedData.
+
+    Returns:
+        posts (list[dict]): 'id', 'shortcode', 'img_src' and 'caption' of each post
+        end_cursor (str): cursor of the next page, or None if this is the last page
+    """
+    text = text.strip()
+    if text.startswith('{'):
+        data = json.loads(text)
+    else:
+        match = SHARED_DATA_PATTERN.search(text)
+        if match is None:
+            return [], None
+        data = json.loads(match.group(1))
+        data = data['entry_data']['TagPage'][0]
+
+    media = data['graphql']['hashtag']['edge_hashtag_to_media']
+    posts = []
+    for edge in media['edges']:
+        node = edge['node']
+        captions = node.get('edge_media_to_caption', {}).get('edges', [])
+        posts.append({
+            'id': node.get('id'),
+            'shortcode': node.get('shortcode'),
+            'img_src': node.get('display_url'),
+            'is_video': node.get('is_video', False),
+            'caption': captions[0]['node']['text'] if len(captions) > 0 else '',
+        })
+
+    page_info = media.get('page_info', {})
+    end_cursor = page_info.get('end_cursor') if page_info.get('has_next_page') else None
+    return posts, end_cursor
+
+
+class InstagramHttpCrawlerEngine(InstagramCrawlerEngine):
+    """
+    Browserless crawler engine for instagram.
+
+    Discovers posts, image urls and hashtags by fetching tag pages over plain HTTP
+    and parsing their embedded JSON, paginating with cursors. Images are downloaded
+    concurrently on the fetch pool. Uses the same log_queue / hashtag_queue contract
+    as the browser-driven engine.
+    """
+    def __init__(self, webdriver=None, log_queue=None, hashtag_queue=None,
+                 thread_stopper=None, image_index=None, seen_index=None, posts_per_tag=100,
+                 fetcher=None, driver_pool=None, pacing=None, decode_pixels=True,
+                 image_store=None, encoder=None, base_url='https://www.instagram.com/explore/tags/{}/'):
+        self.owns_fetcher = fetcher is None  # close only a fetcher created by this engine
+        super().__init__(webdriver, log_queue=log_queue, hashtag_queue=hashtag_queue,
+                         thread_stopper=thread_stopper, image_index=image_index,
+                         seen_index=seen_index, posts_per_tag=posts_per_tag,
+                         fetcher=fetcher if fetcher is not None else ImageFetcher(pacing=pacing),
+                         driver_pool=driver_pool, pacing=pacing, decode_pixels=decode_pixels,
+                         image_store=image_store, encoder=encoder)
+        self.base_url = base_url
+
+    def page_url(self, tag, cursor=None):
+        params = {'__a': 1}
+        if cursor is not None:
+            params['max_id'] = cursor
+        return self.base_url.format(tag) + '?' + urlencode(params)
+
+    def fetch_page(self, url):
+        """
+        Returns:
+            page text, or None if the page could not be fetched
+        """
+        try:
+            return self.fetcher.get(url).text
+        except ImageFetcher.FetchError as e:
+            print('Failed to fetch page {} : {}'.format(url, e.message))
+            return None
+
+    def add_hashtags_from(self, caption):
+        """
+        Add hashtags of a caption to the hashtag queue.
+        """
+        for tag in HASHTAG_PATTERN.findall(caption):
+            if self.hashtag_queue.qsize() >= 20:
+                break
+            self.hashtag_queue.offer(tag)
+
+    def crawl_tag(self, tag):
+        """
+        Crawls posts of a single tag page by page, up to posts_per_tag posts.
+        """
+        cursor = None
+        count = 0
+        while count < self.posts_per_tag and not self.thread_stopper.is_set():
+            text = self.fetch_page(self.page_url(tag, cursor))
+            if text is None:
+                return
+            try:
+                posts, cursor = parse_tag_page(text)
+            except (ValueError, KeyError, IndexError) as e:
+                print('Failed to parse tag page of {} : {}'.format(tag, e))
+                return
+
+            for post in posts:
+                count += 1
+                self.add_hashtags_from(post['caption'])
+                if post['is_video'] or post['img_src'] is None:
+                    continue
+                seen_keys = ['post:' + str(post['shortcode']), image_key(post['img_src'])]
+                if self.skip_seen(seen_keys, tag):
+                    continue
+                self.submit_image(self.fetcher, self.process_image, post['img_src'], seen_keys, tag)
+
+            if cursor is None:
+                return  # last page
+
+    def start_crawl(self):
+        """
+        Infinite loop of crawling, one tag at a time.
+        """
+        while not self.thread_stopper.is_set():
+            if self.current_tag is not None:
+                self.hashtag_queue.release(self.current_tag)
+            try:
+                self.current_tag = self.hashtag_queue.get(timeout=1)
+            except queue.Empty:
+                self.current_tag = None
+                continue
+            self.crawl_tag(self.current_tag)
+        print('RETURNING from start_crawl() and closing thread id : {}.'.format(threading.get_ident()))
+
+    def close(self):
+        """
+        Close and stop crawling.
+        """
+        if self.owns_fetcher:
+            self.fetcher.close()
+
+
+class AsyncInstagramHttpCrawlerEngine(InstagramHttpCrawlerEngine):
+    """
+    Browserless crawler engine for instagram running on an AsyncRuntime.
+
+    Crawls `tasks` tags concurrently, and every image download is a separate task on
+    the event loop. Blocking work (saving, seen index, log queue) is offloaded to the
+    runtime's executor, and the data filter, if the runtime has one, to its filter executor.
+    """
+    TAG_POLL_INTERVAL = 0.5  # seconds between polls of an empty hashtag queue
+
+    def __init__(self, webdriver=None, tasks=8, **kwargs):
+        super().__init__(webdriver, **kwargs)
+        self.tasks = tasks
+
+    async def crawl_image_async(self, runtime, img_src, seen_keys, tag):
+        duplicate = False
+        image = None
+        try:
+            data, content_type = await runtime.fetch(img_src)
+            success, filename, image = await runtime.offload(
+                    self.save_fetched, data, EXTENSIONS.get(content_type, 'jpg'))
+            if image is not None and image['pixels'] is not None \
+                    and runtime.data_filter is not None:
+                # filtered here, so the pixels need not wait in the log queue
+                image['wanted'] = await runtime.detect(image['pixels'], content_key(filename))
+                image['pixels'] = None
+        except runtime.FetchError as e:
+            print('Failed to fetch image : {}'.format(e.message))
+            success, filename = False, ''
+        except self.DuplicateImageException as e:
+            print('Duplicate of {} : {}'.format(e.duplicate_of, e.message))
+            success, filename, duplicate = False, e.message, True
+        except (IOError, ValueError) as e:  # undecodable image
+            print('Failed to save image : {}'.format(e))
+            success, filename, image = False, '', None
+        # blocks while the log queue is full, which holds back this task's slot
+        await runtime.offload(self.log_download, success, filename, duplicate, seen_keys, tag,
+                              image)
+
+    async def crawl_tag_async(self, runtime, tag):
+        """
+        Crawls posts of a single tag page by page, up to posts_per_tag posts.
+        """
+        cursor = None
+        count = 0
+        while count < self.posts_per_tag:
+            try:
+                data, _ = await runtime.fetch(self.page_url(tag, cursor))
+                posts, cursor = parse_tag_page(data.decode('utf-8', 'replace'))
+            except runtime.FetchError as e:
+                print('Failed to fetch page : {}'.format(e.message))
+                return
+            except (ValueError, KeyError, IndexError) as e:
+                print('Failed to parse tag page of {} : {}'.format(tag, e))
+                return
+
+            for post in posts:
+                count += 1
+                self.add_hashtags_from(post['caption'])
+                if post['is_video'] or post['img_src'] is None:
+                    continue
+                seen_keys = ['post:' + str(post['shortcode']), image_key(post['img_src'])]
+                if await runtime.offload(self.skip_seen, seen_keys, tag):
+                    continue
+                await runtime.spawn(self.crawl_image_async(runtime, post['img_src'], seen_keys, tag))
+
+            if cursor is None:
+                return  # last page
+
+    async def tag_loop(self, runtime):
+        while not self.thread_stopper.is_set():
+            # poll without blocking, so waiting tag loops hold no executor threads
+            try:
+                tag = await runtime.offload(self.hashtag_queue.get, False)
+            except queue.Empty:
+                await asyncio.sleep(self.TAG_POLL_INTERVAL)
+                continue
+            try:
+                await self.crawl_tag_async(runtime, tag)
+            finally:
+                self.hashtag_queue.release(tag)
+
+    async def start_crawl_async(self, runtime):
+        """
+        Crawls `tasks` tags concurrently until stopped.
+        """
+        await asyncio.gather(*[self.tag_loop(runtime) for _ in range(self.tasks)])
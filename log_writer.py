@@ -0,0 +1,172 @@
+from threading import Thread, Condition
+from concurrent.futures import ThreadPoolExecutor
+import os
+import time
+import gzip
+import shutil
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class LogWriter:
+    """
+    Buffered log file writer.
+
+    Lines are buffered in memory and written by a background thread whenever the buffer
+    grows past flush_bytes or flush_interval seconds have passed, so callers never block
+    on disk. Log files are rotated by size, and closed segments can be compressed
+    in the background.
+    """
+    COMPRESSIONS = (None, 'gzip', 'zstd')
+
+    def __init__(self, log_folder, header, max_file_bytes=64 * 1024 * 1024,
+                 flush_bytes=256 * 1024, flush_interval=1.0, compression=None):
+        """
+        Args:
+            log_folder (str): folder to write the log files in
+            header (str): header line written at the top of every log file
+            max_file_bytes (int): log file is rotated once it grows past this size
+            flush_bytes (int): buffered bytes that trigger a flush
+            flush_interval (float): maximum seconds between flushes
+            compression (str): None, 'gzip' or 'zstd' for compressing rotated log files
+        """
+        if compression not in self.COMPRESSIONS:
+            raise ValueError('compression must be one of {}'.format(self.COMPRESSIONS))
+        if compression == 'zstd' and zstandard is None:
+            raise ValueError('zstd compression requires the zstandard package')
+
+        if not os.path.exists(log_folder):
+            # create the folder if not exists
+            os.makedirs(log_folder)
+
+        self.log_folder = log_folder
+        self.header = header
+        self.max_file_bytes = max_file_bytes
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.compression = compression
+
+        self.curr_file = None
+        self.curr_path = None
+        self.curr_file_size = 0
+        self.file_seq = 0
+
+        self.buffer = []
+        self.buffer_bytes = 0
+        self.closed = False
+        self.cond = Condition()
+        self.compressor = ThreadPoolExecutor(max_workers=1) if compression is not None else None
+
+        self.open_new_file()
+        self.flush_thread = Thread(target=self._run, daemon=True)
+        self.flush_thread.start()
+
+    def open_new_file(self):
+        """
+        Closes the current log file and opens a new one.
+        File names have microsecond resolution and a sequence number,
+        so that rotations within the same second never collide.
+        """
+        self.close_file()
+
+        now = time.time()
+        filename = '{}.{:06d}-{}.csv'.format(
+                time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now)),
+                int((now % 1) * 1e6), self.file_seq)
+        self.file_seq += 1
+        self.curr_path = os.path.join(self.log_folder, filename)
+        self.curr_file = open(self.curr_path, 'wb')
+        header = (self.header + '\n').encode()
+        self.curr_file.write(header)
+        self.curr_file_size = self.header_size = len(header)
+
+    def close_file(self):
+        """
+        Closes the current log file and hands it to the compressor.
+        """
+        if self.curr_file is None:
+            return
+        self.curr_file.close()
+        if self.compressor is not None:
+            self.compressor.submit(self.compress, self.curr_path, self.compression)
+        self.curr_file = None
+
+    @staticmethod
+    def compress(path, compression):
+        """
+        Compresses a closed log file and removes the original.
+        """
+        if compression == 'gzip':
+            with open(path, 'rb') as src, gzip.open(path + '.gz', 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+        elif compression == 'zstd':
+            with open(path, 'rb') as src, open(path + '.zst', 'wb') as dst:
+                zstandard.ZstdCompressor().copy_stream(src, dst)
+        else:
+            return
+        os.remove(path)
+
+    def write(self, lines):
+        """
+        Buffers lines to be written. Never blocks on disk.
+
+        Args:
+            lines (list[str]): lines including the trailing newline
+
+        Raises:
+            ValueError: if the writer has been closed
+        """
+        data = ''.join(lines).encode()
+        with self.cond:
+            if self.closed:
+                # nothing would flush the buffer anymore
+                raise ValueError('write to a closed log writer')
+            self.buffer.append(data)
+            self.buffer_bytes += len(data)
+            if self.buffer_bytes >= self.flush_bytes:
+                self.cond.notify()
+
+    def _take_buffer(self):
+        chunk = b''.join(self.buffer)
+        self.buffer = []
+        self.buffer_bytes = 0
+        return chunk
+
+    def _write_chunk(self, chunk):
+        if len(chunk) == 0:
+            return
+        if (self.curr_file_size > self.header_size
+                and self.curr_file_size + len(chunk) > self.max_file_bytes):
+            self.open_new_file()
+        self.curr_file.write(chunk)
+        self.curr_file.flush()
+        self.curr_file_size += len(chunk)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(
+                        lambda: self.closed or self.buffer_bytes >= self.flush_bytes,
+                        timeout=self.flush_interval)
+                chunk = self._take_buffer()
+                closed = self.closed
+            self._write_chunk(chunk)
+            if closed:
+                break
+
+    def close(self):
+        """
+        Flushes the remaining buffer, closes the log file and waits for compression to finish.
+        """
+        with self.cond:
+            if self.closed:
+                return
+            self.closed = True
+            self.cond.notify()
+        self.flush_thread.join()
+        self.close_file()
+        if self.compressor is not None:
+            self.compressor.shutdown(wait=True)
@@ -1,80 +1,80 @@
+from log_writer import LogWriter
+from aggregator import AGGREGATORS
+from status_publisher import StatusPublisher
 import os
-import requests
-import psutil
+import socket
 import time
-import subprocess
-import json
 
 
 class Logger:
     """
     Logger class.
     """
-    curr_file = None
-    curr_file_size = 0
-    agg_dict = {}
-
-    def __init__(self, columns, log_folder='./'):
-        self.create_new_log_file(columns, log_folder)
-
-    def create_new_log_file(self, columns, log_folder):
+    def __init__(self, columns, log_folder='./', max_file_bytes=64 * 1024 * 1024,
+                 flush_bytes=256 * 1024, flush_interval=1.0, compression=None,
+                 status_url='http://127.0.0.1:8080', status_rate=1.0, node_id=None):
         """
-        Creates a new logfile specified by the provided columns.
-
         Args:
             columns: list of column names
+            log_folder (str): folder to save the logs in
+            max_file_bytes (int): size in bytes at which the log file is rotated
+            flush_bytes (int): buffered bytes that trigger writing to disk
+            flush_interval (float): maximum seconds between writes to disk
+            compression (str): None, 'gzip' or 'zstd' for compressing rotated log files
+            status_url (str): url of the monitoring server
+            status_rate (float): maximum number of status updates sent per second
+            node_id (str): id of this crawler node, defaults to '<hostname>-<pid>'
         """
-        if self.curr_file is not None:
-            self.curr_file.close()
-
-        if not os.path.exists(log_folder):
-            # create the folder if not exists
-            os.makedirs(log_folder)
+        if node_id is None:
+            node_id = '{}-{}'.format(socket.gethostname(), os.getpid())
+        self.node_id = node_id
+        self.host = socket.gethostname()
+        self.agg_dict = {}  # aggregators keyed by '<category>_<agg>'
+        self.writer = LogWriter(
+                log_folder, ','.join(columns),
+                max_file_bytes=max_file_bytes,
+                flush_bytes=flush_bytes,
+                flush_interval=flush_interval,
+                compression=compression)
+        self.publisher = StatusPublisher(status_url, rate=status_rate)
 
-        filename = time.strftime('%Y-%m-%d %H:%M:%S.csv',
-                                 time.localtime(time.time()))
-        self.curr_file = open(os.path.join(log_folder, filename), 'w')
-        self.curr_file_size = 0
-        header = ''
-        for i in columns:
-            header += i + ','
-        self.curr_file.write(header[:-1]+'\n')
-
-    def add_agg_type(self, category, agg):
+    def add_agg_type(self, category, agg, **options):
         """
         Adds a filter for aggregation
-        'speed' = Number of Logs in a short period
+        'speed' = Number of Logs per second over sliding windows (10 s, 1 min, 15 min by default)
         'sum' = Number of Logs from start
+        'latency' = Percentiles of the time from crawl to log
+
+        Args:
+            category (str): log type to aggregate
+            agg (str): aggregation kind
+            options: keyword arguments passed to the aggregator (e.g. windows=(10, 60))
         """
-        if agg == 'speed':
-            self.agg_dict[category + '_' + agg] = list()
-        elif agg == 'sum':
-            self.agg_dict[category + '_' + agg] = 0
+        if agg in AGGREGATORS:
+            self.agg_dict[category + '_' + agg] = AGGREGATORS[agg](**options)
         else:
             print('No such aggregation type!!')
 
-    def send_status(self):
+    def send_status(self, extra=None):
         """
-        Sends status to the monitoring server.
-        """
-        status = {}
-        for agg in self.agg_dict:
-            if agg[-3:] == 'sum':  # status of collected sum
-                status[agg] = self.agg_dict[agg]
-            elif agg[-5:] == 'speed':  # collecting speed status
-                if len(self.agg_dict[agg]) == 0:
-                    status[agg] = 0
-                else:
-                    print(agg, self.agg_dict[agg])
-                    length = len(self.agg_dict[agg])
-                    status[agg] = length / (time.time() - self.agg_dict[agg][0])
-                    print(length, time.time() - self.agg_dict[agg][0])
+        Sends status to the monitoring server. Updates are coalesced and sent
+        in the background, so this never blocks.
 
-                    # look at only the last 200 records
-                    if length > 200:
-                        self.agg_dict[agg] = (self.agg_dict[agg])[100:]
-        print(status)
-        requests.put('http://127.0.0.1:8080', params={'status': json.dumps(status)})
+        Args:
+            extra (dict): additional status fields to send along
+        """
+        status = {
+            'node': self.node_id,
+            # lets a monitoring server on the same host sample this process tree
+            'host': self.host,
+            'pid': os.getpid(),
+        }
+        if extra is not None:
+            status.update(extra)
+        now = time.time()
+        for agg_name, aggregator in self.agg_dict.items():
+            status.update(aggregator.status(agg_name, now))
+        self.publisher.publish(status)
 
     def log(self, log_entry):
         """
@@ -89,27 +89,34 @@ class Logger:
             'name': name of the file or name of the point of failure
         }
         """
-        # create another file if file size is too large
-        if self.curr_file_size > 50000:
-            self.create_new_log_file()
+        self.log_many([log_entry])
 
-        # keep records of log times
-        if (log_entry['type'] + '_speed') in self.agg_dict:
-            (self.agg_dict[log_entry['type'] + '_speed']).append(log_entry['time'])
+    def log_many(self, log_entries):
+        """
+        Logs a batch of log entries with a single write.
 
-        # keep the sum of logs
-        if (log_entry['type'] + '_sum') in self.agg_dict:
-            self.agg_dict[log_entry['type'] + '_sum'] += 1
+        Args:
+            log_entries (list): log entries in the format described in log()
+        """
+        now = time.time()
+        lines = []
+        for log_entry in log_entries:
+            # feed the aggregators of this log type
+            latency = log_entry.get('latency', now - log_entry['time'])
+            for agg_name, aggregator in self.agg_dict.items():
+                if agg_name.rsplit('_', 1)[0] == log_entry['type']:
+                    aggregator.add(log_entry['time'], latency)
 
-        log_ = time.strftime('%Y-%m-%d %H:%M:%S.%u', time.localtime(log_entry['time']))
-        log_ += ',' + log_entry['name']
-        log_ += ',' + log_entry['filepath']
-        log_ += ',' + log_entry['type']
-        self.curr_file.write(log_ + '\n')
-        self.curr_file_size += 1
+            log_ = time.strftime('%Y-%m-%d %H:%M:%S.%u', time.localtime(log_entry['time']))
+            log_ += ',' + log_entry['name']
+            log_ += ',' + log_entry['filepath']
+            log_ += ',' + log_entry['type']
+            lines.append(log_ + '\n')
+        self.writer.write(lines)  # buffered, does not block on disk
 
     def close(self):
         """
         Close the log file and stop logging.
         """
-        self.curr_file.close()
+        self.publisher.close()
+        self.writer.close()
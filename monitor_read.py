@@ -1,23 +1,72 @@
 import requests
 import time
 import sys
+import json
 
-speed = '0'
-cpu = '0'
-backoff = 2
-while(True):
-    try:
-        sys.stdout.write('\r')
-        sys.stdout.flush()
-        res = requests.get('http://127.0.0.1:8080')
-        backoff = 2
-        f_speed, f_sum, s_speed, s_sum, cpu = res.text.split(',')
-        print('\rFiltered Speed: ' + f_speed + " Sum: " + f_sum + ' Saved Speed: ' + s_speed + ' Sum: ' + s_sum + ' CPU: ' + cpu, end='  ')
-        time.sleep(1)
-    except:
-        for i in range(backoff):
-            print('\rConnection Error... retrying in '
-                  + str(backoff - i - 1) + '/'
-                  + str(backoff) + ' Seconds\t', end='')
-            time.sleep(1)
-        backoff *= 2
+STREAM_URL = 'http://127.0.0.1:8080/stream'
+
+
+def read_events(res):
+    """
+    Parses Server-Sent Events from a streaming response.
+
+    Yields:
+        (event id, event type, data) tuples
+    """
+    event_id, event_type, data = None, 'message', []
+    for line in res.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == '':
+            if len(data) > 0:
+                yield event_id, event_type, json.loads('\n'.join(data))
+            event_type, data = 'message', []
+        elif line.startswith(':'):
+            continue  # keep-alive comment
+        else:
+            field, _, value = line.partition(':')
+            value = value[1:] if value.startswith(' ') else value
+            if field == 'id':
+                event_id = value
+            elif field == 'event':
+                event_type = value
+            elif field == 'data':
+                data.append(value)
+
+
+def print_status(state):
+    print('\rFiltered Speed: ' + format(state.get('FILTERED_speed', 0), '.2f')
+          + ' Sum: ' + str(state.get('FILTERED_sum', 0))
+          + ' Saved Speed: ' + format(state.get('SAVED_speed', 0), '.2f')
+          + ' Sum: ' + str(state.get('SAVED_sum', 0))
+          + ' CPU: ' + format(state.get('cpu', 0), '.2f')
+          + ' Nodes: ' + str(state.get('nodes', 0)), end='  ')
+
+
+if __name__ == '__main__':
+    state = {}
+    last_event_id = None
+    backoff = 2
+    while(True):
+        try:
+            headers = {} if last_event_id is None else {'Last-Event-ID': last_event_id}
+            # no read timeout: the server sends keep-alive comments while idle
+            with requests.get(STREAM_URL, headers=headers, stream=True, timeout=(5, None)) as res:
+                res.raise_for_status()
+                backoff = 2
+                for event_id, event_type, data in read_events(res):
+                    if event_type == 'snapshot':
+                        state = data
+                    else:
+                        state.update(data)  # apply the delta
+                    last_event_id = event_id
+                    sys.stdout.write('\r')
+                    sys.stdout.flush()
+                    print_status(state)
+        except Exception:
+            for i in range(backoff):
+                print('\rConnection Error... retrying in '
+                      + str(backoff - i - 1) + '/'
+                      + str(backoff) + ' Seconds\t', end='')
+                time.sleep(1)
+            backoff = min(backoff * 2, 64)
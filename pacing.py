@@ -0,0 +1,191 @@
+from threading import Lock
+from urllib.parse import urlsplit
+import time
+
+
+class LatencyEstimator:
+    """
+    Learns a latency with exponentially weighted moving averages of its mean and deviation
+    (as TCP does for retransmission timeouts) and derives a timeout from them.
+    """
+    ALPHA = 0.125  # weight of a new sample in the mean
+    BETA = 0.25  # weight of a new sample in the deviation
+
+    def __init__(self, initial=2.0, min_timeout=0.5, max_timeout=10.0, deviations=4):
+        self.lock = Lock()
+        self.mean = initial
+        self.deviation = initial / 2
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.deviations = deviations
+
+    def observe(self, latency):
+        with self.lock:
+            self.deviation += self.BETA * (abs(latency - self.mean) - self.deviation)
+            self.mean += self.ALPHA * (latency - self.mean)
+
+    def timed_out(self):
+        """
+        Records a timeout: the real latency is at least the timeout, so widen it.
+        """
+        with self.lock:
+            self.deviation = min(self.deviation * 2, self.max_timeout)
+
+    def timeout(self):
+        with self.lock:
+            timeout = self.mean + self.deviations * self.deviation
+        return min(max(timeout, self.min_timeout), self.max_timeout)
+
+
+class HostRateLimiter:
+    """
+    Token bucket of a single host whose rate adapts with AIMD: it grows additively
+    while requests succeed and shrinks multiplicatively upon throttling or rising failures.
+    """
+    def __init__(self, rate=1.0, burst=2, min_rate=0.05, max_rate=20.0,
+                 increase=0.05, decrease=0.5, failure_threshold=0.3):
+        """
+        Args:
+            rate (float): initial requests per second
+            burst (int): bucket capacity
+            min_rate (float): lowest rate after backing off
+            max_rate (float): highest rate
+            increase (float): rate added per successful request
+            decrease (float): factor applied to the rate upon throttling
+            failure_threshold (float): failure ratio (EWMA) above which the rate decreases
+        """
+        self.lock = Lock()
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.failure_threshold = failure_threshold
+        self.failure_ratio = 0.0
+        self.tokens = burst
+        self.last_refill = time.time()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def reserve(self, now=None):
+        """
+        Takes a token.
+
+        Args:
+            now (float): current epoch time
+
+        Returns:
+            seconds to wait before the request may be sent
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            self._refill(now)
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def success(self):
+        with self.lock:
+            self.failure_ratio *= 0.9
+            # additive increase, spread over the requests of one second
+            self.rate = min(self.max_rate, self.rate + self.increase / max(self.rate, 1.0))
+
+    def throttled(self):
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.tokens = min(self.tokens, 0)
+
+    def failure(self):
+        with self.lock:
+            self.failure_ratio = self.failure_ratio * 0.9 + 0.1
+            if self.failure_ratio > self.failure_threshold:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self.failure_ratio = 0.0  # give the lowered rate a chance
+
+
+class PacingController:
+    """
+    Paces all workers: learns readiness latencies of pages and elements to set adaptive
+    timeouts, and enforces a shared, AIMD-adjusted token-bucket rate limit per host.
+    """
+    THROTTLE_STATUS = (429, 503)
+
+    def __init__(self, initial_rate=1.0, max_rate=20.0, min_timeout=0.5, max_timeout=10.0):
+        self.lock = Lock()
+        self.initial_rate = initial_rate
+        self.max_rate = max_rate
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.hosts = {}
+        self.latencies = {}
+
+    @staticmethod
+    def host_of(url):
+        return urlsplit(url).netloc
+
+    def limiter(self, host):
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = HostRateLimiter(self.initial_rate, max_rate=self.max_rate)
+            return self.hosts[host]
+
+    def estimator(self, key):
+        with self.lock:
+            if key not in self.latencies:
+                self.latencies[key] = LatencyEstimator(
+                        min_timeout=self.min_timeout, max_timeout=self.max_timeout)
+            return self.latencies[key]
+
+    def wait_turn(self, host, stopper=None):
+        """
+        Blocks until the host's rate limit allows another request.
+        """
+        delay = self.limiter(host).reserve()
+        if delay > 0:
+            if stopper is not None:
+                stopper.wait(delay)
+            else:
+                time.sleep(delay)
+
+    def timeout(self, key):
+        """
+        Returns:
+            adaptive timeout in seconds for waiting on the readiness of `key`
+        """
+        return self.estimator(key).timeout()
+
+    def observe(self, key, latency):
+        self.estimator(key).observe(latency)
+
+    def timed_out(self, key, host):
+        self.estimator(key).timed_out()
+        self.limiter(host).failure()
+
+    def success(self, host):
+        self.limiter(host).success()
+
+    def failure(self, host):
+        self.limiter(host).failure()
+
+    def response(self, host, status_code):
+        """
+        Feeds back the HTTP status of a response.
+        """
+        if status_code in self.THROTTLE_STATUS:
+            self.limiter(host).throttled()
+        elif status_code >= 500:
+            self.limiter(host).failure()
+        else:
+            self.limiter(host).success()
+
+    def status(self):
+        with self.lock:
+            hosts = dict(self.hosts)
+            latencies = dict(self.latencies)
+        status = {'rate_' + host: limiter.rate for host, limiter in hosts.items()}
+        status.update({'timeout_' + key: est.timeout() for key, est in latencies.items()})
+        return status
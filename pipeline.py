@@ -0,0 +1,263 @@
+from threading import Thread, Event, Lock
+import queue
+import time
+
+
+class StageStats:
+    """
+    Keeps track of processed count and latency of a pipeline stage.
+    """
+    EWMA_ALPHA = 0.1
+
+    def __init__(self):
+        self.lock = Lock()
+        self.processed = 0
+        self.errors = 0
+        self.batches = 0
+        self.latency_avg = 0.0  # exponentially weighted moving average of batch latency (seconds)
+        self.latency_max = 0.0
+
+    def record(self, latency, count=1, error=False):
+        with self.lock:
+            self.processed += count
+            self.batches += 1
+            if error:
+                self.errors += count
+            if self.batches == 1:
+                self.latency_avg = latency
+            else:
+                self.latency_avg += self.EWMA_ALPHA * (latency - self.latency_avg)
+            self.latency_max = max(self.latency_max, latency)
+
+
+# sentinel put on the input queue to wake up blocked workers when stopping
+_WAKE_UP = object()
+
+
+class Stage:
+    """
+    A single stage of the pipeline. Items are taken from a bounded input queue in batches,
+    handled by a configurable number of worker threads and passed on to the next stage.
+    """
+    GET_TIMEOUT = 0.5  # seconds to block on the input queue before checking the stopper
+
+    def __init__(self, name, handler, num_workers=1, maxsize=1000, stopper=None, batch_size=32,
+                 on_error=None):
+        """
+        Args:
+            name (str): stage name used in status reports
+            handler (callable): function that takes a list of items and returns the list
+                of items to pass on to the next stage, or None to drop them all
+            num_workers (int): number of threads running the handler
+            maxsize (int): capacity of the input queue
+            stopper (Event): event that stops the stage
+            batch_size (int): maximum number of items handled per wake-up
+            on_error (callable): function that takes the list of items of a failed batch,
+                which are dropped afterwards (e.g. to free their resources)
+        """
+        self.name = name
+        self.handler = handler
+        self.on_error = on_error
+        self.num_workers = num_workers
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.stopper = stopper if stopper is not None else Event()
+        self.next_stage = None
+        self.stats = StageStats()
+        self.threads = []
+        self.lock = Lock()
+        self.unforwarded = []  # results not passed on to the next stage upon stop
+
+    def connect(self, stage):
+        """
+        Connects the output of this stage to the provided stage.
+
+        Returns:
+            the connected stage, so that calls can be chained
+        """
+        self.next_stage = stage
+        return stage
+
+    def put(self, item):
+        """
+        Puts an item to the input queue, blocking while it is full.
+        Gives up when the stopper is set.
+
+        Returns:
+            True if the item has been enqueued
+        """
+        while not self.stopper.is_set():
+            try:
+                self.queue.put(item, timeout=self.GET_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get_batch(self):
+        """
+        Blocks until an item arrives (or the timeout passes), then drains
+        up to batch_size items without blocking.
+
+        Returns:
+            list of items, empty if nothing arrived or the stage is stopping
+        """
+        try:
+            item = self.queue.get(timeout=self.GET_TIMEOUT)
+        except queue.Empty:
+            return []
+        if item is _WAKE_UP:
+            return []
+
+        batch = [item]
+        while len(batch) < self.batch_size:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _WAKE_UP:
+                break
+            batch.append(item)
+        return batch
+
+    def handle(self, batch):
+        """
+        Runs the handler on a batch, passing a failed batch to on_error.
+
+        Returns:
+            list of items to pass on to the next stage, or None
+        """
+        start = time.time()
+        try:
+            results = self.handler(batch)
+        except Exception as e:
+            print('Stage {} failed : {}'.format(self.name, e))
+            self.stats.record(time.time() - start, count=len(batch), error=True)
+            if self.on_error is not None:
+                self.on_error(batch)
+            return None
+        self.stats.record(time.time() - start, count=len(batch))
+        return results
+
+    def _work(self):
+        while not self.stopper.is_set():
+            batch = self.get_batch()
+            if len(batch) == 0:
+                continue
+
+            results = self.handle(batch)
+            if results is not None and self.next_stage is not None:
+                for result in results:
+                    if not self.next_stage.put(result):
+                        with self.lock:  # stopping: kept for the drain
+                            self.unforwarded.append(result)
+
+    def take_pending(self):
+        """
+        Returns:
+            list of the items left in the input queue
+        """
+        items = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _WAKE_UP:
+                items.append(item)
+        return items
+
+    def take_unforwarded(self):
+        """
+        Returns:
+            list of the results not passed on to the next stage upon stop
+        """
+        with self.lock:
+            results, self.unforwarded = self.unforwarded, []
+        return results
+
+    def wake_up(self):
+        """
+        Wakes up the workers blocked on the input queue so they can see the stopper.
+        """
+        for _ in range(self.num_workers):
+            try:
+                self.queue.put_nowait(_WAKE_UP)
+            except queue.Full:
+                break  # workers are not blocked on an empty queue
+
+    def start(self):
+        for i in range(self.num_workers):
+            worker = Thread(target=self._work, name='{}-{}'.format(self.name, i), daemon=True)
+            worker.start()
+            self.threads.append(worker)
+
+    def join(self):
+        for worker in self.threads:
+            worker.join()
+
+    def status(self):
+        """
+        Returns:
+            dict: queue depth and latency of the stage
+        """
+        with self.stats.lock:
+            return {
+                'queue_depth': self.queue.qsize(),
+                'processed': self.stats.processed,
+                'batches': self.stats.batches,
+                'errors': self.stats.errors,
+                'latency_avg': self.stats.latency_avg,
+                'latency_max': self.stats.latency_max,
+            }
+
+
+class Pipeline:
+    """
+    Chain of stages connected by bounded queues.
+    """
+    def __init__(self, stages):
+        self.stages = list(stages)
+        for prev_stage, next_stage in zip(self.stages, self.stages[1:]):
+            prev_stage.connect(next_stage)
+
+    @property
+    def input_queue(self):
+        return self.stages[0].queue
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self):
+        """
+        Stops every stage without waiting for the blocking timeout.
+        """
+        for stage in self.stages:
+            stage.stopper.set()
+            stage.wake_up()
+
+    def join(self):
+        for stage in self.stages:
+            stage.join()
+
+    def drain(self):
+        """
+        Runs the items left behind upon stop through the remaining stages, stage by stage
+        in the calling thread, so that no item is lost. Called once the stages are joined.
+        """
+        carried = []
+        for stage in self.stages:
+            items = stage.take_pending() + carried
+            carried = stage.take_unforwarded()
+            for i in range(0, len(items), stage.batch_size):
+                results = stage.handle(items[i:i + stage.batch_size])
+                if results is not None:
+                    carried += results
+
+    def status(self):
+        """
+        Returns:
+            dict: status of each stage keyed by stage name
+        """
+        return {stage.name: stage.status() for stage in self.stages}
@@ -0,0 +1,262 @@
+from multiprocessing.managers import BaseManager
+from multiprocessing import shared_memory, resource_tracker
+from threading import Thread
+import multiprocessing
+import numpy as np
+import os
+import queue
+import signal
+
+
+class SharedStateManager(BaseManager):
+    """
+    Manager serving objects living in the parent process (hashtag frontier, image index,
+    seen index) to worker processes through proxies.
+    """
+    pass
+
+
+# typeids known to the worker processes; the parent registers the served objects
+for _typeid in ('frontier', 'image_index', 'seen_index'):
+    SharedStateManager.register(_typeid)
+
+
+class SharedPixelsQueue:
+    """
+    Log queue of a worker process that moves the decoded pixels of log entries into
+    shared memory blocks, so that only the block name crosses the process boundary.
+    The parent attaches to the block (attach_pixels) and frees it (release_pixels).
+    """
+    def __init__(self, log_queue):
+        self.log_queue = log_queue
+
+    def put(self, log_entry, block=True, timeout=None):
+        pixels = log_entry.get('pixels')
+        if isinstance(pixels, np.ndarray) and pixels.nbytes > 0:
+            shm = shared_memory.SharedMemory(create=True, size=pixels.nbytes)
+            np.ndarray(pixels.shape, dtype=pixels.dtype, buffer=shm.buf)[...] = pixels
+            shared_entry = dict(log_entry, pixels=(shm.name, pixels.shape, pixels.dtype.str))
+            shm.close()
+            # the parent owns the block from now on and unlinks it
+            resource_tracker.unregister(shm._name, 'shared_memory')
+            try:
+                self.log_queue.put(shared_entry, block, timeout)
+            except queue.Full:
+                # not handed over, so the block is still ours to free
+                resource_tracker.register(shm._name, 'shared_memory')
+                shm.unlink()
+                raise
+            return
+        self.log_queue.put(log_entry, block, timeout)
+
+
+def attach_pixels(log_entry):
+    """
+    Replaces the shared memory reference of a log entry by an array viewing the block.
+    """
+    pixels = log_entry.get('pixels')
+    if isinstance(pixels, tuple):
+        name, shape, dtype = pixels
+        shm = shared_memory.SharedMemory(name=name)
+        log_entry['pixels'] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        log_entry['shm'] = shm
+    return log_entry
+
+
+def release_pixels(log_entry):
+    """
+    Drops the pixels of a log entry, freeing their shared memory block if any.
+    """
+    log_entry.pop('pixels', None)
+    shm = log_entry.pop('shm', None)
+    if shm is not None:
+        try:
+            shm.close()
+        except BufferError:
+            pass  # still viewed by an array, unmapped once the array is collected
+        shm.unlink()
+
+
+def run_engine_process(worker_id, crawler_engine_cls, webdriver_cls, address, authkey,
+                       log_queue, stopper, engine_kwargs):
+    """
+    Entry point of a worker process. Runs a single crawler engine until stopped.
+    """
+    # the parent handles SIGINT and stops workers through the stopper
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    manager = SharedStateManager(address=address, authkey=authkey)
+    manager.connect()
+    shared = {name: getattr(manager, name)() for name in ('frontier', 'image_index', 'seen_index')}
+    engine_kwargs = dict(engine_kwargs)
+    pacing_options = engine_kwargs.pop('pacing_options', None)
+    if pacing_options is not None:
+        from pacing import PacingController
+        engine_kwargs['pacing'] = PacingController(**pacing_options)
+    encoder_options = engine_kwargs.pop('encoder_options', None)
+    if encoder_options is not None:
+        from image_encoder import ImageEncoder
+        engine_kwargs['encoder'] = ImageEncoder(**encoder_options)
+    if engine_kwargs.pop('use_fetcher', False):
+        from image_fetcher import ImageFetcher
+        engine_kwargs['fetcher'] = ImageFetcher(pacing=engine_kwargs.get('pacing'))
+
+    driver = webdriver_cls() if webdriver_cls is not None else None
+    engine = crawler_engine_cls(
+            driver,
+            log_queue=SharedPixelsQueue(log_queue) if log_queue is not None else None,
+            hashtag_queue=shared['frontier'],
+            thread_stopper=stopper,
+            image_index=shared['image_index'] if engine_kwargs.pop('has_image_index') else None,
+            seen_index=shared['seen_index'] if engine_kwargs.pop('has_seen_index') else None,
+            **engine_kwargs)
+    try:
+        engine.start_crawl()
+    finally:
+        engine.close()
+        if engine_kwargs.get('encoder') is not None:
+            engine_kwargs['encoder'].close()
+    print('Worker process {} (pid {}) finished'.format(worker_id, os.getpid()))
+
+
+class ProcessWorkerPool:
+    """
+    Runs crawler engines in child processes and supervises them.
+
+    Log entries from the children flow through a multiprocessing queue into the parent's
+    log queue, with decoded pixels passed in shared memory, and the hashtag frontier, image index and seen index are shared with the
+    children through a manager served from the parent. Crashed children are restarted.
+    """
+    SUPERVISE_INTERVAL = 1.0
+
+    def __init__(self, num_workers, crawler_engine_cls, webdriver_cls, stopper, log_queue,
+                 frontier, image_index=None, seen_index=None, engine_kwargs=None):
+        """
+        Args:
+            num_workers (int): number of worker processes
+            crawler_engine_cls: crawler engine class run by each worker process
+            webdriver_cls: web driver class, or None for browserless engines
+            stopper (threading.Event): event of the parent that stops crawling
+            log_queue: parent log queue receiving log entries of all workers
+            frontier: hashtag frontier (or scheduler) shared by the workers
+            image_index (DuplicateIndex): near-duplicate index shared by the workers
+            seen_index (SeenIndex): seen index shared by the workers
+            engine_kwargs (dict): additional keyword arguments of the engine
+        """
+        self.num_workers = num_workers
+        self.crawler_engine_cls = crawler_engine_cls
+        self.webdriver_cls = webdriver_cls
+        self.stopper = stopper
+        self.log_queue = log_queue
+        self.engine_kwargs = dict(engine_kwargs or {})
+        self.engine_kwargs['has_image_index'] = image_index is not None
+        self.engine_kwargs['has_seen_index'] = seen_index is not None
+
+        # serve the shared objects from a thread of this process
+        SharedStateManager.register('frontier', callable=lambda: frontier)
+        SharedStateManager.register('image_index', callable=lambda: image_index)
+        SharedStateManager.register('seen_index', callable=lambda: seen_index)
+        self.authkey = os.urandom(16)
+        self.manager = SharedStateManager(address=('127.0.0.1', 0), authkey=self.authkey)
+        self.server = self.manager.get_server()
+
+        self.child_log_queue = multiprocessing.Queue(maxsize=1000)
+        self.unforwarded = []  # log entry taken from the children but not forwarded upon stop
+        self.child_stopper = multiprocessing.Event()
+        self.processes = {}
+        self.restarts = 0
+        self.threads = []
+
+    def _spawn(self, worker_id):
+        process = multiprocessing.Process(
+                target=run_engine_process,
+                args=(worker_id, self.crawler_engine_cls, self.webdriver_cls,
+                      self.server.address, self.authkey,
+                      self.child_log_queue if self.log_queue is not None else None,
+                      self.child_stopper, self.engine_kwargs),
+                daemon=True)
+        process.start()
+        self.processes[worker_id] = process
+
+    def _forward_logs(self):
+        """
+        Moves log entries of the children into the parent's log queue.
+        """
+        while not self.stopper.is_set():
+            try:
+                log_entry = attach_pixels(self.child_log_queue.get(timeout=0.5))
+            except queue.Empty:
+                continue
+            while not self.stopper.is_set():
+                try:
+                    self.log_queue.put(log_entry, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+            else:
+                self.unforwarded.append(log_entry)
+
+    def _supervise(self):
+        """
+        Restarts crashed worker processes and stops all of them upon stop.
+        """
+        while not self.stopper.wait(self.SUPERVISE_INTERVAL):
+            for worker_id, process in list(self.processes.items()):
+                if not process.is_alive():
+                    print('Worker process {} died (exit code {}), restarting'.format(
+                            worker_id, process.exitcode))
+                    self.restarts += 1
+                    self._spawn(worker_id)
+        self.child_stopper.set()
+
+    def start(self):
+        targets = [self.server.serve_forever, self._supervise]
+        if self.log_queue is not None:
+            targets.append(self._forward_logs)
+        for target in targets:
+            thread = Thread(target=target, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        for worker_id in range(self.num_workers):
+            self._spawn(worker_id)
+
+    def join(self):
+        self.child_stopper.set()
+        for process in self.processes.values():
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        # the manager server thread is a daemon serving until the parent exits
+        for thread in self.threads[1:]:
+            thread.join()
+        # hand the log entries left behind to the pipeline's drain
+        for log_entry in self._take_leftovers():
+            try:
+                self.log_queue.put_nowait(log_entry)
+            except queue.Full:
+                print('Log queue full, dropping {}'.format(log_entry['name']))
+                release_pixels(log_entry)  # free their shared memory
+
+    def _take_leftovers(self):
+        """
+        Returns:
+            log entries not forwarded to the parent's log queue, with their pixels attached
+        """
+        leftovers, self.unforwarded = self.unforwarded, []
+        while True:
+            try:
+                leftovers.append(attach_pixels(self.child_log_queue.get(timeout=0.1)))
+            except queue.Empty:
+                break
+        return leftovers
+
+    def status(self):
+        """
+        Returns:
+            dict: liveness of every worker process and number of restarts
+        """
+        return {
+            'alive': sum(1 for p in self.processes.values() if p.is_alive()),
+            'restarts': self.restarts,
+            'pids': [p.pid for p in self.processes.values()],
+        }
@@ -0,0 +1,181 @@
+from threading import Lock
+import json
+import math
+import os
+import statistics
+import time
+
+
+class TagStats:
+    """
+    Exponentially decayed crawl statistics of a single hashtag.
+    """
+    def __init__(self, now):
+        self.pulls = 0.0  # decayed number of crawled images
+        self.reward = 0.0  # decayed number of FILTERED images
+        self.counts = {}  # raw number of log entries per type
+        self.last_update = now
+
+    def decay(self, now, half_life):
+        factor = 0.5 ** ((now - self.last_update) / half_life)
+        self.pulls *= factor
+        self.reward *= factor
+        self.last_update = now
+
+    def mean(self):
+        return self.reward / self.pulls if self.pulls > 0 else 0.0
+
+    def to_dict(self):
+        return {'pulls': self.pulls, 'reward': self.reward,
+                'counts': self.counts, 'last_update': self.last_update}
+
+    @classmethod
+    def from_dict(cls, d):
+        stats = cls(d['last_update'])
+        stats.pulls = d['pulls']
+        stats.reward = d['reward']
+        stats.counts = d['counts']
+        return stats
+
+
+class HashtagScheduler:
+    """
+    Yield-aware hashtag scheduler on top of a HashtagFrontier.
+
+    Records per-hashtag statistics (SAVED, FILTERED, FAILED, DUPLICATE) from the log pipeline,
+    and SEEN for posts the engines skip as already crawled, and picks the next hashtag with UCB1
+    on the rate of FILTERED images. Statistics decay with a half-life, and skipped posts are
+    pulls without yield, so tags that stop yielding (exhausted, mostly duplicates) lose priority.
+    A fresh hashtag from the frontier is scored as the average yield over the median pulls
+    of the known hashtags, and wins ties, so it competes on the same footing: new hashtags are
+    explored unless a known one stands out, rather than every time the frontier is refilled.
+    """
+    TIE_TOLERANCE = 1e-9  # scores closer than this are ties, whatever the rounding of decay
+
+    def __init__(self, frontier, exploration=1.0, half_life=3600.0, max_tags=10000):
+        """
+        Args:
+            frontier (HashtagFrontier): frontier of fresh hashtags
+            exploration (float): weight of the UCB exploration bonus
+            half_life (float): seconds after which statistics count half as much
+            max_tags (int): maximum number of hashtags whose statistics are kept
+        """
+        self.frontier = frontier
+        self.exploration = exploration
+        self.half_life = half_life
+        self.max_tags = max_tags
+        self.lock = Lock()
+        self.stats = {}
+        self.in_use = set()  # hashtags being crawled by a worker
+
+    def offer(self, tag):
+        return self.frontier.offer(tag)
+
+    def put(self, tag):
+        self.frontier.put(tag)
+
+    def qsize(self):
+        return self.frontier.qsize()
+
+    def record(self, log_entry):
+        """
+        Records the result of a log entry that carries the crawled 'hashtag'.
+        """
+        tag = log_entry.get('hashtag')
+        if tag is None:
+            return
+        now = time.time()
+        with self.lock:
+            stats = self.stats.get(tag)
+            if stats is None:
+                stats = self.stats[tag] = TagStats(now)
+            stats.decay(now, self.half_life)
+            stats.pulls += 1
+            if log_entry['type'] == 'FILTERED':
+                stats.reward += 1
+            stats.counts[log_entry['type']] = stats.counts.get(log_entry['type'], 0) + 1
+
+            if len(self.stats) > self.max_tags:
+                self._evict(now)
+
+    def _evict(self, now):
+        # forget the least promising hashtag that nobody is crawling
+        candidates = [t for t in self.stats if t not in self.in_use]
+        if len(candidates) > 0:
+            del self.stats[min(candidates, key=lambda t: self.stats[t].mean())]
+
+    def _ucb(self, mean, pulls, total_pulls):
+        return mean + self.exploration * math.sqrt(math.log(total_pulls + 1) / pulls)
+
+    def _best_known(self, now):
+        """
+        Returns:
+            (score, tag) of the best hashtag with statistics, and the average yield
+        """
+        for stats in self.stats.values():
+            stats.decay(now, self.half_life)
+        total_pulls = sum(s.pulls for s in self.stats.values())
+        total_reward = sum(s.reward for s in self.stats.values())
+        average = total_reward / total_pulls if total_pulls > 0 else 0.0
+
+        best = (None, None)
+        for tag, stats in self.stats.items():
+            if tag in self.in_use or stats.pulls <= 0:
+                continue
+            score = self._ucb(stats.mean(), stats.pulls, total_pulls)
+            if best[0] is None or score > best[0]:
+                best = (score, tag)
+        # prior of a fresh hashtag: the average yield, as certain as a typical known hashtag
+        pulls = [s.pulls for s in self.stats.values() if s.pulls > 0]
+        prior_pulls = max(statistics.median(pulls), 1.0) if len(pulls) > 0 else 1.0
+        fresh_score = self._ucb(average, prior_pulls, total_pulls)
+        return best, fresh_score
+
+    def get(self, block=True, timeout=None):
+        """
+        Picks the next hashtag to crawl and marks it in use until release().
+        """
+        with self.lock:
+            (score, tag), fresh_score = self._best_known(time.time())
+            if tag is not None and (score > fresh_score + self.TIE_TOLERANCE or self.frontier.qsize() == 0):
+                self.in_use.add(tag)
+                return tag
+        tag = self.frontier.get(block, timeout)
+        with self.lock:
+            self.in_use.add(tag)
+        return tag
+
+    def release(self, tag):
+        """
+        Marks the hashtag as no longer being crawled.
+        """
+        with self.lock:
+            self.in_use.discard(tag)
+
+    def status(self, top=10):
+        """
+        Returns:
+            dict: statistics of the top hashtags by decayed yield
+        """
+        with self.lock:
+            ranked = sorted(self.stats.items(), key=lambda x: x[1].mean(), reverse=True)
+            return {tag: dict(stats.counts, yield_rate=stats.mean()) for tag, stats in ranked[:top]}
+
+    def snapshot(self, path):
+        self.frontier.snapshot(path)
+        with self.lock:
+            data = json.dumps({t: s.to_dict() for t, s in self.stats.items()})
+        with open(path + '.stats.tmp', 'w') as f:
+            f.write(data)
+        os.replace(path + '.stats.tmp', path + '.stats')
+
+    def restore(self, path):
+        restored = self.frontier.restore(path)
+        if os.path.exists(path + '.stats'):
+            with open(path + '.stats') as f:
+                with self.lock:
+                    self.stats = {t: TagStats.from_dict(d) for t, d in json.load(f).items()}
+        return restored
+
+    def close(self):
+        self.frontier.close()
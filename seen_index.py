@@ -0,0 +1,74 @@
+from sqlite_batch import BatchedSQLite
+from urllib.parse import urlsplit
+import re
+import time
+
+POST_ID_PATTERN = re.compile(r'/p/([^/?#]+)')
+
+
+def image_key(img_src):
+    """
+    Returns:
+        key of an image source url, without the signed query string that changes between visits
+    """
+    parts = urlsplit(img_src)
+    return 'img:' + parts.netloc + parts.path
+
+
+def post_key(post_url):
+    """
+    Returns:
+        key of a post url (by its post id), or None if the url is not a post
+    """
+    match = POST_ID_PATTERN.search(post_url)
+    if match is None:
+        return None
+    return 'post:' + match.group(1)
+
+
+class SeenIndex(BatchedSQLite):
+    """
+    Persistent, restart-safe index of seen image sources and post ids.
+
+    Keys live in a SQLite database in WAL mode, in a WITHOUT ROWID table keyed by the
+    primary key, so a lookup is a single B-tree probe however large the index grows.
+    Inserts are committed in batches so crawling never waits for an fsync per image.
+    """
+    def __init__(self, db_path='seen.db', commit_every=100, commit_interval=5.0):
+        """
+        Args:
+            db_path (str): sqlite database file
+            commit_every (int): number of inserts before committing
+            commit_interval (float): maximum seconds between commits of pending inserts
+        """
+        super().__init__(db_path, commit_every, commit_interval)
+        self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY, time REAL) WITHOUT ROWID')
+        self.conn.commit()
+
+    def contains(self, key):
+        """
+        Returns:
+            True if the key has been seen
+        """
+        if key is None:
+            return False
+        with self.lock:
+            row = self.conn.execute('SELECT 1 FROM seen WHERE key = ?', (key,)).fetchone()
+        return row is not None
+
+    def add(self, keys):
+        """
+        Marks keys as seen.
+
+        Args:
+            keys (iterable): keys to add; None keys are ignored
+        """
+        now = time.time()
+        rows = [(key, now) for key in keys if key is not None]
+        with self.lock:
+            self._write_many('INSERT OR IGNORE INTO seen (key, time) VALUES (?, ?)', rows)
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM seen').fetchone()[0]
@@ -0,0 +1,50 @@
+from threading import Lock
+import sqlite3
+import time
+
+
+class BatchedSQLite:
+    """
+    Base of the SQLite indexes of the crawler (seen posts, detection results).
+
+    Opens the database in WAL mode with NORMAL synchronous, so readers never block the
+    writer and a commit only fsyncs the log, and commits writes in batches so callers
+    never wait for an fsync per row. Subclasses create their tables after __init__ and
+    write through _write_many() while holding self.lock.
+    """
+    def __init__(self, db_path, commit_every=100, commit_interval=5.0):
+        """
+        Args:
+            db_path (str): sqlite database file
+            commit_every (int): number of writes before committing
+            commit_interval (float): maximum seconds between commits of pending writes
+        """
+        self.lock = Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.pending = 0
+        self.last_commit = time.time()
+
+    def _write_many(self, sql, rows):
+        """
+        Executes the statement for every row, and commits if the batch is due.
+        The caller holds self.lock.
+        """
+        self.conn.executemany(sql, rows)
+        self.pending += len(rows)
+        if (self.pending >= self.commit_every
+                or time.time() - self.last_commit >= self.commit_interval):
+            self._commit()
+
+    def _commit(self):
+        self.conn.commit()
+        self.pending = 0
+        self.last_commit = time.time()
+
+    def close(self):
+        with self.lock:
+            self._commit()
+            self.conn.close()
@@ -0,0 +1,174 @@
+from threading import Lock
+from collections import deque
+import time
+
+
+class NodeHistory:
+    """
+    Bounded time series of the status reported by a single crawler node.
+
+    Raw points are kept for raw_seconds, and older data survives as per-minute rollups
+    (mean of each numeric field) for rollup_count minutes.
+    """
+    ROLLUP_SECONDS = 60
+
+    def __init__(self, raw_seconds=600, rollup_count=1440):
+        self.raw_seconds = raw_seconds
+        self.raw = deque()  # (time, status)
+        self.rollups = deque(maxlen=rollup_count)  # (minute start time, mean status, count)
+        self.curr_minute = None
+        self.minute_sums = {}
+        self.minute_count = 0
+        self.latest = None
+        self.latest_time = 0.0
+
+    @staticmethod
+    def numeric_fields(status):
+        return {k: v for k, v in status.items()
+                if isinstance(v, (int, float)) and not isinstance(v, bool) and k != 'pid'}
+
+    def _close_minute(self):
+        if self.minute_count > 0:
+            mean = {k: v / self.minute_count for k, v in self.minute_sums.items()}
+            self.rollups.append((self.curr_minute, mean, self.minute_count))
+        self.minute_sums = {}
+        self.minute_count = 0
+
+    def add(self, status, now):
+        """
+        Records a status reported at the provided time.
+        """
+        fields = self.numeric_fields(status)
+        self.latest = fields
+        self.latest_time = now
+        self.raw.append((now, fields))
+        while len(self.raw) > 0 and self.raw[0][0] < now - self.raw_seconds:
+            self.raw.popleft()
+
+        minute = now - now % self.ROLLUP_SECONDS
+        if self.curr_minute != minute:
+            self._close_minute()
+            self.curr_minute = minute
+        for k, v in fields.items():
+            self.minute_sums[k] = self.minute_sums.get(k, 0) + v
+        self.minute_count += 1
+
+    def query(self, start, end, resolution='raw'):
+        """
+        Args:
+            start (float): start epoch time
+            end (float): end epoch time
+            resolution (str): 'raw' or '1m'
+
+        Returns:
+            list of [time, status] points in the time range
+        """
+        if resolution == 'raw':
+            return [[t, s] for t, s in self.raw if start <= t <= end]
+        points = [[t, s] for t, s, _ in self.rollups if start <= t <= end]
+        if self.minute_count > 0 and start <= self.curr_minute <= end:
+            # include the minute still being rolled up
+            points.append([self.curr_minute,
+                           {k: v / self.minute_count for k, v in self.minute_sums.items()}])
+        return points
+
+
+class StatusHistory:
+    """
+    Status histories of many crawler nodes keyed by node id.
+    """
+    RESOLUTIONS = ('raw', '1m')
+
+    def __init__(self, raw_seconds=600, rollup_count=1440, active_seconds=60):
+        """
+        Args:
+            raw_seconds (int): seconds of raw points kept per node
+            rollup_count (int): number of 1-minute rollups kept per node
+            active_seconds (int): a node that has not reported for this long
+                is left out of the fleet aggregate
+        """
+        self.lock = Lock()
+        self.raw_seconds = raw_seconds
+        self.rollup_count = rollup_count
+        self.active_seconds = active_seconds
+        self.nodes = {}
+
+    def add(self, node_id, status, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            if node_id not in self.nodes:
+                self.nodes[node_id] = NodeHistory(self.raw_seconds, self.rollup_count)
+            self.nodes[node_id].add(status, now)
+
+    def node_ids(self):
+        with self.lock:
+            return list(self.nodes)
+
+    def evict(self, now=None):
+        """
+        Drops the nodes that have not reported for longer than the rollup horizon,
+        such as crawlers restarted under a new node id.
+
+        Returns:
+            list: ids of the dropped nodes
+        """
+        now = time.time() if now is None else now
+        horizon = now - self.rollup_count * NodeHistory.ROLLUP_SECONDS
+        with self.lock:
+            evicted = [node_id for node_id, node in self.nodes.items()
+                       if node.latest_time < horizon]
+            for node_id in evicted:
+                del self.nodes[node_id]
+        return evicted
+
+    def inactive_node_ids(self, now=None):
+        """
+        Returns:
+            list: ids of the nodes that have not reported for active_seconds
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            return [node_id for node_id, node in self.nodes.items()
+                    if node.latest_time < now - self.active_seconds]
+
+    def query(self, node_id=None, start=None, end=None, resolution='raw'):
+        """
+        Args:
+            node_id (str): node to query, or None for every node
+            start (float): start epoch time, defaults to the beginning
+            end (float): end epoch time, defaults to now
+            resolution (str): 'raw' or '1m'
+
+        Returns:
+            dict: list of [time, status] points keyed by node id
+        """
+        if resolution not in self.RESOLUTIONS:
+            raise ValueError('resolution must be one of {}'.format(self.RESOLUTIONS))
+        start = 0 if start is None else start
+        end = time.time() if end is None else end
+        with self.lock:
+            node_ids = list(self.nodes) if node_id is None else [node_id]
+            return {n: self.nodes[n].query(start, end, resolution)
+                    for n in node_ids if n in self.nodes}
+
+    def fleet(self, now=None):
+        """
+        Sums the latest throughput ('*_speed*' and '*_sum' fields) of every active node.
+
+        Returns:
+            dict: summed throughput fields, plus the number of active nodes
+        """
+        now = time.time() if now is None else now
+        total = {}
+        active = 0
+        with self.lock:
+            for node in self.nodes.values():
+                if node.latest is None or node.latest_time < now - self.active_seconds:
+                    continue
+                active += 1
+                for k, v in node.latest.items():
+                    if '_speed' not in k and not k.endswith('_sum'):
+                        continue
+                    total[k] = total.get(k, 0) + v
+        total['nodes'] = active
+        return total
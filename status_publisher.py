@@ -0,0 +1,103 @@
+from threading import Thread, Event, Lock
+import json
+import requests
+
+
+class StatusPublisher:
+    """
+    Publishes status to the monitoring server from a background thread.
+
+    Status updates are coalesced: only the latest status is kept, and it is sent at most
+    `rate` times per second over a keep-alive session. When the server is unreachable,
+    the publisher backs off exponentially, so callers of publish() never block.
+    """
+    def __init__(self, url='http://127.0.0.1:8080', rate=1.0, timeout=2.0,
+                 min_backoff=1.0, max_backoff=60.0):
+        """
+        Args:
+            url (str): url of the monitoring server
+            rate (float): maximum number of status updates sent per second
+            timeout (float): timeout of a single request in seconds
+            min_backoff (float): first backoff in seconds after a failed request
+            max_backoff (float): maximum backoff in seconds
+        """
+        self.url = url
+        self.interval = 1.0 / rate
+        self.timeout = timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.backoff = 0.0
+
+        self.session = requests.Session()
+        self.lock = Lock()
+        self.latest = None  # latest status not sent yet
+        self.pending = Event()
+        self.stopper = Event()
+        self.sent = 0
+        self.failed = 0
+
+        self.thread = Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def publish(self, status):
+        """
+        Hands over the latest status to be sent. Never blocks.
+
+        Args:
+            status (dict): status to send
+        """
+        with self.lock:
+            self.latest = status
+        self.pending.set()
+
+    def _take_latest(self):
+        with self.lock:
+            status = self.latest
+            self.latest = None
+            self.pending.clear()
+        return status
+
+    def _send(self, status):
+        """
+        Returns:
+            True if the server has accepted the status
+        """
+        try:
+            # in the form-encoded body, as the status outgrows url length limits
+            res = self.session.put(self.url, data={'status': json.dumps(status)},
+                                   timeout=self.timeout)
+            res.raise_for_status()  # rejected updates back off like unreachable servers
+            return True
+        except requests.exceptions.RequestException:
+            return False
+
+    def _run(self):
+        while not self.stopper.is_set():
+            self.pending.wait()
+            status = self._take_latest()
+            if status is None:
+                continue  # woken up by close()
+
+            if self._send(status):
+                self.sent += 1
+                self.backoff = 0.0
+                wait = self.interval
+            else:
+                self.failed += 1
+                self.backoff = min(max(self.backoff * 2, self.min_backoff), self.max_backoff)
+                wait = self.backoff
+                # keep the failed status unless a newer one has arrived meanwhile
+                with self.lock:
+                    if self.latest is None:
+                        self.latest = status
+                        self.pending.set()
+            self.stopper.wait(wait)  # limit the sending rate
+
+    def close(self):
+        """
+        Stops the publisher and closes the session.
+        """
+        self.stopper.set()
+        self.pending.set()
+        self.thread.join()
+        self.session.close()
@@ -0,0 +1,98 @@
+from threading import Condition
+from collections import deque
+import json
+import time
+
+
+class StatusBroadcaster:
+    """
+    Turns status updates into a stream of Server-Sent Events.
+
+    Each update publishes only the fields that changed (a delta). Recent events are kept
+    in a bounded backlog, so a watcher that reconnects with the Last-Event-ID header resumes
+    where it stopped. If the event has already left the backlog, or the server has restarted,
+    the watcher receives a full snapshot instead, so counter state is never lost.
+    """
+    def __init__(self, backlog=1000):
+        self.cond = Condition()
+        self.boot_id = str(int(time.time()))  # distinguishes event ids across server restarts
+        self.seq = 0
+        self.state = {}
+        self.events = deque(maxlen=backlog)  # (seq, delta)
+
+    def event_id(self, seq):
+        return '{}-{}'.format(self.boot_id, seq)
+
+    def publish(self, state):
+        """
+        Publishes the fields of the new state that differ from the current state.
+        """
+        with self.cond:
+            delta = {k: v for k, v in state.items() if self.state.get(k) != v}
+            if len(delta) == 0:
+                return
+            self.state.update(delta)
+            self.seq += 1
+            self.events.append((self.seq, delta))
+            self.cond.notify_all()
+
+    def _events_after(self, last_seq):
+        """
+        Returns:
+            list of (seq, event type, data) to send to a watcher that has seen last_seq,
+            or None if the watcher needs a snapshot
+        """
+        if last_seq is None or last_seq > self.seq:
+            return None
+        if last_seq == self.seq:
+            return []
+        if len(self.events) == 0 or self.events[0][0] > last_seq + 1:
+            return None  # missed events have left the backlog
+        return [(seq, 'delta', delta) for seq, delta in self.events if seq > last_seq]
+
+    def parse_event_id(self, last_event_id):
+        """
+        Returns:
+            sequence number of the event id, or None if it belongs to another boot
+        """
+        if not last_event_id:
+            return None
+        boot_id, _, seq = last_event_id.partition('-')
+        if boot_id != self.boot_id or not seq.isdigit():
+            return None
+        return int(seq)
+
+    @staticmethod
+    def format_event(event_id, event_type, data):
+        return 'id: {}\nevent: {}\ndata: {}\n\n'.format(event_id, event_type, json.dumps(data))
+
+    def stream(self, last_event_id=None, keep_alive=15.0, stopper=None):
+        """
+        Generates Server-Sent Events for a single watcher.
+
+        Args:
+            last_event_id (str): Last-Event-ID sent by a reconnecting watcher
+            keep_alive (float): seconds between keep-alive comments when idle
+            stopper (Event): stops the stream when set
+
+        Yields:
+            encoded events
+        """
+        last_seq = self.parse_event_id(last_event_id)
+        while stopper is None or not stopper.is_set():
+            with self.cond:
+                events = self._events_after(last_seq)
+                if events is None:
+                    events = [(self.seq, 'snapshot', dict(self.state))]
+                elif len(events) == 0:
+                    self.cond.wait(keep_alive)
+                    events = self._events_after(last_seq)
+                    if events is None:
+                        events = [(self.seq, 'snapshot', dict(self.state))]
+
+            if len(events) == 0:
+                yield ': keep-alive\n\n'.encode()
+                continue
+            for seq, event_type, data in events:
+                yield self.format_event(self.event_id(seq), event_type, data).encode()
+                last_seq = seq
@@ -0,0 +1,38 @@
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from threading import Thread
+
+
+class FixtureServer:
+    """
+    Local HTTP server serving fixed responses keyed by request path (without the query).
+    """
+    def __init__(self, routes):
+        """
+        Args:
+            routes (dict): (status code, content type, body bytes) keyed by path
+        """
+        self.routes = routes
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(self.path)
+                status, content_type, body = server.routes.get(
+                        self.path.split('?')[0], (404, 'text/plain', b'not found'))
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:{}'.format(self.server.server_port)
+        Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,73 @@
+from aggregator import PercentileAggregator, RateAggregator, SumAggregator
+import unittest
+
+
+class RateAggregatorTest(unittest.TestCase):
+    def setUp(self):
+        self.agg = RateAggregator(windows=(10, 60), bucket_width=1.0)
+        self.now = self.agg.start_time + 1000
+
+    def test_rate_over_windows(self):
+        for age in range(60):  # one record per second during the last minute
+            self.agg.add(self.now - age)
+            self.agg.add(self.now - age)
+        self.assertAlmostEqual(self.agg.rate(10, self.now), 2.0)
+        self.assertAlmostEqual(self.agg.rate(60, self.now), 2.0)
+        self.assertEqual(self.agg.status('speed', self.now),
+                         {'speed': 2.0, 'speed_10s': 2.0, 'speed_60s': 2.0})
+
+    def test_old_records_leave_the_window(self):
+        for age in range(10):
+            self.agg.add(self.now - age)
+        self.assertAlmostEqual(self.agg.rate(10, self.now), 1.0)
+        self.assertAlmostEqual(self.agg.rate(10, self.now + 5), 0.5)
+        self.assertEqual(self.agg.rate(60, self.now + 60), 0.0)
+
+    def test_ring_buffer_reuses_expired_buckets(self):
+        self.assertEqual(len(self.agg.counts), 60)
+        self.agg.add(self.now - 60)  # same slot as now, expired
+        self.agg.add(self.now)
+        self.assertAlmostEqual(self.agg.rate(60, self.now), 1 / 60)
+        self.agg.add(self.now - 60)  # too old for the reused slot
+        self.assertEqual(sum(self.agg.counts), 1)
+
+    def test_rate_of_a_young_crawl_counts_elapsed_time_only(self):
+        start = self.agg.start_time
+        for _ in range(4):
+            self.agg.add(start + 1)
+        self.assertAlmostEqual(self.agg.rate(60, start + 2), 2.0)
+
+
+class PercentileAggregatorTest(unittest.TestCase):
+    def test_percentiles_within_bucket_error(self):
+        agg = PercentileAggregator(percentiles=(50, 90, 99), growth=1.05)
+        for i in range(1, 1001):
+            agg.add(0, i / 1000)  # uniform between 1 ms and 1 s
+        agg.add(0, None)  # records without a value are ignored
+        status = agg.status('latency')
+        for p in (50, 90, 99):
+            value = status['latency_p{}'.format(p)]
+            self.assertGreaterEqual(value, p / 100 * 0.9999)
+            self.assertLessEqual(value, p / 100 * 1.05)
+
+    def test_out_of_range_values_are_clamped(self):
+        agg = PercentileAggregator(percentiles=(50,), min_value=1, max_value=100)
+        self.assertEqual(agg.percentile(50), 0)
+        agg.add(0, 0.001)
+        self.assertEqual(agg.percentile(50), 1)
+        for _ in range(3):
+            agg.add(0, 1e9)
+        self.assertGreaterEqual(agg.percentile(50), 100)
+        self.assertLess(agg.percentile(50), 100 * 1.05 ** 2)
+
+
+class SumAggregatorTest(unittest.TestCase):
+    def test_counts_records(self):
+        agg = SumAggregator()
+        for i in range(3):
+            agg.add(i)
+        self.assertEqual(agg.status('saved'), {'saved': 3})
+
+
+if __name__ == '__main__':
+    unittest.main()
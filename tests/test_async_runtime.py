@@ -0,0 +1,56 @@
+from async_runtime import AsyncRuntime
+from data_filter import DataFilter
+from frontier import HashtagFrontier
+from image_store import FlatImageStore
+from insta_http_crawler import AsyncInstagramHttpCrawlerEngine
+from tests.fixture_server import FixtureServer
+from tests.test_http_engine import jpeg_bytes, tag_page
+from threading import Event, Thread
+import os
+import queue
+import tempfile
+import unittest
+
+
+class AsyncRuntimeTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FixtureServer({})
+        self.server.routes.update({
+            '/explore/tags/faces/': (200, 'application/json', tag_page(self.server.url)),
+            '/img/1.jpg': (200, 'image/jpeg', jpeg_bytes('red')),
+            '/img/2.jpg': (200, 'image/jpeg', b'not an image'),
+        })
+        self.tmp = tempfile.TemporaryDirectory()
+        self.frontier = HashtagFrontier(spill_path=os.path.join(self.tmp.name, 'spill'))
+        self.data_filter = DataFilter('face')
+
+    def tearDown(self):
+        self.data_filter.close()
+        self.frontier.close()
+        self.server.close()
+        self.tmp.cleanup()
+
+    def test_crawls_and_filters_on_the_event_loop(self):
+        log_queue = queue.Queue()
+        stopper = Event()
+        engine = AsyncInstagramHttpCrawlerEngine(
+                tasks=4, log_queue=log_queue, hashtag_queue=self.frontier,
+                thread_stopper=stopper, image_store=FlatImageStore(self.tmp.name, None),
+                base_url=self.server.url + '/explore/tags/{}/')
+        runtime = AsyncRuntime(data_filter=self.data_filter)
+        thread = Thread(target=runtime.run, args=([engine], stopper))
+        thread.start()
+        try:
+            self.frontier.offer('faces')
+            log_entries = [log_queue.get(timeout=10) for _ in range(2)]
+        finally:
+            stopper.set()
+            thread.join()
+            engine.close()
+
+        by_success = {log_entry['success']: log_entry for log_entry in log_entries}
+        saved, failed = by_success[True], by_success[False]  # undecodable image
+        self.assertIs(saved['wanted'], False)  # a plain red image has no face
+        self.assertIsNone(saved['pixels'])  # dropped once filtered
+        self.assertNotIn('data', failed)
+        self.assertEqual(self.data_filter.status()['images'], 1)
@@ -0,0 +1,64 @@
+from data_filter import _run_stages, DataFilter, FilterParams, CASC_PATH
+import data_filter
+import cv2
+import numpy as np
+import os
+import tempfile
+import unittest
+
+
+def noise(shape, seed=0):
+    return np.random.RandomState(seed).randint(0, 256, shape).astype(np.uint8)
+
+
+class FilterStagesTest(unittest.TestCase):
+    def setUp(self):
+        casc_path = os.path.join(os.path.dirname(data_filter.__file__), CASC_PATH)
+        self.cascade = cv2.CascadeClassifier(casc_path)
+        self.params = FilterParams()
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def stage_of(self, image):
+        return _run_stages(self.cascade, image, self.params)[1]
+
+    def test_unreadable(self):
+        self.assertEqual(self.stage_of(b'not an image'), 'unreadable')
+        self.assertEqual(self.stage_of(os.path.join(self.tmp.name, 'missing.jpg')), 'unreadable')
+
+    def test_dimension(self):
+        self.assertEqual(self.stage_of(noise((32, 200, 3))), 'dimension')
+
+    def test_contrast(self):
+        self.assertEqual(self.stage_of(np.full((200, 200, 3), 128, dtype=np.uint8)), 'contrast')
+
+    def test_colors_without_skin_tone(self):
+        image = noise((200, 200, 3))
+        image[:, :, 2] = 0  # no red
+        self.assertEqual(self.stage_of(image), 'skin')
+
+    def test_grayscale_is_not_rejected_as_skin(self):
+        gray = noise((200, 200))
+        self.assertEqual(self.stage_of(gray), 'detect')
+        self.assertEqual(self.stage_of(cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)), 'detect')
+
+        path = os.path.join(self.tmp.name, 'gray.jpg')
+        cv2.imwrite(path, gray)
+        self.assertEqual(self.stage_of(path), 'detect')  # decoded to 3 channels
+
+    def test_stage_counts(self):
+        data_filter_ = DataFilter('face')
+        self.addCleanup(data_filter_.close)
+        data_filter_.casc_path = os.path.join(os.path.dirname(data_filter.__file__), CASC_PATH)
+        found = data_filter_.detect_many([b'', noise((32, 32, 3)), noise((200, 200))])
+        self.assertEqual(found, [False, False, False])
+        status = data_filter_.status()
+        self.assertEqual(status['images'], 3)
+        for stage in ('unreadable', 'dimension', 'detect'):
+            self.assertAlmostEqual(status['rejected_' + stage], 1 / 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+from detection_cache import DetectionCache, reprocess
+from image_store import SegmentImageStore
+from data_filter import _detect, DataFilter, FilterParams, CASC_PATH
+import data_filter
+import cv2
+import hashlib
+import numpy as np
+import os
+import sqlite3
+import tempfile
+import unittest
+
+
+class FakeCascade:
+    """
+    Cascade finding a face of every size band.
+    """
+    def __init__(self):
+        self.calls = 0
+
+    def detectMultiScale(self, gray, scaleFactor, minNeighbors, minSize, maxSize=None):
+        self.calls += 1
+        return [(0, 0, minSize[0], minSize[1])]
+
+
+class DetectionCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'detections.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_detection_stopped_early_is_partial(self):
+        gray = np.zeros((400, 400), dtype=np.uint8)
+        faces, partial = _detect(FakeCascade(), gray, FilterParams(), 30)
+        self.assertEqual(len(faces), 1)
+        self.assertTrue(partial)
+        faces, partial = _detect(FakeCascade(), gray, FilterParams(stop_at_first=False), 30)
+        self.assertFalse(partial)
+
+    def test_partial_flag_is_stored(self):
+        cache = DetectionCache(self.db_path)
+        record = {'found': True, 'stage': 'face', 'faces': 1, 'boxes': [[1, 2, 3, 4]],
+                  'partial': True}
+        cache.put_many('params', [('a' * 32, record)])
+        self.assertEqual(cache.get_many(['a' * 32], 'params'), {'a' * 32: record})
+        self.assertEqual(list(cache.with_faces('params')), [('a' * 32, 1, [[1, 2, 3, 4]], True)])
+        cache.close()
+
+    def test_older_database_reports_unknown_partial(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('CREATE TABLE params (id INTEGER PRIMARY KEY, params TEXT UNIQUE)')
+        conn.execute('CREATE TABLE detections (hash TEXT, params_id INTEGER, '
+                     'found INTEGER, stage TEXT, faces INTEGER, boxes TEXT, time REAL, '
+                     'PRIMARY KEY (hash, params_id)) WITHOUT ROWID')
+        conn.execute("INSERT INTO params VALUES (1, 'params')")
+        conn.execute("INSERT INTO detections VALUES ('h', 1, 1, 'face', 1, '[]', 0)")
+        conn.commit()
+        conn.close()
+
+        cache = DetectionCache(self.db_path)
+        self.assertIsNone(cache.get_many(['h'], 'params')['h']['partial'])
+        cache.close()
+
+    def test_reprocess_loads_uncached_images_only(self):
+        folder = os.path.join(self.tmp.name, 'images')
+        os.mkdir(folder)
+        for seed in range(3):
+            image = np.random.RandomState(seed).randint(0, 256, (100, 100)).astype(np.uint8)
+            cv2.imwrite(os.path.join(folder, '{}.png'.format(seed)), image)
+
+        data_filter_ = DataFilter('face', cache=DetectionCache(self.db_path))
+        data_filter_.casc_path = os.path.join(os.path.dirname(data_filter.__file__), CASC_PATH)
+        self.assertEqual(reprocess(folder, data_filter_), (3, 0))
+        self.assertEqual(reprocess(folder, data_filter_), (0, 3))
+        self.assertEqual(data_filter_.status()['images'], 3)  # detected once each
+        data_filter_.close()
+
+    def test_reprocess_reads_every_batch_of_a_segment_store(self):
+        root = os.path.join(self.tmp.name, 'store')
+        store = SegmentImageStore(root)
+        for seed in range(5):
+            image = np.random.RandomState(seed).randint(0, 256, (100, 100)).astype(np.uint8)
+            data = cv2.imencode('.png', image)[1].tobytes()
+            store.put('{}.png'.format(hashlib.md5(data).hexdigest()), data)
+        store.close()
+
+        data_filter_ = DataFilter('face', num_workers=2, cache=DetectionCache(self.db_path))
+        data_filter_.casc_path = os.path.join(os.path.dirname(data_filter.__file__), CASC_PATH)
+        self.assertEqual(reprocess(root, data_filter_, batch_size=2), (5, 0))
+        self.assertEqual(reprocess(root, data_filter_, batch_size=2), (0, 5))
+        data_filter_.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
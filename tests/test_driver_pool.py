@@ -0,0 +1,162 @@
+from driver_pool import DriverPool
+from insta_crawler import InstagramCrawlerEngine
+from image_store import FlatImageStore
+import queue
+import tempfile
+import threading
+import unittest
+
+
+class FakeDriver:
+    """
+    Stand-in for a selenium web driver.
+    """
+    launched = []
+
+    def __init__(self):
+        self.healthy = True
+        self.hung = threading.Event()
+        self.quit_called = threading.Event()
+        self.timeouts = {}
+        FakeDriver.launched.append(self)
+
+    def execute_script(self, script):
+        if self.hung.is_set():
+            self.quit_called.wait(5)  # never answers while alive
+            raise RuntimeError('driver is gone')
+        if not self.healthy:
+            raise RuntimeError('browser crashed')
+        return 1
+
+    def set_page_load_timeout(self, seconds):
+        self.timeouts['page_load'] = seconds
+
+    def set_script_timeout(self, seconds):
+        self.timeouts['script'] = seconds
+
+    def quit(self):
+        self.quit_called.set()
+
+
+class FailingDriver(FakeDriver):
+    def __init__(self):
+        super().__init__()
+        raise RuntimeError('geckodriver not found')
+
+
+class DriverPoolTest(unittest.TestCase):
+    def setUp(self):
+        FakeDriver.launched = []
+
+    def make_pool(self, webdriver_cls=FakeDriver, **kwargs):
+        pool = DriverPool(webdriver_cls, health_timeout=0.2, page_load_timeout=7,
+                          script_timeout=3, **kwargs)
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_warm_up_keeps_spares(self):
+        pool = self.make_pool(spares=2)
+        drivers = pool.warm_up(2)
+        self.assertEqual(len(drivers), 2)
+        self.assertEqual(pool.status()['spares'], 2)
+        self.assertEqual(len(FakeDriver.launched), 4)
+
+    def test_launched_drivers_have_timeouts(self):
+        pool = self.make_pool()
+        for driver in pool.warm_up(1):
+            self.assertEqual(driver.timeouts, {'page_load': 7, 'script': 3})
+
+    def test_replace_hands_out_spare(self):
+        pool = self.make_pool(spares=1)
+        driver, = pool.warm_up(1)
+        spare = FakeDriver.launched[1]
+        replacement = pool.replace(driver)
+        self.assertIs(replacement, spare)
+        self.assertTrue(driver.quit_called.wait(5))
+        self.assertEqual(pool.status()['recycled'], 1)
+
+    def test_checkpoint_recycles_worn_out_driver(self):
+        pool = self.make_pool(max_pages=2)
+        driver, = pool.warm_up(1)
+        pool.page_done(driver)
+        self.assertIs(pool.checkpoint(driver), driver)
+        pool.page_done(driver)
+        self.assertIsNot(pool.checkpoint(driver), driver)
+
+    def test_checkpoint_replaces_hung_driver(self):
+        pool = self.make_pool()
+        driver, = pool.warm_up(1)
+        driver.hung.set()
+        replacement = pool.checkpoint(driver)
+        self.assertIsNot(replacement, driver)
+        self.assertTrue(pool.is_healthy(replacement))
+
+    def test_unhealthy_spare_is_skipped(self):
+        pool = self.make_pool(spares=1)
+        driver, = pool.warm_up(1)
+        spare = FakeDriver.launched[1]
+        spare.healthy = False
+        replacement = pool.replace(driver)
+        self.assertIsNot(replacement, spare)
+        self.assertTrue(spare.quit_called.is_set())
+
+    def test_failed_launches_are_bounded(self):
+        pool = self.make_pool(FailingDriver, spares=0)
+        with self.assertRaises(DriverPool.DriverLaunchError):
+            pool.warm_up(1)
+        with self.assertRaises(DriverPool.DriverLaunchError):
+            pool.replace(FakeDriver())
+        self.assertEqual(len(FakeDriver.launched), 2 * DriverPool.LAUNCH_ATTEMPTS + 1)
+
+
+class BrowserDriver(FakeDriver):
+    def get(self, url):
+        self.url = url
+
+    def set_window_size(self, width, height):
+        pass
+
+
+class FlakyPool:
+    """
+    Driver pool whose first checkpoints cannot launch a healthy driver.
+    """
+    def __init__(self, failures):
+        self.failures = failures
+
+    def checkpoint(self, driver):
+        if self.failures > 0:
+            self.failures -= 1
+            raise DriverPool.DriverLaunchError('no healthy driver')
+        return driver
+
+
+class EngineDriverLaunchTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.hashtags = queue.Queue()
+        self.engine = InstagramCrawlerEngine(
+                BrowserDriver(), hashtag_queue=self.hashtags, thread_stopper=threading.Event(),
+                driver_pool=FlakyPool(failures=2),
+                image_store=FlatImageStore(self.tmp.name, None))
+        self.engine.LAUNCH_BACKOFF = 0.01
+        self.engine.init_crawl = lambda: 'main'
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_backs_off_until_a_driver_is_launched(self):
+        self.hashtags.put('faces')
+        self.assertTrue(self.engine.open_tag())
+        self.assertEqual(self.engine.driver_pool.failures, 0)
+        self.assertEqual(self.engine.current_tag, 'faces')
+        self.assertEqual(self.engine.main_window, 'main')
+
+    def test_stops_while_backing_off(self):
+        self.engine.LAUNCH_BACKOFF = 5
+        threading.Timer(0.05, self.engine.thread_stopper.set).start()
+        self.assertFalse(self.engine.open_tag())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+from frontier import HashtagFrontier, ScalableBloomFilter
+import os
+import queue
+import tempfile
+import unittest
+
+
+class HashtagFrontierTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.spill_path = os.path.join(self.tmp.name, 'spill')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_offer_rejects_seen_hashtags(self):
+        frontier = HashtagFrontier(spill_path=self.spill_path)
+        self.assertTrue(frontier.offer('a'))
+        self.assertFalse(frontier.offer('a'))
+        self.assertEqual(frontier.get(), 'a')
+        self.assertFalse(frontier.offer('a'))  # still seen after being taken
+        with self.assertRaises(queue.Empty):
+            frontier.get(block=False)
+        frontier.close()
+
+    def test_spills_beyond_memory_and_keeps_order(self):
+        frontier = HashtagFrontier(spill_path=self.spill_path, max_memory=3)
+        frontier.REFILL_SIZE = 2
+        tags = ['tag{}'.format(i) for i in range(10)]
+        for tag in tags:
+            frontier.offer(tag)
+        self.assertEqual(len(frontier.memory), 3)
+        self.assertTrue(os.path.exists(self.spill_path))
+        self.assertEqual(frontier.qsize(), 10)
+
+        taken = [frontier.get() for _ in range(5)]
+        frontier.offer('late')  # goes after the spilled hashtags
+        taken += [frontier.get() for _ in range(6)]
+        self.assertEqual(taken, tags + ['late'])
+        frontier.close()
+        self.assertFalse(os.path.exists(self.spill_path))
+
+    def test_snapshot_restores_pending_and_seen(self):
+        frontier = HashtagFrontier(spill_path=self.spill_path, max_memory=2)
+        for tag in ('a', 'b', 'c', 'd'):
+            frontier.offer(tag)
+        frontier.get()
+        path = os.path.join(self.tmp.name, 'snapshot')
+        frontier.snapshot(path)
+        frontier.close()
+
+        restored = HashtagFrontier(spill_path=self.spill_path + '2', max_memory=2)
+        self.assertTrue(restored.restore(path))
+        self.assertFalse(restored.offer('a'))  # seen before the restart
+        self.assertEqual([restored.get() for _ in range(3)], ['b', 'c', 'd'])
+        restored.close()
+
+    def test_restore_without_snapshot(self):
+        frontier = HashtagFrontier(spill_path=self.spill_path)
+        self.assertFalse(frontier.restore(os.path.join(self.tmp.name, 'missing')))
+        frontier.close()
+
+
+class ScalableBloomFilterTest(unittest.TestCase):
+    def test_grows_without_false_negatives(self):
+        seen = ScalableBloomFilter(initial_capacity=100, error_rate=0.01)
+        items = ['item{}'.format(i) for i in range(1000)]
+        for item in items:
+            seen.add(item)
+        self.assertGreater(len(seen.filters), 1)
+        self.assertTrue(all(item in seen for item in items))
+        false_positives = sum('other{}'.format(i) in seen for i in range(1000))
+        self.assertLess(false_positives, 50)
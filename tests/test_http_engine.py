@@ -0,0 +1,107 @@
+from frontier import HashtagFrontier
+from image_fetcher import ImageFetcher
+from image_store import FlatImageStore
+from insta_http_crawler import InstagramHttpCrawlerEngine, parse_tag_page
+from tests.fixture_server import FixtureServer
+from PIL import Image
+import io
+import json
+import os
+import queue
+import tempfile
+import threading
+import unittest
+
+
+def jpeg_bytes(color):
+    out = io.BytesIO()
+    Image.new('RGB', (32, 24), color).save(out, format='JPEG')
+    return out.getvalue()
+
+
+def tag_page(server_url, has_next_page=False):
+    def node(shortcode, path, caption, is_video=False):
+        return {'node': {
+            'id': shortcode, 'shortcode': shortcode, 'is_video': is_video,
+            'display_url': server_url + path,
+            'edge_media_to_caption': {'edges': [{'node': {'text': caption}}]},
+        }}
+    return json.dumps({'graphql': {'hashtag': {'edge_hashtag_to_media': {
+        'edges': [node('p1', '/img/1.jpg', 'hello #selfie #smile'),
+                  node('p2', '/img/2.jpg', 'no tags'),
+                  node('p3', '/img/3.mp4', '#video', is_video=True)],
+        'page_info': {'has_next_page': has_next_page, 'end_cursor': 'c1'},
+    }}}}).encode()
+
+
+class ParseTagPageTest(unittest.TestCase):
+    def test_parses_json_page(self):
+        posts, cursor = parse_tag_page(tag_page('http://x', has_next_page=True).decode())
+        self.assertEqual([p['shortcode'] for p in posts], ['p1', 'p2', 'p3'])
+        self.assertEqual(posts[0]['img_src'], 'http://x/img/1.jpg')
+        self.assertEqual(posts[0]['caption'], 'hello #selfie #smile')
+        self.assertTrue(posts[2]['is_video'])
+        self.assertEqual(cursor, 'c1')
+
+    def test_parses_html_page(self):
+        data = {'entry_data': {'TagPage': [json.loads(tag_page('http://x').decode())]}}
+        html = '<script>window._sharedData = {};</script>'.format(json.dumps(data))
+        posts, cursor = parse_tag_page(html)
+        self.assertEqual(len(posts), 3)
+        self.assertIsNone(cursor)
+
+
+class InstagramHttpCrawlerEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FixtureServer({})
+        self.server.routes.update({
+            '/explore/tags/faces/': (200, 'application/json', tag_page(self.server.url)),
+            '/img/1.jpg': (200, 'image/jpeg', jpeg_bytes('red')),
+            '/img/2.jpg': (200, 'image/jpeg', jpeg_bytes('blue')),
+        })
+        self.tmp = tempfile.TemporaryDirectory()
+        self.frontier = HashtagFrontier(spill_path=os.path.join(self.tmp.name, 'spill'))
+        self.log_queue = queue.Queue()
+        self.fetcher = ImageFetcher(num_workers=2)
+        self.engine = InstagramHttpCrawlerEngine(
+                log_queue=self.log_queue, hashtag_queue=self.frontier,
+                thread_stopper=threading.Event(), fetcher=self.fetcher,
+                image_store=FlatImageStore(os.path.join(self.tmp.name, 'images'), None),
+                base_url=self.server.url + '/explore/tags/{}/')
+
+    def tearDown(self):
+        self.fetcher.close()
+        self.frontier.close()
+        self.server.close()
+        self.tmp.cleanup()
+
+    def test_crawls_tag_page_and_hands_off_images(self):
+        self.engine.crawl_tag('faces')
+        self.fetcher.close()  # wait for the image tasks
+
+        log_entries = []
+        while not self.log_queue.empty():
+            log_entries.append(self.log_queue.get())
+        self.assertEqual(len(log_entries), 2)  # the video post is skipped
+        for log_entry in log_entries:
+            self.assertTrue(log_entry['success'])
+            self.assertEqual(log_entry['hashtag'], 'faces')
+            self.assertTrue(log_entry['name'].endswith('.jpg'))
+            self.assertEqual(log_entry['pixels'].shape, (24, 32, 3))
+            self.assertGreater(len(log_entry['data']), 0)
+        # written by the logging pipeline, not by the engine
+        self.assertEqual(os.listdir(os.path.join(self.tmp.name, 'images')), [])
+        self.assertEqual(sorted(self.frontier.get() for _ in range(3)),
+                         ['selfie', 'smile', 'video'])
+
+    def test_full_log_queue_gives_up_when_stopped(self):
+        self.engine.log_queue = queue.Queue(maxsize=1)
+        self.engine.log_queue.put({})  # the stopped pipeline no longer takes entries
+        self.engine.thread_stopper.set()
+        self.engine.log_download(True, 'a.jpg', False, ['post:1', 'img:1'], 'faces',
+                                 {'data': b'jpeg', 'pixels': None})
+        self.assertEqual(self.engine.log_queue.qsize(), 1)
+
+    def test_waiting_for_a_hashtag_gives_up_when_stopped(self):
+        self.engine.thread_stopper.set()
+        self.assertIsNone(self.engine.set_tag())
@@ -0,0 +1,80 @@
+from image_encoder import ImageEncoder
+from PIL import Image
+import io
+import unittest
+
+
+def png_bytes(size=(64, 48), mode='RGB'):
+    image = Image.new(mode, size)
+    for x in range(size[0]):
+        for y in range(size[1]):
+            image.putpixel((x, y), (x * 4, y * 5, 128) + ((255,) if mode == 'RGBA' else ()))
+    out = io.BytesIO()
+    image.save(out, format='PNG')
+    return out.getvalue()
+
+
+class ImageEncoderTest(unittest.TestCase):
+    def make_encoder(self, *args, **kwargs):
+        encoder = ImageEncoder(*args, **kwargs)
+        self.addCleanup(encoder.close)
+        return encoder
+
+    def test_encodes_each_format(self):
+        data = png_bytes()
+        for output_format, pil_format, extension in (('jpeg', 'JPEG', 'jpg'),
+                                                     ('webp', 'WEBP', 'webp')):
+            encoder = self.make_encoder(output_format)
+            self.assertTrue(encoder.needs_image('png'))
+            self.assertEqual(encoder.extension('png'), extension)
+            encoded, out_extension = encoder.encode(data, 'png')
+            self.assertEqual(out_extension, extension)
+            image = Image.open(io.BytesIO(encoded))
+            self.assertEqual(image.format, pil_format)
+            self.assertEqual(image.size, (64, 48))
+
+            status = encoder.status()[output_format]
+            self.assertEqual(status['count'], 1)
+            self.assertEqual(status['bytes_in_avg'], len(data))
+            self.assertEqual(status['bytes_out_avg'], len(encoded))
+            self.assertGreaterEqual(status['encode_ms_avg'], 0)
+
+    def test_original_bytes_are_kept(self):
+        data = png_bytes()
+        encoder = self.make_encoder()
+        self.assertFalse(encoder.needs_image('png'))
+        self.assertEqual(encoder.encode(data, 'png'), (data, 'png'))
+        self.assertEqual(encoder.status()['original'],
+                         {'count': 1, 'bytes_in_avg': len(data), 'bytes_out_avg': len(data),
+                          'encode_ms_avg': 0.0})
+
+    def test_original_is_downscaled_in_its_format(self):
+        encoder = self.make_encoder(max_dimension=32)
+        image = Image.open(io.BytesIO(png_bytes()))
+        encoded, extension = encoder.encode(png_bytes(), 'png', image)
+        self.assertEqual(extension, 'png')
+        downscaled = Image.open(io.BytesIO(encoded))
+        self.assertEqual(downscaled.format, 'PNG')
+        self.assertEqual(downscaled.size, (32, 24))
+        self.assertEqual(image.size, (64, 48))  # the caller's image is left intact
+        self.assertEqual(encoder.status()['png']['count'], 1)
+
+    def test_encodes_on_the_pool(self):
+        encoder = self.make_encoder('webp', num_workers=2, max_pending=2)
+        futures = [encoder.submit(encoder.encode, png_bytes(), 'png') for _ in range(4)]
+        for future in futures:
+            self.assertEqual(future.result(5)[1], 'webp')
+        self.assertEqual(encoder.status()['webp']['count'], 4)
+
+    def test_alpha_is_dropped_for_jpeg(self):
+        encoder = self.make_encoder('jpeg')
+        encoded, _ = encoder.encode(png_bytes(mode='RGBA'), 'png')
+        self.assertEqual(Image.open(io.BytesIO(encoded)).mode, 'RGB')
+
+    def test_unknown_format_is_rejected(self):
+        with self.assertRaises(ValueError):
+            ImageEncoder('gif')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+from image_fetcher import ImageFetcher
+from image_store import FlatImageStore
+from insta_crawler import InstagramCrawlerEngine
+from tests.fixture_server import FixtureServer
+import queue
+import tempfile
+import threading
+import unittest
+
+
+class ImageFetcherTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FixtureServer({
+            '/a.jpg': (200, 'image/jpeg', b'jpeg bytes'),
+            '/b': (200, 'image/webp; charset=binary', b'webp bytes'),
+            '/throttled': (429, 'text/plain', b''),
+        })
+        self.fetcher = ImageFetcher(num_workers=2)
+
+    def tearDown(self):
+        self.fetcher.close()
+        self.server.close()
+
+    def test_fetches_bytes_and_extension(self):
+        self.assertEqual(self.fetcher.fetch(self.server.url + '/a.jpg'), (b'jpeg bytes', 'jpg'))
+        self.assertEqual(self.fetcher.fetch(self.server.url + '/b'), (b'webp bytes', 'webp'))
+
+    def test_error_status_raises(self):
+        for path in ('/missing', '/throttled'):
+            with self.assertRaises(ImageFetcher.FetchError):
+                self.fetcher.fetch(self.server.url + path)
+
+    def test_failed_task_is_counted(self):
+        def fail():
+            raise RuntimeError('boom')
+        future = self.fetcher.submit(fail)
+        with self.assertRaises(RuntimeError):
+            future.result()
+        self.assertEqual(self.fetcher.errors, 1)
+
+
+class ImageTaskFailureTest(unittest.TestCase):
+    def test_failed_image_task_logs_a_failed_download(self):
+        log_queue = queue.Queue()
+        fetcher = ImageFetcher(num_workers=1)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        engine = InstagramCrawlerEngine(None, log_queue=log_queue, fetcher=fetcher,
+                                        thread_stopper=threading.Event(),
+                                        image_store=FlatImageStore(tmp.name, None))
+
+        def process_image(image_src, seen_keys, hashtag):
+            raise RuntimeError('unexpected')
+        engine.submit_image(fetcher, process_image, 'http://img', ['post:1', 'img:1'], 'faces')
+        log_entry = log_queue.get(timeout=5)
+        fetcher.close()
+        self.assertFalse(log_entry['success'])
+        self.assertEqual(log_entry['hashtag'], 'faces')
@@ -0,0 +1,45 @@
+from image_hash import DuplicateIndex
+import os
+import tempfile
+import unittest
+
+
+class DuplicateIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'index.txt')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_near_duplicate_is_found(self):
+        index = DuplicateIndex(radius=2)
+        self.assertIsNone(index.add_if_new(0b1111, 'a.jpg'))
+        self.assertEqual(index.add_if_new(0b1101, 'b.jpg'), 'a.jpg')
+        self.assertIsNone(index.add_if_new(0b11110000, 'c.jpg'))
+
+    def test_discarded_name_is_ignored_across_restarts(self):
+        index = DuplicateIndex(self.path)
+        index.add_if_new(0b1111, 'a.jpg')
+        index.discard('a.jpg')
+        self.assertIsNone(index.add_if_new(0b1111, 'b.jpg'))
+        index.close()
+
+        restored = DuplicateIndex(self.path)
+        self.assertEqual(restored.add_if_new(0b1111, 'c.jpg'), 'b.jpg')
+        restored.close()
+
+    def test_discarded_name_added_again_is_found(self):
+        index = DuplicateIndex(self.path)
+        index.add_if_new(0b1111, 'a.jpg')
+        index.discard('a.jpg')
+        self.assertIsNone(index.add_if_new(0b1111, 'a.jpg'))
+        index.close()
+
+        restored = DuplicateIndex(self.path)
+        self.assertEqual(restored.add_if_new(0b1111, 'b.jpg'), 'a.jpg')
+        restored.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+from image_store import (FILTERED, ShardedImageStore, SegmentImageStore, SegmentIndex,
+                         SegmentReader, compact)
+import hashlib
+import os
+import tempfile
+import unittest
+
+
+def image(i, size=100):
+    data = bytes([i % 256]) * size
+    return '{}.jpg'.format(hashlib.md5(data).hexdigest()), data
+
+
+class SegmentImageStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, 'store')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def open_store(self, **kwargs):
+        store = SegmentImageStore(self.root, **kwargs)
+        self.addCleanup(store.close)
+        return store
+
+    def open_reader(self):
+        reader = SegmentReader(self.root)
+        self.addCleanup(reader.close)
+        return reader
+
+    def test_put_get_round_trip(self):
+        store = self.open_store(segment_bytes=250)  # two images per segment
+        images = [image(i) for i in range(5)]
+        for name, data in images:
+            store.put(name, data)
+        store.put(*images[0])  # already stored
+        for name, data in images:
+            self.assertEqual(store.get(name), data)
+        store.close()
+
+        reader = self.open_reader()
+        self.assertEqual(len(reader), 5)
+        for name, data in images:
+            self.assertEqual(bytes(reader.get(name)), data)
+        self.assertEqual(len(set(s for s, _, _, _ in reader.entries.values())), 3)
+
+    def test_flag_updates_survive_reopen(self):
+        store = self.open_store()
+        (a, a_data), (b, b_data) = image(1), image(2)
+        store.put(a, a_data)
+        store.put(b, b_data, FILTERED)
+        store.set_flags(a, FILTERED)
+        store.delete(b)
+        store.close()
+
+        store = self.open_store()
+        self.assertEqual(store.flags(a), FILTERED)
+        self.assertNotIn(b, store)
+        self.assertIsNone(store.get(b))
+        self.assertEqual(list(self.open_reader().names(FILTERED)), [a])
+
+    def test_compaction_keeps_live_and_filtered_images(self):
+        store = self.open_store(segment_bytes=250)
+        images = [image(i) for i in range(4)]
+        for name, data in images:
+            store.put(name, data)
+        store.set_flags(images[1][0], FILTERED)
+        store.delete(images[2][0])
+        store.close()
+
+        self.assertEqual(compact(self.root, segment_bytes=250), 3)
+        reader = self.open_reader()
+        self.assertEqual(sorted(reader.names()), sorted(n for n, _ in images[:2] + images[3:]))
+        self.assertEqual(list(reader.names(FILTERED)), [images[1][0]])
+        for name, data in images[:2] + images[3:]:
+            self.assertEqual(bytes(reader.get(name)), data)
+        self.assertIsNone(reader.get(images[2][0]))
+        # a single record per image
+        index_path = os.path.join(self.root, SegmentImageStore.INDEX_FILE)
+        self.assertEqual(os.path.getsize(index_path), 3 * SegmentIndex.RECORD.size)
+
+    def test_recovers_from_a_torn_index_record(self):
+        store = self.open_store()
+        (a, a_data), (b, b_data) = image(1), image(2)
+        store.put(a, a_data)
+        store.close()
+        with open(os.path.join(self.root, SegmentImageStore.INDEX_FILE), 'ab') as f:
+            f.write(SegmentIndex.pack(b, 0, 100, 100, 0)[:10])  # crashed mid-write
+
+        self.assertEqual(list(self.open_reader().names()), [a])
+        store = self.open_store()
+        self.assertEqual(store.get(a), a_data)
+        self.assertNotIn(b, store)
+        store.put(b, b_data)
+        store.close()
+
+        reader = self.open_reader()
+        self.assertEqual(bytes(reader.get(a)), a_data)
+        self.assertEqual(bytes(reader.get(b)), b_data)
+
+    def test_reads_an_empty_segment(self):
+        store = self.open_store()
+        name = '{}.jpg'.format(hashlib.md5(b'').hexdigest())
+        store.put(name, b'')
+        self.assertEqual(store.get(name), b'')
+        store.close()
+
+        reader = self.open_reader()
+        self.assertEqual(bytes(reader.get(name)), b'')
+        self.assertEqual(compact(self.root), 1)
+
+
+class ShardedImageStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_flags_survive_reopen(self):
+        store = ShardedImageStore(self.tmp.name)
+        (a, a_data), (b, b_data) = image(1), image(2)
+        path = store.put(a, a_data, FILTERED)
+        store.put(b, b_data)
+        store.set_flags(a, 0)
+        store.set_flags(b, FILTERED)
+        store.close()
+
+        self.assertEqual(path, os.path.join(self.tmp.name, a[0:2], a[2:4], a))
+        store = ShardedImageStore(self.tmp.name)
+        self.assertEqual(store.flags(a), 0)
+        self.assertEqual(store.flags(b), FILTERED)
+        self.assertEqual(store.get(b), b_data)
+        store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+from log_writer import LogWriter
+import gzip
+import os
+import tempfile
+import time
+import unittest
+
+
+class LogWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = os.path.join(self.tmp.name, 'log')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read_all(self):
+        lines = []
+        for name in sorted(os.listdir(self.folder)):
+            path = os.path.join(self.folder, name)
+            opener = gzip.open if name.endswith('.gz') else open
+            with opener(path, 'rt') as f:
+                lines.append(f.read().splitlines())
+        return lines
+
+    def test_flushes_on_close(self):
+        writer = LogWriter(self.folder, 'a,b', flush_interval=60)
+        writer.write(['1,2\n', '3,4\n'])
+        writer.close()
+        self.assertEqual(self.read_all(), [['a,b', '1,2', '3,4']])
+
+    def test_flushes_by_interval(self):
+        writer = LogWriter(self.folder, 'a,b', flush_interval=0.05)
+        writer.write(['1,2\n'])
+        deadline = time.time() + 5
+        while self.read_all() != [['a,b', '1,2']] and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.read_all(), [['a,b', '1,2']])
+        writer.close()
+
+    def test_rotates_by_size_with_a_header_per_file(self):
+        writer = LogWriter(self.folder, 'h', max_file_bytes=20, flush_bytes=1)
+        for i in range(10):
+            writer.write(['line{}\n'.format(i)])
+            time.sleep(0.01)
+        writer.close()
+        files = self.read_all()
+        self.assertGreater(len(files), 1)
+        self.assertTrue(all(lines[0] == 'h' for lines in files))
+        self.assertEqual([line for lines in files for line in lines[1:]],
+                         ['line{}'.format(i) for i in range(10)])
+
+    def test_compresses_rotated_files(self):
+        writer = LogWriter(self.folder, 'h', max_file_bytes=20, flush_bytes=1, compression='gzip')
+        for i in range(5):
+            writer.write(['line{}\n'.format(i)])
+            time.sleep(0.01)
+        writer.close()
+        names = os.listdir(self.folder)
+        self.assertTrue(all(name.endswith('.csv.gz') for name in names))
+        self.assertEqual([line for lines in self.read_all() for line in lines[1:]],
+                         ['line{}'.format(i) for i in range(5)])
+
+    def test_write_after_close_raises(self):
+        writer = LogWriter(self.folder, 'h')
+        writer.close()
+        with self.assertRaises(ValueError):
+            writer.write(['late\n'])
@@ -0,0 +1,89 @@
+from pacing import HostRateLimiter, PacingController
+import threading
+import unittest
+
+
+class HostRateLimiterTest(unittest.TestCase):
+    def setUp(self):
+        self.limiter = HostRateLimiter(rate=2.0, burst=2, min_rate=0.1, max_rate=4.0)
+        self.start = self.limiter.last_refill
+
+    def test_bucket_refills_at_the_rate(self):
+        self.assertEqual(self.limiter.reserve(self.start), 0.0)
+        self.assertEqual(self.limiter.reserve(self.start), 0.0)
+        self.assertAlmostEqual(self.limiter.reserve(self.start), 0.5)  # burst used up
+        self.assertAlmostEqual(self.limiter.reserve(self.start), 1.0)
+        # 2 tokens owed, 4 refilled, capped to the burst
+        self.assertEqual(self.limiter.reserve(self.start + 2.0), 0.0)
+        self.assertEqual(self.limiter.reserve(self.start + 2.0), 0.0)
+        self.assertAlmostEqual(self.limiter.reserve(self.start + 2.0), 0.5)
+
+    def test_throttling_backs_off(self):
+        self.limiter.throttled()
+        self.assertAlmostEqual(self.limiter.rate, 1.0)
+        self.assertAlmostEqual(self.limiter.reserve(self.start), 1.0)  # the bucket was emptied
+        for _ in range(10):
+            self.limiter.throttled()
+        self.assertEqual(self.limiter.rate, 0.1)
+
+    def test_rising_failures_back_off(self):
+        for _ in range(3):
+            self.limiter.failure()
+        self.assertEqual(self.limiter.rate, 2.0)  # a few failures are tolerated
+        self.limiter.failure()
+        self.assertAlmostEqual(self.limiter.rate, 1.0)
+        self.assertEqual(self.limiter.failure_ratio, 0.0)
+
+    def test_successes_recover_additively(self):
+        self.limiter.rate = 0.5
+        for _ in range(10):
+            self.limiter.success()
+        self.assertAlmostEqual(self.limiter.rate, 1.0)  # +0.05 per request below 1 req/s
+        for _ in range(100):
+            self.limiter.success()
+        self.assertGreater(self.limiter.rate, 2.0)
+        self.assertLess(self.limiter.rate, 4.0)
+        for _ in range(1000):
+            self.limiter.success()
+        self.assertEqual(self.limiter.rate, 4.0)
+
+
+class PacingControllerTest(unittest.TestCase):
+    def test_workers_share_one_bucket_per_host(self):
+        pacing = PacingController(initial_rate=1.0)
+        limiters = []
+
+        def worker():
+            limiters.append(pacing.limiter('example.com'))
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        limiter = limiters[0]
+        self.assertTrue(all(l is limiter for l in limiters))
+        self.assertIsNot(pacing.limiter('other.com'), limiter)
+
+        # the burst of 2 is shared: the third request of any worker waits
+        now = limiter.last_refill
+        delays = [pacing.limiter('example.com').reserve(now) for _ in range(4)]
+        self.assertEqual(delays, [0.0, 0.0, 1.0, 2.0])
+        self.assertEqual(pacing.limiter('other.com').reserve(now), 0.0)
+
+    def test_throttled_response_slows_every_worker(self):
+        pacing = PacingController(initial_rate=1.0)
+        pacing.response('example.com', 429)
+        self.assertAlmostEqual(pacing.status()['rate_example.com'], 0.5)
+        pacing.response('example.com', 200)
+        self.assertGreater(pacing.limiter('example.com').rate, 0.5)
+
+    def test_wait_turn_stops_with_the_worker(self):
+        pacing = PacingController(initial_rate=0.01)
+        stopper = threading.Event()
+        stopper.set()
+        for _ in range(3):  # the third waits 100 seconds unless stopped
+            pacing.wait_turn('example.com', stopper)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+from pipeline import Stage, Pipeline
+from threading import Event
+import time
+import unittest
+
+
+class PipelineTest(unittest.TestCase):
+    def make_pipeline(self, double, collect, on_error=None):
+        stopper = Event()
+        pipeline = Pipeline([
+            Stage('double', double, stopper=stopper, batch_size=4, on_error=on_error),
+            Stage('collect', collect, stopper=stopper, batch_size=4),
+        ])
+        return pipeline
+
+    def test_failed_batch_goes_to_on_error(self):
+        collected, failed = [], []
+
+        def double(items):
+            if 3 in items:
+                raise ValueError('bad item')
+            return [2 * i for i in items]
+
+        pipeline = self.make_pipeline(double, collected.extend, on_error=failed.extend)
+        for i in range(1, 5):
+            pipeline.input_queue.put(i)
+        pipeline.stop()
+        pipeline.drain()
+        self.assertEqual(failed, [1, 2, 3, 4])
+        self.assertEqual(collected, [])
+        self.assertEqual(pipeline.status()['double']['errors'], 4)
+
+    def test_drain_runs_items_left_upon_stop(self):
+        collected = []
+        pipeline = self.make_pipeline(lambda items: [2 * i for i in items], collected.extend)
+        pipeline.start()
+        pipeline.stop()
+        pipeline.join()
+        for i in range(10):  # queued after the workers stopped
+            pipeline.input_queue.put(i)
+        pipeline.drain()
+        self.assertEqual(collected, [2 * i for i in range(10)])
+
+    def test_drain_keeps_results_not_forwarded_upon_stop(self):
+        collected = []
+        stopper = Event()
+        first = Stage('double', lambda items: [2 * i for i in items], stopper=stopper,
+                      batch_size=4)
+        second = Stage('collect', collected.extend, stopper=stopper, maxsize=1)
+        pipeline = Pipeline([first, second])
+        for i in range(4):
+            first.queue.put(i)
+        first.start()  # the collect stage is not running, so its queue fills up
+        while first.queue.qsize() > 0 or second.queue.qsize() == 0:
+            time.sleep(0.01)
+        pipeline.stop()
+        pipeline.join()
+        self.assertEqual(len(first.unforwarded), 3)
+        pipeline.drain()
+        self.assertEqual(collected, [0, 2, 4, 6])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+from process_workers import SharedPixelsQueue, attach_pixels, release_pixels
+import numpy as np
+import os
+import queue
+import unittest
+
+
+class SharedPixelsTest(unittest.TestCase):
+    def test_pixels_cross_in_shared_memory_and_are_freed(self):
+        log_queue = queue.Queue()
+        pixels = np.arange(2 * 3 * 3, dtype=np.uint8).reshape(2, 3, 3)
+        SharedPixelsQueue(log_queue).put({'name': 'a.jpg', 'pixels': pixels})
+
+        log_entry = log_queue.get_nowait()
+        name = log_entry['pixels'][0]
+        self.assertIsInstance(log_entry['pixels'], tuple)  # only the block name is queued
+        attach_pixels(log_entry)
+        np.testing.assert_array_equal(log_entry['pixels'], pixels)
+
+        release_pixels(log_entry)
+        self.assertNotIn('pixels', log_entry)
+        self.assertNotIn('shm', log_entry)
+        if os.path.isdir('/dev/shm'):
+            self.assertFalse(os.path.exists(os.path.join('/dev/shm', name.lstrip('/'))))
+
+    def test_block_is_freed_when_the_queue_is_full(self):
+        log_queue = queue.Queue(maxsize=1)
+        log_queue.put({})
+        before = set(os.listdir('/dev/shm')) if os.path.isdir('/dev/shm') else set()
+        with self.assertRaises(queue.Full):
+            SharedPixelsQueue(log_queue).put({'name': 'a.jpg', 'pixels': np.ones((2, 2, 3))},
+                                             timeout=0.01)
+        if os.path.isdir('/dev/shm'):
+            self.assertEqual(set(os.listdir('/dev/shm')), before)
+
+    def test_entries_without_pixels_pass_through(self):
+        log_queue = queue.Queue()
+        SharedPixelsQueue(log_queue).put({'name': 'a.jpg', 'pixels': None})
+        log_entry = attach_pixels(log_queue.get_nowait())
+        self.assertIsNone(log_entry['pixels'])
+        release_pixels(log_entry)
@@ -0,0 +1,94 @@
+from frontier import HashtagFrontier
+from scheduler import HashtagScheduler
+import os
+import tempfile
+import unittest
+
+
+class HashtagSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.frontier = HashtagFrontier(spill_path=os.path.join(self.tmp.name, 'spill'))
+        self.scheduler = HashtagScheduler(self.frontier)
+
+    def tearDown(self):
+        self.scheduler.close()
+        self.tmp.cleanup()
+
+    def crawl(self, tag, filtered, total):
+        for i in range(total):
+            self.scheduler.record({'hashtag': tag, 'type': 'FILTERED' if i < filtered else 'SAVED'})
+
+    def test_fresh_hashtags_come_first_without_statistics(self):
+        self.scheduler.offer('a')
+        self.scheduler.offer('b')
+        self.assertEqual(self.scheduler.get(), 'a')
+        self.assertEqual(self.scheduler.get(), 'b')
+
+    def pick(self):
+        tag = self.scheduler.get(block=False)
+        self.scheduler.release(tag)
+        return tag
+
+    def test_high_yield_hashtag_is_picked_again(self):
+        self.crawl('faces', filtered=90, total=100)
+        self.crawl('landscape', filtered=10, total=100)
+        for i in range(10):
+            self.scheduler.offer('fresh{}'.format(i))  # refilled by the crawled posts
+
+        for _ in range(10):
+            tag = self.pick()
+            self.assertEqual(tag, 'faces')
+            self.crawl(tag, filtered=9, total=10)
+        self.assertEqual(self.scheduler.qsize(), 10)
+
+    def test_queued_fresh_hashtags_are_explored(self):
+        self.crawl('a', filtered=5, total=10)
+        self.scheduler.offer('b')
+        self.scheduler.offer('c')
+        self.assertEqual(self.pick(), 'b')  # ties go to the fresh hashtag
+        self.crawl('b', filtered=5, total=10)
+        picked = set()
+        for _ in range(10):
+            tag = self.pick()
+            picked.add(tag)
+            self.crawl(tag, filtered=5, total=10)
+        self.assertEqual(picked, {'a', 'b', 'c'})
+        self.assertEqual(self.scheduler.qsize(), 0)
+
+    def test_exhausted_hashtag_gives_way(self):
+        self.crawl('faces', filtered=90, total=100)
+        self.crawl('landscape', filtered=10, total=100)
+        self.scheduler.offer('fresh')
+        self.assertEqual(self.pick(), 'faces')
+        for _ in range(500):  # every post of the tag page has been crawled before
+            self.scheduler.record({'hashtag': 'faces', 'type': 'SEEN'})
+        self.assertNotEqual(self.pick(), 'faces')
+        self.assertEqual(self.scheduler.status()['faces']['SEEN'], 500)
+
+    def test_fresh_hashtag_beats_a_poor_one(self):
+        self.crawl('faces', filtered=90, total=100)
+        self.crawl('landscape', filtered=1, total=100)
+        self.scheduler.in_use.add('faces')  # crawled by another worker
+        self.scheduler.offer('fresh')
+        self.assertEqual(self.scheduler.get(block=False), 'fresh')
+
+    def test_hashtag_in_use_is_not_handed_out_twice(self):
+        self.crawl('faces', filtered=90, total=100)
+        self.scheduler.in_use.add('faces')
+        self.scheduler.offer('fresh')
+        self.assertEqual(self.scheduler.get(block=False), 'fresh')
+        self.scheduler.release('faces')
+        self.assertEqual(self.scheduler.get(block=False), 'faces')
+
+    def test_snapshot_restores_statistics(self):
+        self.crawl('faces', filtered=5, total=10)
+        self.scheduler.offer('fresh')
+        path = os.path.join(self.tmp.name, 'snapshot')
+        self.scheduler.snapshot(path)
+
+        restored = HashtagScheduler(HashtagFrontier(spill_path=os.path.join(self.tmp.name, 's2')))
+        self.assertTrue(restored.restore(path))
+        self.assertEqual(restored.qsize(), 1)
+        self.assertAlmostEqual(restored.status()['faces']['yield_rate'], 0.5, places=3)
+        restored.close()
@@ -0,0 +1,61 @@
+from seen_index import SeenIndex, image_key, post_key
+import os
+import sqlite3
+import tempfile
+import unittest
+
+
+class SeenIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'seen.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def committed(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute('SELECT COUNT(*) FROM seen').fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_inserts_are_committed_in_batches(self):
+        index = SeenIndex(self.db_path, commit_every=3, commit_interval=3600)
+        index.add(['post:a', None, 'post:b'])
+        self.assertTrue(index.contains('post:a'))  # visible to the writer at once
+        self.assertFalse(index.contains(None))
+        self.assertEqual(index.pending, 2)
+        self.assertEqual(self.committed(), 0)
+        index.add(['post:c', 'post:a'])
+        self.assertEqual(index.pending, 0)
+        self.assertEqual(self.committed(), 3)
+        index.close()
+
+    def test_stale_batch_is_committed(self):
+        index = SeenIndex(self.db_path, commit_every=100, commit_interval=0)
+        index.add(['post:a'])
+        self.assertEqual(self.committed(), 1)
+        index.close()
+
+    def test_keys_persist_across_reopen(self):
+        index = SeenIndex(self.db_path, commit_every=100, commit_interval=3600)
+        index.add(['post:a', 'img:cdn/b.jpg'])
+        index.close()  # commits the pending batch
+
+        index = SeenIndex(self.db_path)
+        self.assertTrue(index.contains('post:a'))
+        self.assertTrue(index.contains('img:cdn/b.jpg'))
+        self.assertFalse(index.contains('post:c'))
+        self.assertEqual(len(index), 2)
+        index.close()
+
+    def test_keys_ignore_signed_query_strings(self):
+        self.assertEqual(image_key('https://cdn.example.com/v/a.jpg?sig=1&exp=2'),
+                         image_key('https://cdn.example.com/v/a.jpg?sig=3&exp=4'))
+        self.assertEqual(post_key('https://www.instagram.com/p/Bx12_y/?taken-by=x'), 'post:Bx12_y')
+        self.assertIsNone(post_key('https://www.instagram.com/explore/tags/faces/'))
+
+
+if __name__ == '__main__':
+    unittest.main()
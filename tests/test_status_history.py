@@ -0,0 +1,23 @@
+from status_history import StatusHistory
+import unittest
+
+
+class StatusHistoryTest(unittest.TestCase):
+    def test_fleet_sums_active_nodes(self):
+        history = StatusHistory(active_seconds=60)
+        history.add('a', {'SAVED_sum': 3, 'SAVED_speed_10s': 1.0}, now=100)
+        history.add('b', {'SAVED_sum': 4, 'SAVED_speed_10s': 2.0}, now=100)
+        history.add('c', {'SAVED_sum': 10}, now=0)  # inactive
+        fleet = history.fleet(now=110)
+        self.assertEqual(fleet['SAVED_sum'], 7)
+        self.assertEqual(fleet['SAVED_speed_10s'], 3.0)
+        self.assertEqual(fleet['nodes'], 2)
+        self.assertEqual(history.inactive_node_ids(now=110), ['c'])
+
+    def test_evicts_nodes_past_the_rollup_horizon(self):
+        history = StatusHistory(rollup_count=10)  # 10 minutes of rollups
+        history.add('old', {'SAVED_sum': 1}, now=0)
+        history.add('new', {'SAVED_sum': 1}, now=500)
+        self.assertEqual(history.evict(now=650), ['old'])
+        self.assertEqual(history.node_ids(), ['new'])
+        self.assertNotIn('old', history.query())
@@ -0,0 +1,80 @@
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from threading import Thread
+from urllib.parse import parse_qs
+from status_publisher import StatusPublisher
+import json
+import time
+import unittest
+
+
+class FixtureServer:
+    """
+    Local monitoring server answering PUT requests with the queued status codes.
+    """
+    def __init__(self, codes):
+        received = self.received = []
+        codes = list(codes)
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_PUT(self):
+                body = self.rfile.read(int(self.headers['Content-Length'])).decode()
+                received.append((self.path, json.loads(parse_qs(body)['status'][0])))
+                self.send_response(codes.pop(0) if len(codes) > 0 else 200)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:{}/'.format(self.server.server_port)
+        Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class StatusPublisherTest(unittest.TestCase):
+    def test_sends_status_in_body(self):
+        server = FixtureServer([])
+        publisher = StatusPublisher(server.url, rate=100)
+        try:
+            publisher.publish({'node': 'a', 'hashtags': ['x' * 100] * 100})
+            self.assertTrue(wait_for(lambda: publisher.sent == 1))
+            path, status = server.received[0]
+            self.assertEqual(path, '/')  # nothing in the query string
+            self.assertEqual(status['node'], 'a')
+        finally:
+            publisher.close()
+            server.close()
+
+    def test_error_response_backs_off_and_resends(self):
+        server = FixtureServer([500])
+        publisher = StatusPublisher(server.url, rate=100, min_backoff=0.05)
+        try:
+            publisher.publish({'node': 'a'})
+            self.assertTrue(wait_for(lambda: publisher.sent == 1))
+            self.assertEqual(publisher.failed, 1)
+            self.assertEqual(len(server.received), 2)
+        finally:
+            publisher.close()
+            server.close()
+
+    def test_coalesces_to_latest(self):
+        publisher = StatusPublisher('http://127.0.0.1:9/', rate=100, min_backoff=10)
+        try:
+            for i in range(10):
+                publisher.publish({'seq': i})
+            self.assertTrue(wait_for(lambda: publisher.failed >= 1))
+            with publisher.lock:
+                self.assertEqual(publisher.latest['seq'], 9)
+        finally:
+            publisher.close()
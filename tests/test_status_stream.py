@@ -0,0 +1,60 @@
+from status_stream import StatusBroadcaster
+import json
+import threading
+import unittest
+
+
+def parse(event):
+    fields = dict(line.split(': ', 1) for line in event.decode().strip().split('\n'))
+    return fields['id'], fields['event'], json.loads(fields['data'])
+
+
+class StatusBroadcasterTest(unittest.TestCase):
+    def setUp(self):
+        self.broadcaster = StatusBroadcaster(backlog=3)
+        self.broadcaster.publish({'saved': 1, 'filtered': 0})
+        self.broadcaster.publish({'saved': 2, 'filtered': 0})
+
+    def test_new_watcher_gets_a_snapshot_then_deltas(self):
+        stream = self.broadcaster.stream()
+        event_id, event_type, data = parse(next(stream))
+        self.assertEqual((event_type, data), ('snapshot', {'saved': 2, 'filtered': 0}))
+        self.assertEqual(event_id, self.broadcaster.event_id(2))
+
+        self.broadcaster.publish({'saved': 2, 'filtered': 0})  # unchanged, not published
+        self.broadcaster.publish({'saved': 2, 'filtered': 1})
+        self.assertEqual(parse(next(stream)), (self.broadcaster.event_id(3), 'delta', {'filtered': 1}))
+
+    def test_reconnecting_watcher_resumes_after_last_event_id(self):
+        self.broadcaster.publish({'saved': 3})
+        stream = self.broadcaster.stream(last_event_id=self.broadcaster.event_id(1))
+        self.assertEqual(parse(next(stream)), (self.broadcaster.event_id(2), 'delta', {'saved': 2}))
+        self.assertEqual(parse(next(stream)), (self.broadcaster.event_id(3), 'delta', {'saved': 3}))
+
+    def test_event_id_of_another_boot_gets_a_snapshot(self):
+        last_event_id = '{}-1'.format(int(self.broadcaster.boot_id) - 1)
+        _, event_type, data = parse(next(self.broadcaster.stream(last_event_id=last_event_id)))
+        self.assertEqual((event_type, data), ('snapshot', {'saved': 2, 'filtered': 0}))
+        _, event_type, _ = parse(next(self.broadcaster.stream(last_event_id='garbage')))
+        self.assertEqual(event_type, 'snapshot')
+
+    def test_event_that_left_the_backlog_gets_a_snapshot(self):
+        for saved in range(3, 6):
+            self.broadcaster.publish({'saved': saved})  # events 3 to 5 fill the backlog
+        stream = self.broadcaster.stream(last_event_id=self.broadcaster.event_id(1))
+        self.assertEqual(parse(next(stream)),
+                         (self.broadcaster.event_id(5), 'snapshot', {'saved': 5, 'filtered': 0}))
+        stream = self.broadcaster.stream(last_event_id=self.broadcaster.event_id(2))
+        self.assertEqual(parse(next(stream))[1], 'delta')
+
+    def test_idle_stream_keeps_alive_until_stopped(self):
+        stopper = threading.Event()
+        stream = self.broadcaster.stream(self.broadcaster.event_id(2), keep_alive=0.01,
+                                         stopper=stopper)
+        self.assertEqual(next(stream), b': keep-alive\n\n')
+        stopper.set()
+        self.assertEqual(list(stream), [])
+
+
+if __name__ == '__main__':
+    unittest.main()